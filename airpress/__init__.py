@@ -1,3 +1,49 @@
 __version__ = '1.0.3'
 
-from .compressor import PKPass
+import importlib
+import sys
+
+from .compressor import PKPass, WWDR_CA
+from .archive import CompressionPolicy, DEFAULT_COMPRESSION, STORE_PNG_COMPRESSION
+from .assets import FileAsset
+from .bundle import PassBundle
+from .cache import ArchiveCache
+from .crypto import PassSigner
+from .metrics import PassObserver, StatsObserver
+from .passjson import Field, PassJsonTemplate
+from .png import PNGOptimizer
+from .preflight import PreflightIssue, PreflightResult, preflight
+from .reader import PKPassReader, VerificationIssue, VerificationResult, verify_many
+from .store import AssetStore, shared_store
+from .template import PassTemplate
+from .warmup import prewarm
+
+# Subsystems pulling in heavy standard library modules (`asyncio`, `multiprocessing`,
+# `sqlite3`, `socket`) are imported on first access of their names
+_LAZY_NAMES = {
+    'AsyncPassBuilder': 'aio',
+    'BuildResult': 'batch',
+    'build_many': 'batch',
+    'DeltaIndex': 'delta',
+    'DeltaResult': 'delta',
+    'RemoteSigner': 'daemon',
+    'SigningDaemon': 'daemon',
+}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        module = _LAZY_NAMES.get(name)
+        if module is None:
+            raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+        value = getattr(importlib.import_module(f'.{module}', __name__), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_LAZY_NAMES))
+else:
+    # Module `__getattr__` is not supported before Python 3.7
+    from .aio import AsyncPassBuilder
+    from .batch import BuildResult, build_many
+    from .delta import DeltaIndex, DeltaResult
+    from .daemon import RemoteSigner, SigningDaemon
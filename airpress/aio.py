@@ -0,0 +1,147 @@
+import asyncio
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BuilderStats = collections.namedtuple(
+    'BuilderStats', ('jobs', 'pending', 'queued_time', 'run_time')
+)
+BuilderStats.__doc__ = """
+Totals collected by `AsyncPassBuilder`.
+`jobs` is a number of finished jobs, `pending` a number of jobs admitted to executor
+but not yet finished, `queued_time` and `run_time` are total seconds jobs spent
+waiting for a free worker and running respectively.
+"""
+
+
+class AsyncPassBuilder:
+    """
+    Runs CPU-bound signing and compression of `PKPass` on executor, so they don't
+    block event loop.
+    Number of jobs admitted to executor is bounded, callers wait (without blocking
+    the loop) until one of the running jobs finishes. Cancelling a caller that waits
+    for a free slot or whose job hasn't started yet means the job is never run;
+    job that has already started runs to completion, but its result is discarded.
+    """
+
+    def __init__(self,
+                 signer=None,
+                 max_workers: int = None,
+                 max_pending: int = None,
+                 executor=None,
+                 on_job_done=None):
+        """
+        :param signer: (optional) `PassSigner` used when `.sign()` or `.build()` are
+        called without credentials
+        :param max_workers: number of threads of executor created by builder,
+        ignored when `executor` is supplied
+        :param max_pending: maximum number of jobs admitted to executor at once,
+        defaults to number of executor workers
+        :param executor: (optional) `concurrent.futures.Executor` to run jobs on;
+        it's not shut down by `.close()`
+        :param on_job_done: (optional) callable receiving job name (`'sign'`,
+        `'archive'` or `'build'`), seconds job waited for a worker and seconds
+        it ran; called from executor thread
+        """
+        self.signer = signer
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers)
+        self._max_pending = max_pending or getattr(self._executor, '_max_workers', None) or 1
+        self._slots = None
+        self._on_job_done = on_job_done
+        self._lock = threading.Lock()
+        self._jobs = 0
+        self._pending = 0
+        self._queued_time = 0.0
+        self._run_time = 0.0
+
+    @property
+    def stats(self) -> BuilderStats:
+        with self._lock:
+            return BuilderStats(self._jobs, self._pending, self._queued_time, self._run_time)
+
+    async def sign(self, pkpass, **kwargs) -> bytes:
+        """
+        Signs pass package on executor.
+        :param pkpass: `PKPass` instance
+        :param kwargs: keyword arguments passed to `PKPass.sign()`,
+        builder `signer` is used when none are supplied
+        :returns: signature
+        """
+        return await self._run('sign', pkpass.sign, **self._sign_kwargs(kwargs))
+
+    async def archive(self, pkpass) -> bytes:
+        """
+        Compresses signed pass package on executor.
+        :param pkpass: signed `PKPass` instance
+        :returns: bytes object with signed `.pkpass`
+        """
+        return await self._run('archive', bytes, pkpass)
+
+    async def build(self, pkpass, **kwargs) -> bytes:
+        """
+        Signs and compresses pass package as a single job.
+        :param pkpass: `PKPass` instance
+        :param kwargs: keyword arguments passed to `PKPass.sign()`,
+        builder `signer` is used when none are supplied
+        :returns: bytes object with signed `.pkpass`
+        """
+        return await self._run('build', _sign_and_archive, pkpass, self._sign_kwargs(kwargs))
+
+    def _sign_kwargs(self, kwargs):
+        if not kwargs and self.signer is not None:
+            return {'signer': self.signer}
+        return kwargs
+
+    async def _run(self, name, func, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_pending)
+        submitted = time.perf_counter()
+
+        await self._slots.acquire()
+        try:
+            future = self._executor.submit(self._timed, name, submitted, func, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(future)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _timed(self, name, submitted, func, args, kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            finished = time.perf_counter()
+            queued, ran = started - submitted, finished - started
+            with self._lock:
+                self._jobs += 1
+                self._queued_time += queued
+                self._run_time += ran
+            if self._on_job_done is not None:
+                self._on_job_done(name, queued, ran)
+
+    def close(self) -> None:
+        """Shuts down executor created by builder"""
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+def _sign_and_archive(pkpass, sign_kwargs):
+    pkpass.sign(**sign_kwargs)
+    return bytes(pkpass)
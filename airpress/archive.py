@@ -0,0 +1,307 @@
+import collections
+import io
+import struct
+import time
+import zipfile
+import zlib
+
+from .assets import LazyAsset, asset_head, asset_size, asset_window, iter_asset
+
+# Zip structures, same as ones used by `zipfile` module
+_LOCAL_FILE_HEADER = struct.Struct('<4s2B4HL2L2H')
+_CENTRAL_DIRECTORY = struct.Struct('<4s4B4HL2L5H2L')
+_END_OF_ARCHIVE = struct.Struct('<4s4H2LH')
+
+_VERSION = 20
+_CREATE_SYSTEM = 3  # Unix
+_EXTERNAL_ATTR = 0o600 << 16  # -rw-------, same as `ZipFile.writestr`
+_UTF8_FLAG = 0x800
+_ZIP_LIMIT = 0xFFFFFFFF
+_ZIP_FILECOUNT_LIMIT = 0xFFFF
+
+# Earliest date representable in zip, stamped on members of reproducible archives
+DETERMINISTIC_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+CompressedMember = collections.namedtuple(
+    'CompressedMember', ('data', 'crc', 'file_size', 'compress_type')
+)
+CompressedMember.__doc__ = """
+Zip member compressed ahead of time, independent of its name inside the archive.
+`data` holds compressed bytes, `crc` and `file_size` describe uncompressed content.
+Stored members refer to the original asset instead, so `data` may also be any
+other bytes-like object or `FileAsset`.
+"""
+
+
+def compress_member(data, compress_type: int = zipfile.ZIP_DEFLATED,
+                    level: int = None) -> CompressedMember:
+    """
+    Compresses data into zip member that can be written to archive as is.
+    Assets stored in files are compressed chunk by chunk.
+    :param data: bytes-like object or `FileAsset` with member content
+    :param compress_type: `zipfile.ZIP_DEFLATED` or `zipfile.ZIP_STORED`
+    :param level: (optional) deflate level, defaults to zlib default
+    :returns: `CompressedMember`
+    """
+    crc = 0
+    if compress_type == zipfile.ZIP_DEFLATED:
+        compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION if level is None else level, zlib.DEFLATED, -15
+        )
+        parts = []
+        for chunk in iter_asset(data):
+            crc = zlib.crc32(chunk, crc)
+            parts.append(compressor.compress(chunk))
+        parts.append(compressor.flush())
+        compressed = b''.join(parts)
+    elif compress_type == zipfile.ZIP_STORED:
+        for chunk in iter_asset(data):
+            crc = zlib.crc32(chunk, crc)
+        compressed = data
+    else:
+        raise ValueError(f'Compression method {compress_type!r} is not supported.')
+    return CompressedMember(compressed, crc, asset_size(data), compress_type)
+
+
+class CompressionPolicy:
+    """
+    Decides how each archive member is compressed.
+    Rules are checked in order: names ending with one of `stored` suffixes are stored
+    without compression, names ending with one of `levels` suffixes are deflated with
+    given level, with `auto` enabled members whose samples don't compress well are
+    stored, everything else is deflated with default `level`.
+    """
+
+    def __init__(self,
+                 level: int = None,
+                 stored: tuple = (),
+                 levels: dict = None,
+                 auto: bool = False,
+                 sample_size: int = 4096,
+                 min_saving: float = 0.1,
+                 samples: int = 3):
+        """
+        :param level: default deflate level, defaults to zlib default
+        :param stored: file name suffixes (or full names) of members stored
+        without compression, e.g. `('.png',)`
+        :param levels: mapping of file name suffixes (or full names) to deflate level,
+        e.g. `{'.json': 9, '.strings': 9}`
+        :param auto: decides whether to check compressibility of members not matched by
+        `stored` and `levels`, by deflating `samples` windows of `sample_size` bytes spread
+        evenly over the member at level 1; start of the member is skipped, headers of
+        already compressed files, e.g. PNG images, compress much better than their data
+        :param sample_size: size of sample window in bytes
+        :param min_saving: fraction of sampled size that must be saved by compression,
+        otherwise member is stored
+        :param samples: number of sample windows, members not larger than all windows
+        together are compressed as a whole
+        """
+        self.level = level
+        self.stored = tuple(stored)
+        self.levels = dict(levels or {})
+        self.auto = auto
+        self.sample_size = sample_size
+        self.min_saving = min_saving
+        self.samples = samples
+
+    def choose(self, name: str, data: bytes) -> tuple:
+        """
+        :returns: (compress_type, level) pair for the member
+        """
+        if self.stored and name.endswith(self.stored):
+            return zipfile.ZIP_STORED, None
+        for suffix, level in self.levels.items():
+            if name.endswith(suffix):
+                return zipfile.ZIP_DEFLATED, level
+        if self.auto:
+            sampled = compressed = 0
+            for sample in self._samples(data):
+                sampled += len(sample)
+                compressed += len(zlib.compress(sample, 1))
+            if compressed > sampled * (1 - self.min_saving):
+                return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, self.level
+
+    def _samples(self, data):
+        size = asset_size(data)
+        if size <= self.sample_size * self.samples:
+            return [asset_head(data, size)]
+        # Windows are spread over the body, away from headers at the start
+        last = size - self.sample_size
+        return [
+            asset_window(data, last * (i + 1) // (self.samples + 1), self.sample_size)
+            for i in range(self.samples)
+        ]
+
+    def compress(self, name: str, data: bytes) -> CompressedMember:
+        """
+        Compresses member according to the policy.
+        :param name: name of the member
+        :param data: bytes-like object or `FileAsset` with member content
+        :returns: `CompressedMember`
+        """
+        return compress_member(data, *self.choose(name, data))
+
+
+# Deflates every member with default level
+DEFAULT_COMPRESSION = CompressionPolicy()
+# Stores already compressed PNG images, deflates text files with maximum level
+STORE_PNG_COMPRESSION = CompressionPolicy(
+    stored=('.png',), levels={'.json': 9, '.strings': 9}
+)
+
+
+def _dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (
+        (hour << 11) | (minute << 5) | (second // 2),
+        ((year - 1980) << 9) | (month << 5) | day,
+    )
+
+
+def iter_archive(entries, date_time: tuple = None):
+    """
+    Writes zip archive out of already compressed members, piece by piece.
+    Member sizes are known upfront, so archive can be streamed into
+    non-seekable destinations.
+    :param entries: iterable of (name, `CompressedMember`) pairs
+    :param date_time: (optional) (year, month, day, hour, minute, second) stamped on
+    every member, defaults to current local time just like `ZipFile.writestr`
+    :returns: iterator of bytes-like objects which concatenated make the archive
+    """
+    dostime, dosdate = _dos_date_time(date_time or time.localtime()[:6])
+    central_directory = []
+    offset = 0
+
+    for name, member in entries:
+        encoded_name, flag_bits = _encode_name(name)
+        compress_size = asset_size(member.data)
+        if max(compress_size, member.file_size, offset) > _ZIP_LIMIT:
+            raise zipfile.LargeZipFile('Archive would require ZIP64 extensions')
+
+        header = _LOCAL_FILE_HEADER.pack(
+            zipfile.stringFileHeader, _VERSION, 0, flag_bits, member.compress_type,
+            dostime, dosdate, member.crc, compress_size, member.file_size,
+            len(encoded_name), 0,
+        )
+        yield header + encoded_name
+        yield from iter_asset(member.data)
+
+        central_directory.append(_CENTRAL_DIRECTORY.pack(
+            zipfile.stringCentralDir, _VERSION, _CREATE_SYSTEM, _VERSION, 0, flag_bits,
+            member.compress_type, dostime, dosdate, member.crc, compress_size,
+            member.file_size, len(encoded_name), 0, 0, 0, 0, _EXTERNAL_ATTR, offset,
+        ) + encoded_name)
+        offset += len(header) + len(encoded_name) + compress_size
+
+    count = len(central_directory)
+    if count > _ZIP_FILECOUNT_LIMIT or offset > _ZIP_LIMIT:
+        raise zipfile.LargeZipFile('Archive would require ZIP64 extensions')
+    central_directory = b''.join(central_directory)
+    yield central_directory
+    yield _END_OF_ARCHIVE.pack(
+        zipfile.stringEndArchive, 0, 0, count, count, len(central_directory), offset, 0,
+    )
+
+
+def _encode_name(name: str):
+    try:
+        return name.encode('ascii'), 0
+    except UnicodeEncodeError:
+        return name.encode('utf-8'), _UTF8_FLAG
+
+
+def archive_overhead(names) -> int:
+    """
+    :param names: names of archive members
+    :returns: size in bytes of zip structures written by `iter_archive()` for members
+    of given names, i.e. size of the archive without member contents
+    """
+    size = _END_OF_ARCHIVE.size
+    for name in names:
+        encoded_name, _ = _encode_name(name)
+        size += _LOCAL_FILE_HEADER.size + _CENTRAL_DIRECTORY.size + 2 * len(encoded_name)
+    return size
+
+
+def rechunk(pieces, chunk_size: int):
+    """
+    Regroups bytes-like pieces into `bytes` chunks of `chunk_size`, last chunk
+    may be shorter.
+    :param pieces: iterable of bytes-like objects
+    :param chunk_size: size of yielded chunks in bytes
+    """
+    if chunk_size < 1:
+        raise ValueError('Chunk size must be a positive number.')
+    buffer = bytearray()
+    for piece in pieces:
+        view = memoryview(piece)
+        while view:
+            taken = chunk_size - len(buffer)
+            if not buffer and len(view) >= chunk_size:
+                yield bytes(view[:chunk_size])
+            else:
+                buffer += view[:taken]
+                if len(buffer) < chunk_size:
+                    break
+                yield bytes(buffer)
+                buffer.clear()
+            view = view[taken:]
+    if buffer:
+        yield bytes(buffer)
+
+
+class ArchivedAsset(LazyAsset):
+    """
+    Asset read from existing archive, kept as its compressed zip member and
+    decompressed in chunks on demand.
+    """
+
+    def __init__(self, member: CompressedMember, chunk_size: int = 256 * 1024):
+        self.member = member
+        self.size = member.file_size
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        member, size = self.member, self.chunk_size
+        if member.compress_type == zipfile.ZIP_STORED:
+            yield from iter_asset(member.data)
+            return
+        decompressor = zlib.decompressobj(-15)
+        view = memoryview(member.data)
+        for offset in range(0, len(view), size):
+            chunk = decompressor.decompress(view[offset:offset + size])
+            if chunk:
+                yield chunk
+        chunk = decompressor.flush()
+        if chunk:
+            yield chunk
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(file_size={self.size})'
+
+
+def read_members(fileobj):
+    """
+    Reads members of zip archive without decompressing them.
+    :param fileobj: seekable binary file-like object with zip archive
+    :returns: iterator of (`zipfile.ZipInfo`, `CompressedMember`) pairs;
+    members compressed with methods other than stored and deflated, or encrypted,
+    are decompressed and returned as stored members
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) \
+                    and not info.flag_bits & 0x1:
+                fileobj.seek(info.header_offset)
+                header = _LOCAL_FILE_HEADER.unpack(fileobj.read(_LOCAL_FILE_HEADER.size))
+                if header[0] != zipfile.stringFileHeader:
+                    raise zipfile.BadZipFile(f'Bad local file header of {info.filename!r}')
+                fileobj.seek(header[10] + header[11], io.SEEK_CUR)
+                data = fileobj.read(info.compress_size)
+                yield info, CompressedMember(data, info.CRC, info.file_size, info.compress_type)
+            else:
+                data = archive.read(info)
+                yield info, CompressedMember(data, info.CRC, info.file_size, zipfile.ZIP_STORED)
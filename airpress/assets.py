@@ -0,0 +1,162 @@
+import abc
+import mmap
+import os
+from hashlib import sha1
+
+# Types of in-memory assets, read directly through buffer protocol without copying
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+class LazyAsset(abc.ABC):
+    """
+    Asset whose content is produced in chunks on demand instead of being held in memory.
+    Subclasses set `size` and implement `__iter__`.
+    """
+    size = 0
+
+    @abc.abstractmethod
+    def __iter__(self):
+        """Yields asset content in chunks"""
+
+    def read(self, size: int = -1, offset: int = 0) -> bytes:
+        """
+        :param size: (optional) number of bytes to read, reads the rest of the asset
+        by default
+        :param offset: (optional) position in the asset to read from
+        :returns: bytes object with asset content
+        """
+        content = bytearray()
+        skipped = 0
+        for chunk in self:
+            if skipped < offset:
+                skipped += len(chunk)
+                if skipped <= offset:
+                    continue
+                chunk = memoryview(chunk)[len(chunk) - (skipped - offset):]
+            content += chunk
+            if 0 <= size <= len(content):
+                break
+        return bytes(content if size < 0 else content[:size])
+
+    def __bytes__(self):
+        return self.read()
+
+
+class FileAsset(LazyAsset):
+    """
+    Lazy reference to asset stored in a file.
+    File is read in chunks whenever asset is hashed or compressed, so its content is
+    never held in memory as a whole. File must not change while it's part of pass package.
+    """
+
+    def __init__(self, path, chunk_size: int = 256 * 1024):
+        """
+        :param path: path of the file
+        :param chunk_size: size of chunks file is read in
+        """
+        self.path = os.fspath(path)
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(self.path)
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                yield chunk
+
+    def read(self, size: int = -1, offset: int = 0) -> bytes:
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(size)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.path!r})'
+
+
+def read_file(path) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def is_asset(data) -> bool:
+    return isinstance(data, BUFFER_TYPES + (LazyAsset,))
+
+
+def find_equal_asset(data, candidates):
+    """
+    Looks for asset with the same content as `data`, only assets of the same size are
+    compared byte by byte; file assets are equal when they refer to the same path.
+    :param data: bytes-like object or `FileAsset`
+    :param candidates: iterable of assets
+    :returns: first of `candidates` with the same content as `data`, or `data` itself
+    """
+    if not is_asset(data):
+        return data
+    size = asset_size(data)
+    for current in candidates:
+        if current is data:
+            return current
+        if not is_asset(current) or asset_size(current) != size:
+            continue
+        if isinstance(data, FileAsset) and isinstance(current, FileAsset):
+            if current.path == data.path:
+                return current
+        elif isinstance(data, BUFFER_TYPES) and isinstance(current, BUFFER_TYPES):
+            if memoryview(current).cast('B') == memoryview(data).cast('B'):
+                return current
+    return data
+
+
+def as_buffer(data):
+    """
+    Makes sure buffer is indexed by bytes, multi-dimensional or typed memoryviews
+    are cast to one-dimensional view of bytes.
+    """
+    if isinstance(data, memoryview) and (data.ndim != 1 or data.itemsize != 1):
+        return data.cast('B')
+    return data
+
+
+def asset_size(data) -> int:
+    if isinstance(data, bytes):
+        return len(data)
+    if isinstance(data, LazyAsset):
+        return data.size
+    return memoryview(data).nbytes
+
+
+def iter_asset(data):
+    """
+    :returns: iterator of bytes-like chunks of asset content, in-memory
+    assets are returned as a single chunk
+    """
+    if isinstance(data, LazyAsset):
+        return iter(data)
+    return iter((data,))
+
+
+def asset_head(data, size: int):
+    """
+    :returns: bytes-like object with first `size` bytes of asset
+    """
+    return asset_window(data, 0, size)
+
+
+def asset_window(data, offset: int, size: int):
+    """
+    :returns: bytes-like object with `size` bytes of asset starting at `offset`
+    """
+    if isinstance(data, LazyAsset):
+        return data.read(size, offset)
+    return as_buffer(memoryview(data))[offset:offset + size]
+
+
+def asset_sha1(data) -> str:
+    """
+    :returns: SHA-1 hex digest of asset content
+    """
+    if isinstance(data, LazyAsset):
+        digest = sha1()
+        for chunk in data:
+            digest.update(chunk)
+        return digest.hexdigest()
+    return sha1(data).hexdigest()
@@ -0,0 +1,136 @@
+import collections
+import collections.abc
+import functools
+import itertools
+import multiprocessing
+import os
+import pickle
+
+from .compressor import PKPass
+
+BuildResult = collections.namedtuple('BuildResult', ('index', 'archive', 'error'))
+BuildResult.__doc__ = """
+Outcome of building a single pass in a batch.
+`archive` holds signed `.pkpass` bytes when build succeeded, otherwise
+`error` holds exception that made it fail.
+"""
+
+# Signer loaded once per worker process by `_init_worker`
+_worker_signer = None
+
+
+def _init_worker(signer):
+    global _worker_signer
+    _worker_signer = signer
+
+
+def _build(spec, signer, validate=True) -> bytes:
+    """
+    Creates, signs and compresses single pass from its spec.
+    :param spec: `dict` mapping asset names to `bytes`, or iterable of
+    (name, data) pairs, same as `PKPass` positional arguments
+    """
+    assets = spec.items() if isinstance(spec, collections.abc.Mapping) else spec
+    p = PKPass(*assets, validate=validate)
+    p.sign(signer=signer)
+    return bytes(p)
+
+
+def picklable_error(error):
+    """
+    :returns: `error` itself, or its `repr()` wrapped in `Exception` when it can't be
+    pickled, so it can be sent back from worker process
+    """
+    try:
+        pickle.dumps(error)
+    except Exception:
+        return Exception(repr(error))
+    return error
+
+
+def _build_chunk(chunk, validate=True, signer=None):
+    signer = signer or _worker_signer
+    results = []
+    for index, spec in chunk:
+        try:
+            results.append(BuildResult(index, _build(spec, signer, validate), None))
+        except Exception as e:
+            results.append(BuildResult(index, None, picklable_error(e)))
+    return results
+
+
+def chunked(iterable, size: int):
+    """
+    :returns: iterator of lists of up to `size` consecutive items of `iterable`
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap_ordered(func, chunks, workers, initializer=None, initargs=(), window=None):
+    """
+    Runs `func` over chunks of work in a pool of processes and yields its results in
+    input order. Unlike `Pool.imap` only `window` chunks are in flight at any time,
+    so input can be an arbitrarily long (lazy) iterable.
+    :param func: picklable callable receiving one chunk and returning list of results
+    :param chunks: iterable of chunks
+    :param workers: number of worker processes
+    :param initializer: (optional) callable run once in every worker process
+    :param initargs: arguments for `initializer`
+    :param window: (optional) maximum number of submitted but not yet consumed chunks;
+    defaults to four chunks per worker
+    """
+    window = window or workers * 4
+    pool = multiprocessing.Pool(workers, initializer=initializer, initargs=initargs)
+    try:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(func, (chunk,)))
+            if len(pending) >= window:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def build_many(templates, signer, workers: int = None, chunksize: int = 16,
+               validate: bool = True):
+    """
+    Creates, signs and compresses many passes in parallel.
+    Work is distributed between worker processes which load `signer` credentials
+    once, when they start.
+    Failure of a single pass doesn't stop the batch, exception is
+    reported in `BuildResult.error` of that pass instead.
+    :param templates: iterable of pass specs, each being a `dict` mapping asset
+    names to `bytes` or an iterable of (name, data) pairs
+    :param signer: `PassSigner` instance, it has to be picklable
+    :param workers: number of worker processes, defaults to number of CPUs;
+    `0` builds passes in current process
+    :param chunksize: number of passes sent to worker at once
+    :param validate: decides whether to check if asset names are on the list
+    of allowed assets
+    :returns: iterator of `BuildResult` in the same order as `templates`
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = chunked(enumerate(templates), chunksize)
+
+    if not workers:
+        for chunk in chunks:
+            yield from _build_chunk(chunk, validate, signer)
+        return
+
+    yield from imap_ordered(
+        functools.partial(_build_chunk, validate=validate),
+        chunks,
+        workers,
+        initializer=_init_worker,
+        initargs=(signer,),
+    )
@@ -0,0 +1,126 @@
+import time
+import zipfile
+import zlib
+
+from .archive import CompressedMember, iter_archive, rechunk
+from .assets import BUFFER_TYPES, LazyAsset
+
+# MIME type of `.pkpasses` bundles
+PKPASSES_MIME_TYPE = 'application/vnd.apple.pkpasses'
+
+
+class _ArchivePieces(LazyAsset):
+    """Inner `.pkpass` archive produced piece by piece every time it's iterated"""
+
+    def __init__(self, pkpass, date_time):
+        self.pkpass = pkpass
+        self.date_time = date_time
+        crc = 0
+        for piece in self:
+            crc = zlib.crc32(piece, crc)
+            self.size += len(piece) if isinstance(piece, bytes) else memoryview(piece).nbytes
+        self.crc = crc
+
+    def __iter__(self):
+        return self.pkpass.iter_pieces(self.date_time)
+
+
+class PassBundle:
+    """
+    Multi-pass `.pkpasses` archive, e.g. all tickets of one order.
+    Inner `.pkpass` archives are stored uncompressed. Every inner archive is produced
+    twice: first to compute its CRC and size, then to stream it into the bundle, so
+    none of them is ever held in memory as a whole. Passes created from the same
+    `PassTemplate` share digests and compressed members of template assets.
+    """
+
+    def __init__(self, *passes, signer=None):
+        """
+        :param passes: arbitrary number of `PKPass` instances or (name, `PKPass`) pairs;
+        passes without name are named `pass-<number>.pkpass`
+        :param signer: (optional) `PassSigner` instance (or any object with `.sign(data)`
+        method) every pass is signed with when bundle is written; passes have to be
+        signed upfront otherwise
+        """
+        self.signer = signer
+        self.__passes = []
+        for item in passes:
+            if isinstance(item, tuple):
+                self.add(item[1], item[0])
+            else:
+                self.add(item)
+
+    @classmethod
+    def from_template(cls, template, passes, signer=None, **kwargs):
+        """
+        Creates bundle of passes made of the same template.
+        :param template: `PassTemplate` instance
+        :param passes: iterable of `pass.json` bytes-like objects or iterables of pass
+        specific assets, same as `PassTemplate.new_pass()` positional arguments
+        :param signer: (optional) see `PassBundle.__init__()`
+        :param kwargs: keyword arguments passed to `PassTemplate.new_pass()`
+        :returns: `PassBundle` instance
+        """
+        bundle = cls(signer=signer)
+        for assets in passes:
+            if isinstance(assets, BUFFER_TYPES):
+                assets = [('pass.json', assets)]
+            bundle.add(template.new_pass(*assets, **kwargs))
+        return bundle
+
+    def add(self, pkpass, name: str = None) -> None:
+        """
+        :param pkpass: `PKPass` instance
+        :param name: (optional) name of the pass inside bundle, must end with `.pkpass`
+        """
+        name = name or f'pass-{len(self.__passes) + 1}.pkpass'
+        assert name.endswith('.pkpass'), f'Pass name `{name}` must end with `.pkpass`.'
+        assert name not in self.names, f'Bundle already contains `{name}`.'
+        self.__passes.append((name, pkpass))
+
+    @property
+    def names(self) -> list:
+        return [name for name, _ in self.__passes]
+
+    def __len__(self):
+        return len(self.__passes)
+
+    def __bytes__(self):
+        return b''.join(self.iter_pieces())
+
+    def write_to(self, fileobj) -> int:
+        """
+        Streams `.pkpasses` archive into file-like object, destination doesn't have
+        to be seekable.
+        :param fileobj: object with `.write()` method accepting bytes-like objects
+        :returns: number of bytes written
+        """
+        written = 0
+        for piece in self.iter_pieces():
+            fileobj.write(piece)
+            written += len(piece)
+        return written
+
+    def iter_chunks(self, chunk_size: int = 64 * 1024):
+        """
+        :param chunk_size: size of chunks in bytes, last chunk may be shorter
+        :returns: iterator of `bytes` chunks of `.pkpasses` archive
+        """
+        return rechunk(self.iter_pieces(), chunk_size)
+
+    def iter_pieces(self, date_time: tuple = None):
+        """
+        :param date_time: (optional) (year, month, day, hour, minute, second) stamped on
+        members of bundle and of its passes, defaults to current local time
+        :returns: iterator of bytes-like objects which concatenated make the archive
+        """
+        assert self.__passes, 'Bundle must contain at least one pass.'
+        date_time = date_time or time.localtime()[:6]
+        return iter_archive(self.__entries(date_time), date_time)
+
+    def __entries(self, date_time):
+        for name, pkpass in self.__passes:
+            if self.signer is not None:
+                pkpass.sign(signer=self.signer)
+            pieces = _ArchivePieces(pkpass, date_time)
+            yield name, CompressedMember(pieces, pieces.crc, pieces.size, zipfile.ZIP_STORED)
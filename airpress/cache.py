@@ -0,0 +1,184 @@
+import collections
+import os
+import tempfile
+import threading
+import time
+
+CacheStats = collections.namedtuple(
+    'CacheStats', ('hits', 'disk_hits', 'misses', 'entries', 'size', 'max_size')
+)
+CacheStats.__doc__ = """
+Counters of `ArchiveCache`. `hits` include `disk_hits`, `entries` and `size` describe
+the in-memory tier.
+"""
+
+
+class ArchiveCache:
+    """
+    Cache of finished, signed `.pkpass` archives keyed by SHA-1 digest of their manifest.
+    Manifest covers every asset of the pass, so unchanged pass is served from cache
+    without signing and compression. In-memory tier keeps most recently used archives
+    within memory budget, optional on-disk tier keeps every archive written to the cache
+    and can be shared by many processes. With `ttl` expired archives are swept from disk
+    by `.put()` every `ttl / 2` seconds.
+    Signature is not part of the key, use separate cache for every set of credentials.
+    """
+
+    def __init__(self, max_size: int = 64 * 1024 * 1024, directory: str = None,
+                 ttl: float = None):
+        """
+        :param max_size: memory budget of in-memory tier in bytes
+        :param directory: (optional) directory of on-disk tier
+        :param ttl: (optional) number of seconds after which archives expire,
+        in both tiers; archives never expire by default
+        """
+        self.max_size = max_size
+        self.directory = directory
+        self.ttl = ttl
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._last_sweep = 0.0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                self._hits, self._disk_hits, self._misses,
+                len(self._entries), self._size, self.max_size,
+            )
+
+    def get(self, key: str):
+        """
+        :param key: manifest digest, e.g. `PKPass.manifest_digest`
+        :returns: cached archive or `None`
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, archive = entry
+                if self.ttl is None or now - created < self.ttl:
+                    self._hits += 1
+                    self._entries.move_to_end(key)
+                    return archive
+                self._remove(key)
+
+        archive, created = self._read(key, now)
+        with self._lock:
+            if archive is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._disk_hits += 1
+            self._store(key, archive, created)
+        return archive
+
+    def put(self, key: str, archive: bytes) -> None:
+        """
+        :param key: manifest digest, e.g. `PKPass.manifest_digest`
+        :param archive: signed `.pkpass` archive
+        """
+        created = time.time()
+        with self._lock:
+            self._store(key, archive, created)
+            sweep = self.ttl is not None and created - self._last_sweep >= self.ttl / 2
+            if sweep:
+                self._last_sweep = created
+        if self.directory is not None:
+            self._write(key, archive)
+            if sweep:
+                self.sweep()
+
+    def build(self, pkpass, **kwargs) -> bytes:
+        """
+        Returns archive of pass from cache, signing and compressing it only if it's
+        not cached yet.
+        :param pkpass: `PKPass` instance
+        :param kwargs: keyword arguments passed to `PKPass.sign()`
+        :returns: bytes object with signed `.pkpass`
+        """
+        key = pkpass.manifest_digest
+        archive = self.get(key)
+        if archive is None:
+            pkpass.sign(**kwargs)
+            archive = bytes(pkpass)
+            self.put(key, archive)
+        return archive
+
+    def sweep(self) -> int:
+        """
+        Removes expired archives, and temporary files left by interrupted writes,
+        from on-disk tier.
+        :returns: number of removed files
+        """
+        if self.directory is None or self.ttl is None:
+            return 0
+        now = time.time()
+        removed = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(('.pkpass', '.tmp')):
+                    continue
+                try:
+                    if now - entry.stat().st_mtime >= self.ttl:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    # Removed or replaced by another process meanwhile
+                    pass
+        return removed
+
+    def clear(self) -> None:
+        """Clears in-memory tier, on-disk tier is left intact"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _store(self, key, archive, created):
+        if len(archive) > self.max_size:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (created, archive)
+        self._size += len(archive)
+        while self._size > self.max_size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _remove(self, key):
+        _, archive = self._entries.pop(key)
+        self._size -= len(archive)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.pkpass')
+
+    def _read(self, key, now):
+        if self.directory is None:
+            return None, None
+        path = self._path(key)
+        try:
+            created = os.path.getmtime(path)
+            if self.ttl is not None and now - created >= self.ttl:
+                os.remove(path)
+                return None, None
+            with open(path, 'rb') as f:
+                return f.read(), created
+        except OSError:
+            return None, None
+
+    def _write(self, key, archive):
+        # Written to temporary file first, so other processes never read partial archive
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(archive)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
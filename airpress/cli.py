@@ -0,0 +1,372 @@
+"""
+Command-line bulk generator of passes.
+
+    airpress ./template --cert cert.pem --key key.pem --data passes.csv --output ./passes
+
+Every file of template directory is added to every pass, `pass.json` of template is
+merged with a record of per-pass data. Records are read from CSV, where nested keys are
+dotted column names (`barcodes.0.message`), or from JSON Lines.
+"""
+import argparse
+import csv
+import functools
+import io
+import itertools
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+
+from .assets import read_file
+from .batch import chunked, imap_ordered, picklable_error
+from .compressor import WWDR_CA
+from .crypto import KEY_PASSWORD_ENV, PassSigner, read_key_password
+from .template import PassTemplate
+
+# Template and signer loaded once per worker process by `_init_worker`
+_worker_state = None
+
+# Offset of central directory stored in front of its copy, see `ArchiveOutput`
+_TAIL_OFFSET = struct.Struct('<Q')
+
+
+def read_assets(directory) -> list:
+    """
+    :returns: list of (name, bytes) pairs of every file in `directory` and its
+    subdirectories, names are relative paths with `/` separators
+    """
+    assets = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.startswith('.'):
+                continue
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, directory).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                assets.append((name, f.read()))
+    return assets
+
+
+def read_records(fileobj, format: str):
+    """
+    :param fileobj: text file object with CSV or JSON Lines data
+    :param format: `'csv'` or `'jsonl'`
+    :returns: iterator of `dict` records
+    """
+    if format == 'csv':
+        for row in csv.DictReader(fileobj):
+            yield expand_keys({key: value for key, value in row.items() if value})
+        return
+    for line in fileobj:
+        if line.strip():
+            yield json.loads(line)
+
+
+def expand_keys(flat: dict) -> dict:
+    """
+    Turns dotted keys into nested objects, e.g. `{'a.b': 1}` into `{'a': {'b': 1}}`.
+    """
+    nested = {}
+    for key, value in flat.items():
+        *parents, last = key.split('.')
+        node = nested
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[last] = value
+    return nested
+
+
+def merge(document, updates):
+    """
+    :returns: copy of JSON `document` with `updates` merged into it; objects are merged
+    recursively, objects with numeric keys update items of arrays
+    """
+    if isinstance(document, list) and isinstance(updates, dict) \
+            and all(key.isdigit() for key in updates):
+        merged = list(document)
+        for key, value in updates.items():
+            index = int(key)
+            assert index < len(merged), f'Index {index} is out of range of array.'
+            merged[index] = merge(merged[index], value)
+        return merged
+    if isinstance(document, dict) and isinstance(updates, dict):
+        merged = dict(document)
+        for key, value in updates.items():
+            merged[key] = merge(document[key], value) if key in document else value
+        return merged
+    return updates
+
+
+def _init_worker(directory, signer, validate):
+    global _worker_state
+    assets = read_assets(directory)
+    base = json.loads(dict(assets).get('pass.json', b'{}'))
+    template = PassTemplate(*(a for a in assets if a[0] != 'pass.json'), validate=validate)
+    _worker_state = (template, base, signer, validate)
+
+
+def _build_chunk(chunk):
+    """
+    :returns: list of (index, pass.json document, archive, error) tuples
+    """
+    template, base, signer, validate = _worker_state
+    results = []
+    for index, record in chunk:
+        document = None
+        try:
+            document = merge(base, record)
+            pass_json = json.dumps(document, ensure_ascii=False).encode('utf8')
+            p = template.new_pass(('pass.json', pass_json), validate=validate)
+            p.sign(signer=signer)
+            results.append((index, document, bytes(p), None))
+        except Exception as e:
+            results.append((index, document, None, picklable_error(e)))
+    return results
+
+
+def build_records(directory, records, signer, workers: int = 0, chunksize: int = 16,
+                  validate: bool = True):
+    """
+    Builds pass for every record, template and credentials are loaded once per worker.
+    :param directory: template directory
+    :param records: iterable of (index, record) pairs
+    :param signer: `PassSigner` instance
+    :param workers: number of worker processes, `0` builds passes in current process
+    :returns: iterator of (index, pass.json document, archive, error) tuples in input order
+    """
+    initargs = (directory, signer, validate)
+    chunks = chunked(records, chunksize)
+    if not workers:
+        _init_worker(*initargs)
+        for chunk in chunks:
+            yield from _build_chunk(chunk)
+        return
+    yield from imap_ordered(
+        _build_chunk, chunks, workers, initializer=_init_worker, initargs=initargs
+    )
+
+
+def pass_filename(document, index: int, key: str) -> str:
+    value = document.get(key) if isinstance(document, dict) else None
+    name = str(value) if value not in (None, '') else str(index)
+    return name.replace('/', '_').replace(os.sep, '_') + '.pkpass'
+
+
+def _duplicate(filename):
+    return FileExistsError(f'Pass {filename!r} was already written by another record.')
+
+
+class DirectoryOutput:
+    """
+    Writes every pass to a separate file of `directory`.
+    `FileExistsError` is raised for a pass named like one written before in this run.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._names = set()
+
+    def write(self, filename, archive):
+        if filename in self._names:
+            raise _duplicate(filename)
+        self._names.add(filename)
+        # Written to temporary file first, so crash never leaves partial pass behind
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(archive)
+        os.replace(temporary, os.path.join(self.directory, filename))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ArchiveOutput:
+    """
+    Appends every pass to a single zip archive. Central directory is written on every
+    `.flush()` and a copy of it is kept in `<path>.tail`: passes appended afterwards
+    overwrite central directory in the archive, so after a crash the archive is restored
+    from that copy to its state at the last checkpoint.
+    `FileExistsError` is raised for a pass named like one written before in this run,
+    passes already in resumed archive are skipped.
+    """
+
+    def __init__(self, path, resume: bool = False):
+        self.path = path
+        self._tail_path = path + '.tail'
+        if resume and os.path.exists(path):
+            self._restore()
+            self._archive = zipfile.ZipFile(path, 'a')
+        else:
+            self._archive = zipfile.ZipFile(path, 'w')
+            self._remove_tail()
+        self._resumed = set(self._archive.namelist())
+        self._names = set()
+
+    def write(self, filename, archive):
+        if filename in self._names:
+            raise _duplicate(filename)
+        self._names.add(filename)
+        if filename in self._resumed:
+            # Written before crash but after last checkpoint
+            return
+        # `.pkpass` archives are already compressed
+        self._archive.writestr(filename, archive, zipfile.ZIP_STORED)
+
+    def flush(self):
+        self._archive.close()
+        self._archive = zipfile.ZipFile(self.path, 'a')
+        # Reopened archive writes next member where its central directory starts
+        offset = self._archive.start_dir
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                         suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_TAIL_OFFSET.pack(offset) + tail)
+        os.replace(temporary, self._tail_path)
+
+    def close(self):
+        self._archive.close()
+        self._remove_tail()
+
+    def _restore(self):
+        try:
+            with open(self._tail_path, 'rb') as f:
+                offset, = _TAIL_OFFSET.unpack(f.read(_TAIL_OFFSET.size))
+                tail = f.read()
+        except FileNotFoundError:
+            # Archive was closed cleanly
+            return
+        with open(self.path, 'r+b') as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(tail)
+
+    def _remove_tail(self):
+        try:
+            os.remove(self._tail_path)
+        except FileNotFoundError:
+            pass
+
+
+def read_checkpoint(path) -> tuple:
+    """
+    :returns: (done, failed) pair of numbers of records already processed and of those
+    which failed, `(0, 0)` when there's no checkpoint
+    """
+    if not path or not os.path.exists(path):
+        return 0, 0
+    with open(path) as f:
+        checkpoint = json.load(f)
+    return checkpoint['done'], checkpoint.get('failed', 0)
+
+
+def write_checkpoint(path, done: int, failed: int = 0) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'done': done, 'failed': failed}, f)
+    os.replace(temporary, path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='airpress', description='Creates signed `.pkpass` archives in bulk.'
+    )
+    parser.add_argument('template', help='directory with assets shared by every pass')
+    parser.add_argument('--cert', required=True, help='PEM encoded Pass Type ID certificate')
+    parser.add_argument('--key', required=True, help='PEM encoded private key')
+    parser.add_argument('--password-file',
+                        help=f'file with password of private key, read from {KEY_PASSWORD_ENV} '
+                             'environment variable by default')
+    parser.add_argument('--wwdr', help='DER encoded WWDR certificate, bundled one by default')
+    parser.add_argument('--data', required=True,
+                        help='CSV or JSON Lines file with per-pass data, `-` reads stdin')
+    parser.add_argument('--format', choices=('csv', 'jsonl'),
+                        help='format of data, guessed from file extension by default')
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--output', help='directory every pass is written to')
+    output.add_argument('--output-archive', help='zip archive every pass is written to')
+    parser.add_argument('--name-key', default='serialNumber',
+                        help='key of pass.json passes are named after')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of worker processes, `0` builds passes in this process')
+    parser.add_argument('--chunksize', type=int, default=16,
+                        help='number of passes sent to worker at once')
+    parser.add_argument('--checkpoint', help='progress file used to resume interrupted run')
+    parser.add_argument('--interval', type=float, default=5.0,
+                        help='seconds between checkpoints and progress reports')
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help="don't check asset names")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    signer = PassSigner(
+        read_file(args.cert), read_file(args.key),
+        read_file(args.wwdr) if args.wwdr else WWDR_CA, read_key_password(args.password_file),
+    )
+
+    data_format = args.format or ('csv' if args.data.endswith('.csv') else 'jsonl')
+    if args.data == '-':
+        data = io.TextIOWrapper(sys.stdin.buffer, encoding='utf8', newline='')
+    else:
+        data = open(args.data, encoding='utf8', newline='')
+
+    skipped, skipped_failed = read_checkpoint(args.checkpoint)
+    records = itertools.islice(enumerate(read_records(data, data_format)), skipped, None)
+    if args.output:
+        output = DirectoryOutput(args.output)
+    else:
+        output = ArchiveOutput(args.output_archive, resume=skipped > 0)
+
+    report = functools.partial(print, file=sys.stderr, flush=True)
+    if skipped:
+        report(f'Resuming after {skipped} records.')
+
+    done, failed = skipped, skipped_failed
+    started = last_checkpoint = time.perf_counter()
+
+    def checkpoint():
+        output.flush()
+        if args.checkpoint:
+            write_checkpoint(args.checkpoint, done, failed)
+        elapsed = time.perf_counter() - started
+        report(f'{done} records, {failed} failed, {(done - skipped) / elapsed:.1f} passes/s')
+
+    try:
+        results = build_records(
+            args.template, records, signer, args.workers, args.chunksize, args.validate
+        )
+        for index, document, archive, error in results:
+            if error is None:
+                try:
+                    output.write(pass_filename(document, index, args.name_key), archive)
+                except FileExistsError as e:
+                    error = e
+            if error is not None:
+                failed += 1
+                report(f'Record {index} failed: {error!r}')
+            done = index + 1
+            if time.perf_counter() - last_checkpoint >= args.interval:
+                checkpoint()
+                last_checkpoint = time.perf_counter()
+        checkpoint()
+    finally:
+        output.close()
+        data.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,18 @@
 import io
 import json
-import zipfile
+import os
+import re
+import time
 from hashlib import sha1
+from types import MappingProxyType
 
-from .crypto import pkcs7_sign
+from .archive import (
+    DEFAULT_COMPRESSION, DETERMINISTIC_DATE_TIME, ArchivedAsset, iter_archive, read_members, rechunk
+)
+from .assets import BUFFER_TYPES, as_buffer, asset_sha1, asset_size, find_equal_asset, is_asset
+from .crypto import PassSigner
+from .metrics import timed
+from .parallel import DEFAULT_PARALLEL_THRESHOLD, map_ordered, resolve_executor
 
 # Downloaded from: https://www.apple.com/certificateauthority/
 # Certificate URL: https://developer.apple.com/certificationauthority/AppleWWDRCA.cer
@@ -75,6 +84,60 @@ PKPASS_ICONS = (
     'icon@3x.png'
 )
 
+# Assets allowed inside `<language>.lproj/` directories
+LOCALIZABLE_PKPASS_ASSETS = tuple(
+    name for name in ALLOWED_PKPASS_ASSETS if name != 'pass.json'
+) + ('pass.strings',)
+
+# Language code, optionally followed by script and region, e.g. `en`, `pt-BR`, `zh-Hans`
+_LANGUAGE = re.compile(r'[A-Za-z]{2,3}(?:[-_][A-Za-z0-9]{2,8})*')
+
+
+def is_allowed_asset(name: str) -> bool:
+    """
+    :returns: whether asset is on the list of supported assets, either directly or
+    inside `<language>.lproj/` directory
+    """
+    if name in ALLOWED_PKPASS_ASSETS:
+        return True
+    directory, _, filename = name.partition('/')
+    return (
+        directory.endswith('.lproj')
+        and _LANGUAGE.fullmatch(directory[:-len('.lproj')]) is not None
+        and filename in LOCALIZABLE_PKPASS_ASSETS
+    )
+
+
+def validate_asset(name, data, validate=True) -> None:
+    """
+    Checks whether asset can be added to pass package.
+    :param name: name of the asset
+    :param data: bytes-like object (`bytes`, `bytearray`, `memoryview`, `mmap`)
+    or `FileAsset` with file content
+    :param validate: decides whether to check if supplied filename is on the list
+    of allowed assets
+    """
+    if not isinstance(name, str):
+        raise TypeError(f'{name!r} is not a string.')
+    if validate:
+        assert is_allowed_asset(name), (
+            f'{name!r} is not on a list of supported pkpass assets: '
+            f'{ALLOWED_PKPASS_ASSETS}, or {LOCALIZABLE_PKPASS_ASSETS} inside '
+            '`<language>.lproj/` directory.\nTo add this file explicitly call '
+            '`add_to_pass_package` with `validate=False` to disable validation.'
+        )
+    if not is_asset(data):
+        raise TypeError(f'{name!r} is not a bytes-like object or `FileAsset`.')
+    assert asset_size(data), f'{name!r} cannot be empty.'
+
+
+def _read_members(fileobj) -> dict:
+    return {info.filename: member for info, member in read_members(fileobj)}
+
+
+# Members written after all assets of the pass
+_TRAILING_MEMBERS = ('manifest.json', 'signature')
+
 
 class PKPass:
     """
@@ -89,40 +152,155 @@ class PKPass:
                  key: bytes = b'',
                  cert: bytes = b'',
                  password: bytes = b'',
-                 validate: bool = True):
+                 validate: bool = True,
+                 template=None,
+                 compression=None,
+                 observer=None,
+                 store=None,
+                 deterministic: bool = False,
+                 executor=None,
+                 parallel_threshold: int = DEFAULT_PARALLEL_THRESHOLD,
+                 optimizer=None):
 
         self.__assets = dict()
+        # Caches of asset digests and compressed zip members, both keyed by asset name
+        self.__digests = dict()
+        self.__members = dict()
+        # Serialized `.manifest`, `None` until requested or after pass package changes
+        self.__manifest = None
+        # (manifest, credentials, signature) of the most recent signing
+        self.__signed = None
+        # `PassObserver` receiving instrumentation events, disabled when `None`
+        self.observer = observer
+        # `AssetStore` shared with other passes, assets are kept privately when `None`
+        if store is None and template is not None:
+            store = template.store
+        self.store = store
+        # `PNGOptimizer` images are optimized with when they're added, disabled when `None`
+        if optimizer is None and template is not None:
+            optimizer = template.optimizer
+        self.optimizer = optimizer
+        # Reproducible archives: fixed timestamps and members sorted by name
+        self.deterministic = deterministic
+        # Executor (or `True` for shared thread pool) assets are hashed and compressed on,
+        # used only when there's at least `parallel_threshold` bytes of work at once
+        self.executor = executor
+        self.parallel_threshold = parallel_threshold
         self.key = key
         self.cert = cert
         self.password = password
+        if compression is None:
+            compression = template.compression if template is not None else DEFAULT_COMPRESSION
+        self.__compression = compression
+        if template is not None:
+            self.__assets.update(template.assets)
+            self.__digests.update(template.digests)
+            if compression is template.compression:
+                self.__members.update(template.members)
         self.add_to_pass_package(*assets, validate=validate)
 
+    @classmethod
+    def from_archive(cls, archive, verify: bool = False, validate: bool = False,
+                     **kwargs) -> 'PKPass':
+        """
+        Loads previously created `.pkpass` archive, e.g. to update some of its assets.
+        Assets are kept as compressed zip members and decompressed only when accessed.
+        Unchanged assets are copied into new archive as they are and their digests are
+        taken from `manifest.json`, so only assets that changed are hashed and
+        compressed again. Until pass package changes, its original manifest and
+        signature are used.
+        :param archive: bytes-like object, path or seekable binary file object with
+        `.pkpass` archive
+        :param verify: decides whether to check digests of assets against `manifest.json`
+        instead of trusting it
+        :param validate: decides whether to check if asset names are on the list
+        of allowed assets
+        :param kwargs: keyword arguments passed to `PKPass`
+        :returns: `PKPass` instance
+        """
+        if isinstance(archive, BUFFER_TYPES):
+            members = _read_members(io.BytesIO(archive))
+        elif isinstance(archive, (str, os.PathLike)):
+            with open(archive, 'rb') as f:
+                members = _read_members(f)
+        else:
+            members = _read_members(archive)
+        manifest = members.pop('manifest.json', None)
+        signature = members.pop('signature', None)
+        manifest = ArchivedAsset(manifest).read() if manifest is not None else None
+        digests = json.loads(manifest.decode('utf8')) if manifest is not None else {}
+
+        p = cls(**kwargs)
+        assets = {name: ArchivedAsset(member) for name, member in members.items()}
+        p.add_to_pass_package(*assets.items(), validate=validate)
+        for name, member in members.items():
+            digest = digests.get(name)
+            if verify:
+                assert digest == asset_sha1(assets[name]), (
+                    f'Digest of {name!r} does not match `manifest.json`.'
+                )
+            if digest is not None:
+                p.__digests[name] = digest
+            p.__members[name] = member
+        if signature is not None and set(digests) == set(members):
+            p.__manifest = manifest
+            p._signature = ArchivedAsset(signature).read()
+        return p
+
     def add_to_pass_package(self, *assets, validate=True) -> None:
         """
         Adds/updates asset(s) to pass package.
         Adding asset(s) after pass was signed will delete `._signature` attribute and
-        require to sign it again.
+        require to sign it again. Assets identical to the ones already in pass package
+        are ignored and don't invalidate neither cached digests nor signature.
         :param assets: arbitrary number of pair arguments where element at index [0] is
-        the name of the asset, element at index [1] is `bytes` object with file content
+        the name of the asset, element at index [1] is `bytes` object with file content;
+        other bytes-like objects (`bytearray`, `memoryview`, `mmap`) and `FileAsset`
+        references are used directly without copying and must not change afterwards
         :param validate: decides whether to check if supplied filename is on the list
         of allowed assets
         """
+        observer = self.observer
+        if observer is not None:
+            start = time.perf_counter()
         for name, data in assets:
-            if not isinstance(name, str):
-                raise TypeError(f'{name!r} is not a string.')
-            if validate:
-                assert name in ALLOWED_PKPASS_ASSETS, (
-                    f'{name!r} is not on a list of supported pkpass assets: '
-                    f'{ALLOWED_PKPASS_ASSETS}.\nTo add this file explicitly call '
-                    '`add_to_pass_package` with `validate=False` to disable validation.'
-                )
-            if not isinstance(data, bytes):
-                raise TypeError(f'{name!r} is not a bytes object.')
-            assert data, f'{name!r} cannot be empty.'
+            validate_asset(name, data, validate)
+            data = as_buffer(data)
+            if self.optimizer is not None:
+                data = self.optimizer.optimize(name, data)
+            current = self.__assets.get(name)
+            if current is data or current == data:
+                continue
+            self.__invalidate(name)
+            if self.store is not None:
+                data, self.__digests[name] = self.store.intern(data)
             self.__assets.update({name: data})
+        if observer is not None and assets:
+            observer.on_stage('validate', time.perf_counter() - start)
 
-        if hasattr(self, '_signature'):
-            delattr(self, '_signature')
+    def add_localization(self, language: str, *assets, validate: bool = True) -> None:
+        """
+        Adds/updates assets localized for `language`, stored in `<language>.lproj/`.
+        Asset with the same content as asset already in pass package, e.g. `pass.strings`
+        or image shared by many languages, is replaced with it, so its content is hashed
+        and compressed only once and the zip member is reused under every path.
+        :param language: language code, e.g. `en`, `pt-BR` or `zh-Hans`
+        :param assets: pairs of name (`pass.strings` or image name, e.g. `logo@2x.png`)
+        and content, same as `.add_to_pass_package()` arguments
+        :param validate: decides whether to check if supplied filename is on the list
+        of localizable assets
+        """
+        assert _LANGUAGE.fullmatch(language), f'{language!r} is not a valid language code.'
+        self.add_to_pass_package(*(
+            (f'{language}.lproj/{name}', self.__existing(data)) for name, data in assets
+        ), validate=validate)
+
+    def __existing(self, data):
+        """
+        :returns: asset already in pass package with the same content as `data`,
+        or `data` itself
+        """
+        return find_equal_asset(data, self.__assets.values())
 
     def __setitem__(self, name, data):
         self.add_to_pass_package((name, data))
@@ -132,6 +310,13 @@ class PKPass:
 
     def __delitem__(self, name):
         del self.__assets[name]
+        self.__invalidate(name)
+
+    def __invalidate(self, name):
+        """Drops cached data of changed asset along with manifest and signature"""
+        self.__digests.pop(name, None)
+        self.__members.pop(name, None)
+        self.__manifest = None
         if hasattr(self, '_signature'):
             delattr(self, '_signature')
 
@@ -164,38 +349,113 @@ class PKPass:
         assert value is None or isinstance(value, bytes), 'Password must be None or `bytes` object'
         self.__password = value
 
+    @property
+    def compression(self):
+        """`CompressionPolicy` deciding how archive members are compressed"""
+        return self.__compression
+
+    @compression.setter
+    def compression(self, value):
+        if value is not self.__compression:
+            self.__members.clear()
+        self.__compression = value
+
+    @property
+    def assets(self):
+        """Read-only mapping of asset names to their content"""
+        return MappingProxyType(self.__assets)
+
+    @property
+    def members(self):
+        """
+        Read-only mapping of asset names to `CompressedMember` of assets compressed so far,
+        including the ones inherited from template
+        """
+        return MappingProxyType(self.__members)
+
     @property
     def manifest_dict(self) -> dict:
         """
         Hash values of data stored in `.__assets`.
+        Digests are cached, only assets added since last call are hashed.
         :returns: manifest dictionary
         """
         assert 'pass.json' in self.__assets, 'Pass package must contain `pass.json`'
         if not any(item in self.__assets for item in PKPASS_ICONS):
             msg = f'Pass package must have an icon in at least one resolution: {PKPASS_ICONS}'
             raise AssertionError(msg)
-        return {name: sha1(data).hexdigest() for name, data in self.__assets.items()}
+        digests = self.__digests
+        missing = [name for name in self.__assets if name not in digests]
+        observer = self.observer
+        if observer is not None:
+            start = time.perf_counter()
+        if missing:
+            # The same object stored under many names is hashed once
+            known = {id(self.__assets[name]): digest for name, digest in digests.items()}
+            unique = {}
+            for name in missing:
+                data = self.__assets[name]
+                if id(data) not in known:
+                    unique[id(data)] = data
+            executor = resolve_executor(
+                self.executor, list(unique.values()), self.parallel_threshold
+            )
+            known.update(zip(unique, map_ordered(executor, asset_sha1, unique.values())))
+            for name in missing:
+                digests[name] = known[id(self.__assets[name])]
+        if observer is not None:
+            if missing:
+                observer.on_stage('hash', time.perf_counter() - start)
+            for _ in range(len(self.__assets) - len(missing)):
+                observer.on_cache('digest', True)
+            for _ in missing:
+                observer.on_cache('digest', False)
+        return {name: digests[name] for name in self.__assets}
 
     @property
     def manifest(self) -> bytes:
         """
         PKPass manifest containing `.manifest_dict` dumped
         into json and encoded as bytes object.
+        It's cached until pass package changes.
         :return: bytes object containing manifest.json
         """
-        manifest_json = json.dumps(
-            self.manifest_dict,
-            sort_keys=True,
-            indent=4,
-            ensure_ascii=False,
-            separators=(',', ':')
-        )
-        return bytes(manifest_json, 'utf8')
+        if self.observer is not None:
+            self.observer.on_cache('manifest', self.__manifest is not None)
+        if self.__manifest is None:
+            manifest_json = json.dumps(
+                self.manifest_dict,
+                sort_keys=True,
+                indent=4,
+                ensure_ascii=False,
+                separators=(',', ':')
+            )
+            self.__manifest = bytes(manifest_json, 'utf8')
+        return self.__manifest
+
+    @property
+    def manifest_digest(self) -> str:
+        """
+        SHA-1 hex digest of `.manifest`. Manifest covers every asset of the pass,
+        so digest changes whenever pass content changes.
+        """
+        return sha1(self.manifest).hexdigest()
+
+    @property
+    def etag(self) -> str:
+        """
+        Strong HTTP entity tag of the pass based on `.manifest_digest`.
+        Computing it requires hashing assets only, conditional requests can be
+        answered before pass is signed and compressed.
+        """
+        return f'"{self.manifest_digest}"'
 
     def sign(self, cert: bytes = None, key: bytes = None,
-             wwdr: bytes = WWDR_CA, password: bytes = '') -> bytes:
+             wwdr: bytes = WWDR_CA, password: bytes = '', signer=None) -> bytes:
         """
         Signs `.manifest`.
+        If the same manifest was already signed with the same credentials, e.g. because
+        asset was changed and then reverted, previous signature is reused.
         :param cert: bytes object containing developer certificate
         :param key: bytes object containing developer key
         :param wwdr: bytes object containing wwrd certificate
@@ -204,8 +464,13 @@ class PKPass:
         password this value defaults to `''` instead of `None`,
         this allows to pass `None` as explicitly empty password
         and override value stored in `._password` attribute.
+        :param signer: (optional) `PassSigner` instance (or any object with
+        `.sign(data)` method) with preloaded credentials; when supplied,
+        `cert`, `key`, `wwdr` and `password` are ignored
         :returns: dict object containing manifest signature
         """
+        if signer is not None:
+            return self.__sign_with((signer,), lambda: signer)
 
         cert = cert or self.cert
         key = key or self.key
@@ -218,7 +483,28 @@ class PKPass:
                 'during PKPass initialization, explicitly or as arguments to `.sign()` method.'
             )
             raise AssertionError(msg)
-        self._signature = pkcs7_sign(cert, key, wwdr, self.manifest, password)
+        return self.__sign_with(
+            (cert, key, wwdr, password),
+            lambda: timed(
+                self.observer, 'load_credentials', PassSigner, cert, key, wwdr, password
+            )
+        )
+
+    def __sign_with(self, credentials: tuple, load_signer) -> bytes:
+        manifest = self.manifest
+        observer = self.observer
+        if self.__signed is not None:
+            signed_manifest, signed_with, signature = self.__signed
+            if signed_manifest == manifest and signed_with == credentials:
+                if observer is not None:
+                    observer.on_cache('signature', True)
+                self._signature = signature
+                return signature
+        if observer is not None:
+            observer.on_cache('signature', False)
+        signer = load_signer()
+        self._signature = timed(observer, 'sign', signer.sign, manifest)
+        self.__signed = (manifest, credentials, self._signature)
         return self._signature
 
     @property
@@ -236,6 +522,97 @@ class PKPass:
         """
         return {**self.__assets, 'manifest.json': self.manifest, 'signature': self.signature}
 
+    def __archive_entries(self):
+        """
+        Pairs `.pass_package` items with compressed zip members.
+        Members of assets are compressed once and reused until the asset changes.
+        """
+        members = self.__members
+        observer = self.observer
+        entries = []
+        package = self.pass_package.items()
+        if self.deterministic:
+            # Assets in canonical order, followed by manifest and signature
+            package = sorted(package, key=lambda item: (item[0] in _TRAILING_MEMBERS, item[0]))
+        self.__compress_assets([name for name, _ in package if name in self.__assets])
+        for name, data in package:
+            member = members.get(name)
+            if member is None:
+                member = timed(observer, 'compress', self.__compression.compress, name, data)
+            if observer is not None:
+                observer.on_member(name, member.file_size, len(member.data))
+            entries.append((name, member))
+        return entries
+
+    def __compress_assets(self, names):
+        """
+        Fills member cache with members of `names` assets. Assets with the same content
+        compressed the same way share one member. Missing members are compressed on
+        executor when there's enough work to spread over threads.
+        """
+        members = self.__members
+        observer = self.observer
+        compression = self.__compression
+        # Names to compress, keyed by (digest, compression method)
+        leaders = {}
+        followers = []
+        for name in names:
+            hit = name in members
+            if not hit:
+                data = self.__assets[name]
+                member = self.__same_member(name, data)
+                if member is not None:
+                    members[name] = member
+                    hit = True
+                else:
+                    key = (self.__digests.get(name) or id(data), compression.choose(name, data))
+                    if key in leaders:
+                        followers.append((name, leaders[key]))
+                        hit = True
+                    else:
+                        leaders[key] = name
+            if observer is not None:
+                observer.on_cache('member', hit)
+
+        missing = list(leaders.values())
+        executor = resolve_executor(
+            self.executor, [self.__assets[name] for name in missing], self.parallel_threshold
+        )
+        if executor is None:
+            for name in missing:
+                members[name] = timed(observer, 'compress', self.__compress, name)
+        else:
+            start = time.perf_counter()
+            members.update(zip(missing, map_ordered(executor, self.__compress, missing)))
+            if observer is not None:
+                observer.on_stage('compress', time.perf_counter() - start)
+        for name, leader in followers:
+            members[name] = members[leader]
+
+    def __compress(self, name):
+        data = self.__assets[name]
+        if self.store is not None:
+            return self.store.member(self.__digests[name], name, data, self.__compression)
+        return self.__compression.compress(name, data)
+
+    def __same_member(self, name, data):
+        """
+        :returns: cached member of another asset with the same content, compressed the
+        same way `name` would be, or `None`
+        """
+        digest = self.__digests.get(name)
+        if digest is None:
+            return None
+        method = None
+        for other, member in self.__members.items():
+            if self.__digests.get(other) != digest or other not in self.__assets:
+                continue
+            if method is None:
+                method = self.__compression.choose(name, data)
+            if self.__compression.choose(other, data) == method:
+                return member
+        return None
+
     def __call__(self, *args, **kwargs):
         """Calls __bytes__ method and returns compressed `.pkpass` file"""
         return self.__bytes__()
@@ -247,17 +624,51 @@ class PKPass:
         archive and returned as `bytes` object.
         :returns: bytes object with signed `.pkpass`
         """
+        return timed(self.observer, 'zip', lambda: b''.join(self.__iter_archive()))
+
+    def write_to(self, fileobj) -> int:
+        """
+        Streams signed `.pkpass` archive into file-like object, e.g. opened file,
+        socket file or response body, without building the whole archive in memory.
+        Destination doesn't have to be seekable.
+        :param fileobj: object with `.write()` method accepting bytes-like objects
+        :returns: number of bytes written
+        """
+        return timed(self.observer, 'zip', self.__write_to, fileobj)
+
+    def __write_to(self, fileobj) -> int:
+        written = 0
+        for piece in self.__iter_archive():
+            fileobj.write(piece)
+            written += len(piece)
+        return written
+
+    def iter_chunks(self, chunk_size: int = 64 * 1024):
+        """
+        Streams signed `.pkpass` archive as `bytes` chunks, suitable for
+        WSGI/ASGI response bodies.
+        Pass package is validated before the first chunk is produced.
+        :param chunk_size: size of chunks in bytes, last chunk may be shorter
+        :returns: iterator of `bytes` objects
+        """
+        return rechunk(self.__iter_archive(), chunk_size)
+
+    def iter_pieces(self, date_time: tuple = None):
+        """
+        Streams signed `.pkpass` archive as bytes-like pieces, member content is
+        yielded as is, without being copied.
+        Pass package is validated before the first piece is produced.
+        :param date_time: (optional) (year, month, day, hour, minute, second) stamped on
+        every member, defaults to current local time; archives with the same date and time
+        are made of the same pieces, ignored by deterministic passes
+        :returns: iterator of bytes-like objects which concatenated make the archive
+        """
+        return self.__iter_archive(date_time)
+
+    def __iter_archive(self, date_time=None):
         try:
-            archive = io.BytesIO()
-            with zipfile.ZipFile(
-                    file=archive,
-                    mode='w',
-                    compression=zipfile.ZIP_DEFLATED,
-                    allowZip64=False
-            ) as buffer:
-                for name, data in self.pass_package.items():
-                    buffer.writestr(name, data)
-            return archive.getvalue()
+            entries = self.__archive_entries()
         except (AssertionError, AttributeError) as e:
             msg = 'Failed to zip `.pkpass` because of another exception.'
             raise Exception(msg) from e
+        return iter_archive(entries, DETERMINISTIC_DATE_TIME if self.deterministic else date_time)
@@ -3,13 +3,168 @@
 # To learn more about their projects visit https://develat.io/ or check out
 # original implementation at https://github.com/Develatio/django-walletpass
 
-from cryptography import x509
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.bindings.openssl.binding import Binding
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
+import collections
+import functools
+import os
 
-copenssl = Binding.lib
-cffi = Binding.ffi
+# `cryptography` and its OpenSSL bindings are imported on first use, not when `airpress`
+# is imported, so processes which never sign start faster; see `load_bindings()`
+Bindings = collections.namedtuple(
+    'Bindings', ('lib', 'ffi', 'backend', 'x509', 'load_pem_private_key')
+)
+_bindings = None
+
+# Environment variable command-line tools read password of private key from
+KEY_PASSWORD_ENV = 'AIRPRESS_KEY_PASSWORD'
+
+
+def load_bindings() -> Bindings:
+    """
+    Imports `cryptography` and initializes OpenSSL bindings, only the first call
+    does the work.
+    :returns: `Bindings` with OpenSSL `lib`, cffi `ffi`, default `backend`, `x509` module
+    and `load_pem_private_key` function
+    """
+    global _bindings
+    if _bindings is None:
+        from cryptography import x509
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.bindings.openssl.binding import Binding
+        from cryptography.hazmat.primitives.serialization import load_pem_private_key
+        _bindings = Bindings(Binding.lib, Binding.ffi, default_backend(), x509,
+                             load_pem_private_key)
+    return _bindings
+
+
+class _LazyBinding:
+    """Stands for attribute of `Bindings`, which is loaded on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(getattr(load_bindings(), self._name), attribute)
+
+    def __repr__(self):
+        return f'<lazy {self._name} binding>'
+
+
+# Module attributes kept for compatibility, e.g. `copenssl.PKCS7_NOATTR`
+copenssl = _LazyBinding('lib')
+cffi = _LazyBinding('ffi')
+
+
+def read_key_password(path: str = None):
+    """
+    Reads password of private key for command-line tools, which don't accept it as an
+    argument, so it never shows up in the process list.
+    :param path: (optional) file with password, trailing newline is ignored
+    :returns: password read from `path` or from `KEY_PASSWORD_ENV` environment variable,
+    `None` when there's neither
+    """
+    if path:
+        with open(path, 'rb') as f:
+            return f.read().rstrip(b'\r\n') or None
+    password = os.environ.get(KEY_PASSWORD_ENV)
+    return password.encode() if password else None
+
+
+def default_flag() -> int:
+    """
+    :returns: `PKCS7_BINARY | PKCS7_DETACHED`, default flags of `PKCS7_sign`
+    """
+    lib = load_bindings().lib
+    return lib.PKCS7_BINARY | lib.PKCS7_DETACHED
+
+
+@functools.lru_cache(maxsize=16)
+def load_intermediate_certificate(content: bytes):
+    """
+    Parses DER encoded intermediate (WWDR) certificate, parsed certificates are cached
+    and shared by every signer of the process.
+    """
+    bindings = load_bindings()
+    return bindings.x509.load_der_x509_certificate(content, bindings.backend)
+
+
+class PassSigner:
+    """
+    Reusable PKCS#7 signer.
+    Certificate, key and intermediate (WWDR) certificate are parsed once when
+    signer is created and reused for every `.sign()` call, which makes it suitable
+    for signing large batches of manifests.
+    Signer can be pickled: it's rebuilt from raw credentials on the other side,
+    so it can be handed over to worker processes.
+    """
+
+    def __init__(self,
+                 certcontent: bytes,
+                 keycontent: bytes,
+                 wwdr_certificate: bytes,
+                 key_password=None,
+                 flag=None):
+        """
+        :param certcontent: (bytes) Content of pem file certificate
+        :param keycontent: (bytes) Content of key file
+        :param wwdr_certificate: (bytes) Content of Intermediate cert file
+        :param key_password: (bytes, optional) key file passwd. Defaults to None.
+        :param flag: (int, optional) Flags to be passed to PKCS7_sign C lib.
+        Defaults to copenssl.PKCS7_BINARY|copenssl.PKCS7_DETACHED. Adding
+        copenssl.PKCS7_NOATTR omits signing time, making signatures reproducible.
+        """
+        bindings = load_bindings()
+        self._credentials = (certcontent, keycontent, wwdr_certificate, key_password, flag)
+        self._flag = default_flag() if flag is None else flag
+        self._backend = bindings.backend
+
+        # Load cert and key
+        self._pkey = bindings.load_pem_private_key(
+            keycontent, key_password, backend=self._backend
+        )
+        self._cert = bindings.x509.load_pem_x509_certificate(certcontent, backend=self._backend)
+
+        # Load intermediate cert and push it into < Cryptography_STACK_OF_X509 * >
+        self._intermediate_cert = load_intermediate_certificate(bytes(wwdr_certificate))
+        copenssl, cffi = bindings.lib, bindings.ffi
+        # Stack only holds pointers, certificates themselves are owned by
+        # `._intermediate_cert`, so it's enough to free the stack alone.
+        self._certs_stack = cffi.gc(copenssl.sk_X509_new_null(), copenssl.sk_X509_free)
+        # https://www.openssl.org/docs/man1.1.1/man3/sk_TYPE_push.html
+        # int sk_TYPE_push(STACK_OF(TYPE) *sk, const TYPE *ptr);
+        # return amount of certs into certs_stack, -1 on error
+        _count = copenssl.sk_X509_push(self._certs_stack, self._intermediate_cert._x509)
+
+    def __reduce__(self):
+        return self.__class__, self._credentials
+
+    def sign(self, data: bytes) -> bytes:
+        """
+        Sign data with PKCS#7.
+        :param data: (bytes) Data to be signed
+        :return: pkcs7 signature of data
+        """
+        backend = self._backend
+        copenssl, cffi = load_bindings()[:2]
+        bio = backend._bytes_to_bio(data)
+        # From
+        # pyca/cryptography/src/_cffi_src/openssl/pkcs7.py
+        # PKCS7 *PKCS7_sign(X509 *, EVP_PKEY *, Cryptography_STACK_OF_X509 *, BIO *, int);
+        # signing-time attr is automatically added:
+        # https://www.openssl.org/docs/man1.1.1/man3/PKCS7_sign.html
+        pkcs7 = copenssl.PKCS7_sign(
+            self._cert._x509,
+            self._pkey._evp_pkey,
+            self._certs_stack,
+            bio.bio,
+            self._flag,
+        )
+        pkcs7 = cffi.gc(pkcs7, copenssl.PKCS7_free)
+
+        bio_out = backend._create_mem_bio_gc()
+        copenssl.i2d_PKCS7_bio(bio_out, pkcs7)
+
+        signed_pkcs7 = backend._read_mem_bio(bio_out)
+        return signed_pkcs7
 
 
 # SMIME isn't supported by pyca/cryptography:
@@ -19,10 +174,12 @@ def pkcs7_sign(certcontent: bytes,
                wwdr_certificate: bytes,
                data: bytes,
                key_password=None,
-               flag=copenssl.PKCS7_BINARY | copenssl.PKCS7_DETACHED):
+               flag=None):
 
     """
     Sign data with PKCS#7.
+    Credentials are parsed on every call, use `PassSigner` to sign
+    multiple manifests with the same credentials.
     :param certcontent: (bytes) Content of pem file certificate
     :param keycontent: (bytes) Content of key file
     :param wwdr_certificate: (bytes) Content of Intermediate cert file
@@ -32,40 +189,57 @@ def pkcs7_sign(certcontent: bytes,
     Defaults to copenssl.PKCS7_BINARY|copenssl.PKCS7_DETACHED.
     :return: pkcs7 signature of data
     """
+    signer = PassSigner(certcontent, keycontent, wwdr_certificate, key_password, flag)
+    return signer.sign(data)
 
-    backend = default_backend()
 
-    # Load cert and key
-    pkey = load_pem_private_key(keycontent, key_password, backend=backend)
-    cert = x509.load_pem_x509_certificate(certcontent, backend=backend)
+def _load_certificate(content: bytes, backend):
+    x509 = load_bindings().x509
+    if content.lstrip().startswith(b'-----BEGIN'):
+        return x509.load_pem_x509_certificate(content, backend)
+    return x509.load_der_x509_certificate(content, backend)
 
-    # Load intermediate cert and push it into < Cryptography_STACK_OF_X509 * >
-    intermediate_cert = x509.load_der_x509_certificate(
-        wwdr_certificate,
-        backend,
-    )
-    certs_stack = copenssl.sk_X509_new_null()
-    # https://www.openssl.org/docs/man1.1.1/man3/sk_TYPE_push.html
-    # int sk_TYPE_push(STACK_OF(TYPE) *sk, const TYPE *ptr);
-    # return amount of certs into certs_stack, -1 on error
-    _count = copenssl.sk_X509_push(certs_stack, intermediate_cert._x509)
-
-    bio = backend._bytes_to_bio(data)
-    # From
-    # pyca/cryptography/src/_cffi_src/openssl/pkcs7.py
-    # PKCS7 *PKCS7_sign(X509 *, EVP_PKEY *, Cryptography_STACK_OF_X509 *, BIO *, int);
-    # signing-time attr is automatically added:
-    # https://www.openssl.org/docs/man1.1.1/man3/PKCS7_sign.html
-    pkcs7 = copenssl.PKCS7_sign(
-        cert._x509,
-        pkey._evp_pkey,
-        certs_stack,
-        bio.bio,
-        flag,
-    )
 
-    bio_out = backend._create_mem_bio_gc()
-    copenssl.i2d_PKCS7_bio(bio_out, pkcs7)
+def pkcs7_verify(signature: bytes,
+                 data: bytes,
+                 trusted_certificates,
+                 check_time: bool = True) -> None:
+    """
+    Verify detached PKCS#7 signature of data.
+    Signer certificate has to chain up to one of trusted certificates, which don't
+    have to be self-signed roots, e.g. WWDR intermediate certificate is enough.
+    :param signature: (bytes) DER encoded PKCS#7 signature
+    :param data: (bytes) Signed data
+    :param trusted_certificates: iterable of PEM or DER encoded certificates
+    :param check_time: (bool, optional) decides whether to check validity period
+    of certificates. Defaults to True.
+    :raises ValueError: when signature is malformed or invalid
+    """
+    copenssl, cffi, backend = load_bindings()[:3]
+    bio = backend._bytes_to_bio(signature)
+    pkcs7 = copenssl.d2i_PKCS7_bio(bio.bio, cffi.NULL)
+    if pkcs7 == cffi.NULL:
+        backend._consume_errors()
+        raise ValueError('Signature is not a valid DER encoded PKCS#7 structure.')
+    pkcs7 = cffi.gc(pkcs7, copenssl.PKCS7_free)
 
-    signed_pkcs7 = backend._read_mem_bio(bio_out)
-    return signed_pkcs7
+    store = cffi.gc(copenssl.X509_STORE_new(), copenssl.X509_STORE_free)
+    # Certificates have to outlive the store
+    certificates = [_load_certificate(c, backend) for c in trusted_certificates]
+    for certificate in certificates:
+        copenssl.X509_STORE_add_cert(store, certificate._x509)
+    flags = copenssl.X509_V_FLAG_PARTIAL_CHAIN
+    if not check_time:
+        flags |= copenssl.X509_V_FLAG_NO_CHECK_TIME
+    copenssl.X509_STORE_set_flags(store, flags)
+
+    data_bio = backend._bytes_to_bio(data)
+    verified = copenssl.PKCS7_verify(
+        pkcs7, cffi.NULL, store, data_bio.bio, cffi.NULL, copenssl.PKCS7_BINARY
+    )
+    if verified != 1:
+        errors = backend._consume_errors_with_text()
+        reason = '; '.join(
+            e.reason_text.decode('utf8', 'replace') for e in errors
+        ) or 'unknown error'
+        raise ValueError(f'Signature verification failed: {reason}')
@@ -0,0 +1,433 @@
+"""
+Signing service keeping credentials in a single process.
+
+    python -m airpress.daemon --socket /run/airpress.sock --cert cert.pem --key key.pem
+
+Clients send manifests over Unix domain socket and receive detached signatures, see
+`RemoteSigner`. Every frame starts with a header of request id, opcode or status and
+payload length, so many requests of one connection can be in flight at once and
+responses may come back out of order.
+"""
+import argparse
+import collections
+import json
+import os
+import queue
+import socket
+import stat
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+from .assets import read_file
+from .compressor import WWDR_CA
+from .crypto import KEY_PASSWORD_ENV, PassSigner, read_key_password
+from .metrics import DEFAULT_BOUNDS, Histogram
+
+# request id, opcode (request) or status (response), payload length
+_HEADER = struct.Struct('!IBI')
+
+OP_SIGN = 0
+OP_STATS = 1
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# Largest accepted payload, manifests are a few kilobytes
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+# Seconds between checks of shutdown by threads waiting on the queue
+_POLL_INTERVAL = 0.1
+
+DaemonStats = collections.namedtuple('DaemonStats', (
+    'requests', 'errors', 'queue_depth', 'max_queue', 'connections', 'queued_time', 'sign_time'
+))
+DaemonStats.__doc__ = """
+Counters of `SigningDaemon`.
+`requests` and `errors` count finished sign requests, `queue_depth` is a number of
+requests waiting for signing thread, `queued_time` and `sign_time` are histograms
+(`count`, `sum`, `bounds`, `buckets`) of seconds requests spent in queue and being signed.
+"""
+
+
+def _recv_exactly(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if not n:
+            raise ConnectionError('Connection closed.')
+        received += n
+    return bytes(buffer)
+
+
+def _read_frame(sock):
+    request_id, code, length = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    if length > MAX_PAYLOAD:
+        raise ConnectionError(f'Frame of {length} bytes exceeds limit.')
+    return request_id, code, _recv_exactly(sock, length)
+
+
+def _frame(request_id, code, payload=b''):
+    return _HEADER.pack(request_id, code, len(payload)) + payload
+
+
+def _remove_socket(path, strict=True):
+    """
+    Removes Unix domain socket file left at `path`, any other file is kept.
+    :param strict: decides whether to raise `FileExistsError` for other files
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if stat.S_ISSOCK(mode):
+        os.remove(path)
+    elif strict:
+        raise FileExistsError(f'{path!r} exists and is not a socket.')
+
+
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def send(self, data):
+        with self.lock:
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                # Client went away, its remaining responses are dropped
+                pass
+
+    def shutdown(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class SigningDaemon:
+    """
+    Unix domain socket server signing manifests with preloaded credentials.
+    Requests of every connection are queued and signed by a pool of threads, OpenSSL
+    releases the GIL while signing. Signing thread takes up to `batch_size` waiting
+    requests at once and sends their responses with one write per connection.
+    Queue is bounded: when it's full, connections stop being read and clients block on
+    full socket buffers, which applies backpressure.
+    """
+
+    def __init__(self, path: str, signer, workers: int = None, max_queue: int = 1024,
+                 batch_size: int = 16, bounds: tuple = DEFAULT_BOUNDS):
+        """
+        :param path: path of Unix domain socket, existing socket file is replaced;
+        `FileExistsError` is raised when other file exists at `path`
+        :param signer: `PassSigner` instance (or any object with `.sign(data)` method)
+        :param workers: number of signing threads, defaults to number of CPUs
+        :param max_queue: maximum number of requests waiting for signing thread
+        :param batch_size: maximum number of requests taken by signing thread at once
+        :param bounds: upper bounds of latency histogram buckets in seconds
+        """
+        self.path = path
+        self.signer = signer
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._connections = set()
+        self._queued_time = Histogram(bounds)
+        self._sign_time = Histogram(bounds)
+        self._threads = []
+        self._closed = threading.Event()
+        _remove_socket(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+
+    @property
+    def stats(self) -> DaemonStats:
+        def histogram(h):
+            return {'count': h.count, 'sum': h.sum,
+                    'bounds': list(h.bounds), 'buckets': list(h.buckets)}
+
+        with self._lock:
+            return DaemonStats(
+                self._requests, self._errors, self._queue.qsize(), self.max_queue,
+                len(self._connections), histogram(self._queued_time), histogram(self._sign_time),
+            )
+
+    def start(self) -> None:
+        """Starts signing threads and accepts connections in background thread"""
+        for _ in range(self.workers):
+            self._spawn(self._sign_loop)
+        self._spawn(self._accept_loop)
+
+    def serve_forever(self) -> None:
+        self.start()
+        self._closed.wait()
+
+    def close(self) -> None:
+        self._closed.set()
+        try:
+            self._server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._server.close()
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            connection.shutdown()
+        # Signing threads notice `_closed` once the queue is drained
+        _remove_socket(self.path, strict=False)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._read_loop, args=(sock,), daemon=True).start()
+
+    def _read_loop(self, sock):
+        connection = _Connection(sock)
+        with self._lock:
+            self._connections.add(connection)
+        try:
+            while True:
+                request_id, opcode, payload = _read_frame(sock)
+                if opcode == OP_SIGN:
+                    # Blocks when queue is full, so client stops being read
+                    if not self._enqueue((connection, request_id, payload, time.perf_counter())):
+                        return
+                elif opcode == OP_STATS:
+                    stats = json.dumps(self.stats._asdict()).encode('utf8')
+                    connection.send(_frame(request_id, STATUS_OK, stats))
+                else:
+                    message = f'Unknown opcode {opcode}.'.encode('utf8')
+                    connection.send(_frame(request_id, STATUS_ERROR, message))
+        except (ConnectionError, OSError, struct.error):
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+            sock.close()
+
+    def _enqueue(self, item):
+        """
+        :returns: `False` when daemon was closed while waiting for free slot
+        """
+        while True:
+            try:
+                self._queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                if self._closed.is_set():
+                    return False
+
+    def _take_batch(self):
+        """
+        :returns: up to `batch_size` requests, empty list when daemon was closed
+        and queue is drained
+        """
+        while True:
+            try:
+                batch = [self._queue.get(timeout=_POLL_INTERVAL)]
+                break
+            except queue.Empty:
+                if self._closed.is_set():
+                    return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _sign_loop(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            responses = collections.defaultdict(list)
+            for item in batch:
+                connection, request_id, payload, enqueued = item
+                started = time.perf_counter()
+                try:
+                    frame = _frame(request_id, STATUS_OK, self.signer.sign(payload))
+                    failed = False
+                except Exception as e:
+                    frame = _frame(request_id, STATUS_ERROR, repr(e).encode('utf8'))
+                    failed = True
+                finished = time.perf_counter()
+                with self._lock:
+                    self._requests += 1
+                    self._errors += failed
+                    self._queued_time.observe(started - enqueued)
+                    self._sign_time.observe(finished - started)
+                responses[connection].append(frame)
+            for connection, frames in responses.items():
+                connection.send(b''.join(frames))
+
+
+class RemoteSigner:
+    """
+    Client of `SigningDaemon`, can be used in place of `PassSigner`, e.g.
+    `PKPass.sign(signer=RemoteSigner(path))`.
+    It's thread-safe and pipelines requests: many threads can share one connection,
+    responses are dispatched by background reader thread. Connection is opened on
+    first use, so signer can be sent to worker processes of `build_many`.
+    """
+
+    def __init__(self, path: str, timeout: float = None):
+        """
+        :param path: path of daemon's Unix domain socket
+        :param timeout: (optional) seconds to wait for a response
+        """
+        self.path = path
+        self.timeout = timeout
+        # Guards connection and pending requests, never held while socket is written, so
+        # reader thread can always dispatch responses
+        self._lock = threading.Lock()
+        self._send_lock = None
+        self._sock = None
+        self._pid = None
+        self._next_id = 0
+        self._pending = {}
+
+    def __reduce__(self):
+        return self.__class__, (self.path, self.timeout)
+
+    def submit(self, data: bytes, opcode: int = OP_SIGN) -> Future:
+        """
+        Sends request without waiting for its response.
+        :returns: `Future` resolved with response payload
+        """
+        future = Future()
+        with self._lock:
+            sock = self._connect()
+            send_lock = self._send_lock
+            request_id = self._next_id
+            self._next_id = (self._next_id + 1) % 2 ** 32
+            self._pending[request_id] = future
+        try:
+            with send_lock:
+                sock.sendall(_frame(request_id, opcode, bytes(data)))
+        except OSError as e:
+            with self._lock:
+                if self._sock is sock:
+                    self._pending.pop(request_id, None)
+                self._disconnect(sock, e)
+            raise
+        return future
+
+    def sign(self, data: bytes) -> bytes:
+        """
+        :param data: manifest
+        :returns: detached PKCS#7 signature of `data`
+        """
+        return self.submit(data).result(self.timeout)
+
+    def stats(self) -> DaemonStats:
+        payload = self.submit(b'', OP_STATS).result(self.timeout)
+        return DaemonStats(**json.loads(payload.decode('utf8')))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sock is not None:
+                self._disconnect(self._sock, ConnectionError('Signer was closed.'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _connect(self):
+        # Connection inherited from parent process after fork belongs to the parent
+        if self._sock is None or self._pid != os.getpid():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.path)
+            self._sock, self._pid, self._pending = sock, os.getpid(), {}
+            self._send_lock = threading.Lock()
+            threading.Thread(target=self._read_loop, args=(sock,), daemon=True).start()
+        return self._sock
+
+    def _disconnect(self, sock, error):
+        # Called with lock held
+        if self._sock is sock:
+            self._sock = None
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(error)
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def _read_loop(self, sock):
+        try:
+            while True:
+                request_id, status, payload = _read_frame(sock)
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if status == STATUS_OK:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload.decode('utf8', 'replace')))
+        except (ConnectionError, OSError, struct.error) as e:
+            with self._lock:
+                self._disconnect(sock, ConnectionError(f'Connection to signing daemon lost: {e}'))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m airpress.daemon', description='Signs manifests over Unix domain socket.'
+    )
+    parser.add_argument('--socket', required=True, help='path of Unix domain socket')
+    parser.add_argument('--cert', required=True, help='PEM encoded Pass Type ID certificate')
+    parser.add_argument('--key', required=True, help='PEM encoded private key')
+    parser.add_argument('--password-file',
+                        help=f'file with password of private key, read from {KEY_PASSWORD_ENV} '
+                             'environment variable by default')
+    parser.add_argument('--wwdr', help='DER encoded WWDR certificate, bundled one by default')
+    parser.add_argument('--workers', type=int, help='number of signing threads')
+    parser.add_argument('--max-queue', type=int, default=1024,
+                        help='maximum number of requests waiting for signing thread')
+    args = parser.parse_args(argv)
+
+    signer = PassSigner(
+        read_file(args.cert), read_file(args.key),
+        read_file(args.wwdr) if args.wwdr else WWDR_CA,
+        read_key_password(args.password_file),
+    )
+    daemon = SigningDaemon(args.socket, signer, args.workers, args.max_queue)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import collections
+import collections.abc
+import sqlite3
+import time
+
+from .batch import chunked
+
+DeltaResult = collections.namedtuple('DeltaResult', ('serial', 'digest', 'archive', 'error'))
+DeltaResult.__doc__ = """
+Pass whose content changed since it was last issued.
+`digest` is SHA-1 hex digest of its new manifest, `archive` holds signed `.pkpass`
+bytes, or `None` when changes are only detected. When pass failed, `error` holds
+exception that made it fail, `archive` is `None` and so is `digest` when manifest
+couldn't be computed.
+"""
+
+# SQLite limits number of query parameters to 999 in older versions
+_LOOKUP_SIZE = 500
+
+
+class DeltaIndex:
+    """
+    Persistent map of pass serial numbers to manifest digests of their last issued
+    version, kept in SQLite database.
+    Manifest covers every asset of the pass, so comparing digests tells which passes
+    changed. Computing manifest of a pass created from `PassTemplate` only hashes its
+    own assets, usually just `pass.json`, no signing or compression is needed.
+    """
+
+    def __init__(self, path: str = ':memory:', commit_every: int = 1000):
+        """
+        :param path: path of SQLite database, created when it doesn't exist
+        :param commit_every: number of digests recorded in one transaction
+        """
+        self.path = path
+        self.commit_every = commit_every
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS passes ('
+            'serial TEXT PRIMARY KEY, digest TEXT NOT NULL, updated REAL NOT NULL)'
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM passes').fetchone()[0]
+
+    def __contains__(self, serial):
+        return self.get(serial) is not None
+
+    def get(self, serial: str):
+        """
+        :returns: manifest digest of the last issued version of pass or `None`
+        """
+        row = self._db.execute('SELECT digest FROM passes WHERE serial = ?', (serial,)).fetchone()
+        return row[0] if row else None
+
+    def update(self, digests) -> None:
+        """
+        Records manifest digests of issued passes.
+        :param digests: mapping or iterable of (serial, digest) pairs
+        """
+        items = digests.items() if isinstance(digests, collections.abc.Mapping) else digests
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO passes (serial, digest, updated) VALUES (?, ?, ?)',
+                ((serial, digest, now) for serial, digest in items),
+            )
+
+    def delete(self, serial: str) -> None:
+        with self._db:
+            self._db.execute('DELETE FROM passes WHERE serial = ?', (serial,))
+
+    def changed(self, passes):
+        """
+        Detects passes whose manifest differs from the last issued one, new passes
+        count as changed. Index is not updated.
+        :param passes: iterable of (serial, `PKPass`) pairs
+        :returns: iterator of (serial, `PKPass`, digest) tuples of changed passes
+        """
+        for chunk in chunked(passes, _LOOKUP_SIZE):
+            issued = self._issued(chunk)
+            for serial, pkpass in chunk:
+                digest = pkpass.manifest_digest
+                if issued.get(serial) != digest:
+                    yield serial, pkpass, digest
+
+    def _issued(self, chunk) -> dict:
+        """
+        :param chunk: list of (serial, `PKPass`) pairs
+        :returns: mapping of serials of `chunk` to their recorded digests
+        """
+        serials = [serial for serial, _ in chunk]
+        placeholders = ','.join('?' * len(serials))
+        return dict(self._db.execute(
+            f'SELECT serial, digest FROM passes WHERE serial IN ({placeholders})', serials
+        ))
+
+    def regenerate(self, passes, build: bool = True, **kwargs):
+        """
+        Signs and compresses only passes whose manifest changed since they were last
+        issued and records their new digests.
+        Digest of a pass is recorded when the next result is requested, so pass whose
+        processing was interrupted is regenerated again next time.
+        Failure of one pass doesn't stop the rest, it's reported in `DeltaResult.error`
+        and its digest isn't recorded, so the pass is regenerated again next time.
+        :param passes: iterable of (serial, `PKPass`) pairs, e.g. passes created
+        from `PassTemplate` with rendered `pass.json`
+        :param build: decides whether to sign and compress changed passes; with `False`
+        digests are recorded and only changed serials are reported
+        :param kwargs: keyword arguments passed to `PKPass.sign()`, e.g. `signer`
+        :returns: iterator of `DeltaResult` of changed passes
+        """
+        pending = []
+        try:
+            for chunk in chunked(passes, _LOOKUP_SIZE):
+                issued = self._issued(chunk)
+                for serial, pkpass in chunk:
+                    digest = archive = None
+                    try:
+                        digest = pkpass.manifest_digest
+                        if issued.get(serial) == digest:
+                            continue
+                        if build:
+                            pkpass.sign(**kwargs)
+                            archive = bytes(pkpass)
+                    except Exception as e:
+                        yield DeltaResult(serial, digest, None, e)
+                        continue
+                    yield DeltaResult(serial, digest, archive, None)
+                    pending.append((serial, digest))
+                    if len(pending) >= self.commit_every:
+                        self.update(pending)
+                        pending.clear()
+        finally:
+            if pending:
+                self.update(pending)
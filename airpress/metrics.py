@@ -0,0 +1,139 @@
+import bisect
+import collections
+import threading
+import time
+
+# Stages reported by `PKPass`
+STAGES = (
+    'validate',          # validation of added assets in `.add_to_pass_package()`
+    'hash',              # hashing assets missing from digest cache in `.manifest_dict`
+    'load_credentials',  # parsing certificate and key when `.sign()` gets raw credentials
+    'sign',              # PKCS#7 signature of manifest
+    'compress',          # compression of archive members not found in member cache
+    'zip',               # writing the whole archive by `bytes()` or `.write_to()`
+)
+
+# Caches reported by `PKPass`
+CACHES = ('digest', 'manifest', 'signature', 'member')
+
+
+class PassObserver:
+    """
+    Receives instrumentation events of `PKPass`.
+    All methods do nothing, subclass it and override the ones you need.
+    Observer is disabled by default, `PKPass` only emits events when one is attached.
+    """
+
+    def on_stage(self, stage: str, seconds: float) -> None:
+        """
+        :param stage: one of `STAGES`
+        :param seconds: wall time spent in the stage
+        """
+
+    def on_member(self, name: str, file_size: int, compress_size: int) -> None:
+        """
+        Called for every member written to archive.
+        :param name: name of the member
+        :param file_size: size of member content
+        :param compress_size: size of compressed member
+        """
+
+    def on_cache(self, cache: str, hit: bool) -> None:
+        """
+        :param cache: one of `CACHES`
+        :param hit: whether cached value was used
+        """
+
+
+class Histogram:
+    """
+    Histogram with fixed bucket bounds. Buckets are not cumulative: `buckets[i]` counts
+    values in `(bounds[i - 1], bounds[i]]`, the last one values above all bounds; sum
+    them up to export as Prometheus `le` buckets.
+    """
+
+    def __init__(self, bounds: tuple):
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+# Bucket bounds in seconds: 10us .. 10s
+DEFAULT_BOUNDS = tuple(10 ** (exponent / 2) for exponent in range(-10, 3))
+
+
+class StatsObserver(PassObserver):
+    """
+    Observer aggregating events into stage timing histograms, byte counters and
+    cache hit/miss counters, ready to be exported to metrics stack.
+    It's thread-safe, single instance can be shared by many passes.
+    """
+
+    def __init__(self, bounds: tuple = DEFAULT_BOUNDS):
+        """
+        :param bounds: upper bounds of histogram buckets in seconds
+        """
+        self._lock = threading.Lock()
+        self.stages = collections.defaultdict(lambda: Histogram(bounds))
+        self.members = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.cache = collections.Counter()
+
+    def on_stage(self, stage, seconds):
+        with self._lock:
+            self.stages[stage].observe(seconds)
+
+    def on_member(self, name, file_size, compress_size):
+        with self._lock:
+            self.members += 1
+            self.raw_bytes += file_size
+            self.compressed_bytes += compress_size
+
+    def on_cache(self, cache, hit):
+        with self._lock:
+            self.cache[cache, hit] += 1
+
+    def snapshot(self) -> dict:
+        """
+        :returns: JSON serializable copy of collected metrics
+        """
+        with self._lock:
+            return {
+                'stages': {
+                    stage: {
+                        'count': h.count, 'sum': h.sum,
+                        'bounds': list(h.bounds), 'buckets': list(h.buckets),
+                    }
+                    for stage, h in self.stages.items()
+                },
+                'members': self.members,
+                'raw_bytes': self.raw_bytes,
+                'compressed_bytes': self.compressed_bytes,
+                'cache': {
+                    cache: {
+                        'hits': self.cache[cache, True], 'misses': self.cache[cache, False],
+                    }
+                    for cache in sorted({cache for cache, _ in self.cache})
+                },
+            }
+
+
+def timed(observer, stage: str, func, *args, **kwargs):
+    """
+    Calls `func` reporting its duration to `observer` as `stage`,
+    or just calls it when observer is `None`.
+    """
+    if observer is None:
+        return func(*args, **kwargs)
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        observer.on_stage(stage, time.perf_counter() - start)
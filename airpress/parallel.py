@@ -0,0 +1,51 @@
+import os
+import threading
+
+from .assets import asset_size
+
+# Minimum number of bytes to hash or compress at once for work to be spread over threads
+DEFAULT_PARALLEL_THRESHOLD = 1024 * 1024
+
+_shared_executor = None
+_shared_executor_pid = None
+_shared_executor_lock = threading.Lock()
+
+
+def shared_executor():
+    """
+    :returns: process-wide `ThreadPoolExecutor` with a thread per CPU, created on first
+    call and again in every forked child process, since threads don't survive fork
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    global _shared_executor, _shared_executor_pid
+    with _shared_executor_lock:
+        if _shared_executor is None or _shared_executor_pid != os.getpid():
+            _shared_executor = ThreadPoolExecutor(os.cpu_count() or 1)
+            _shared_executor_pid = os.getpid()
+        return _shared_executor
+
+
+def resolve_executor(executor, assets, threshold: int):
+    """
+    :param executor: `concurrent.futures.Executor`, `True` for `shared_executor()`,
+    or `None`
+    :param assets: assets about to be hashed or compressed
+    :param threshold: minimum total size of `assets` worth spreading over threads
+    :returns: executor to run work on, or `None` when it should run in current thread
+    """
+    if not executor or len(assets) < 2:
+        return None
+    if sum(asset_size(data) for data in assets) < threshold:
+        return None
+    return shared_executor() if executor is True else executor
+
+
+def map_ordered(executor, func, *iterables) -> list:
+    """
+    :returns: list of results of `func` run on `executor`, in input order;
+    with `executor` being `None` it's run in current thread
+    """
+    if executor is None:
+        return list(map(func, *iterables))
+    return list(executor.map(func, *iterables))
@@ -0,0 +1,130 @@
+import json
+import math
+import re
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+_MISSING = object()
+_MARKER = '\ue000airpress:{}\ue000'
+
+
+class Field:
+    """
+    Placeholder for per-pass value in `PassJsonTemplate` skeleton.
+    Can replace any value of JSON object or item of JSON array, e.g. serial number,
+    barcode message or seat.
+    """
+    TYPES = (str, int, float, bool)
+
+    def __init__(self, name: str, type: type = str, default=_MISSING, nullable: bool = False):
+        """
+        :param name: name of the field, same field can be used in many places
+        :param type: `str`, `int`, `float` or `bool`
+        :param default: (optional) value used when field isn't supplied to `.render()`
+        :param nullable: decides whether `None` is accepted as value
+        """
+        assert type in self.TYPES, f'Field type must be one of {self.TYPES}, not {type!r}.'
+        self.name = name
+        self.type = type
+        self.default = default
+        self.nullable = nullable
+        if default is not _MISSING:
+            self.check(default)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.name!r}, {self.type.__name__})'
+
+    def check(self, value) -> None:
+        if value is None and self.nullable:
+            return
+        if self.type is float:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool) \
+                and math.isfinite(value)
+        elif self.type is int:
+            valid = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            valid = isinstance(value, self.type)
+        if not valid:
+            raise TypeError(
+                f'Value of field {self.name!r} must be {self.type.__name__}, got {value!r}.'
+            )
+
+
+class PassJsonTemplate:
+    """
+    `pass.json` compiled into pre-encoded byte segments and typed placeholder slots.
+    The fixed part of the document is serialized once, rendering a pass only encodes
+    values of fields and joins them with segments.
+    """
+
+    def __init__(self, skeleton: dict, ensure_ascii: bool = False, **dumps_kwargs):
+        """
+        :param skeleton: `pass.json` document with `Field` placeholders in place
+        of per-pass values
+        :param ensure_ascii: decides whether non-ASCII characters are escaped
+        :param dumps_kwargs: other keyword arguments passed to `json.dumps`, e.g. `indent`;
+        output is compact by default
+        """
+        dumps_kwargs.setdefault('separators', (',', ':'))
+        self.ensure_ascii = ensure_ascii
+        self._encode_string = encode_basestring_ascii if ensure_ascii else encode_basestring
+        fields = {}
+
+        def replace(value):
+            if isinstance(value, Field):
+                known = fields.setdefault(value.name, value)
+                same_type = (known.type, known.nullable) == (value.type, value.nullable)
+                assert same_type, f'Field {value.name!r} is used with different types.'
+                return _MARKER.format(value.name)
+            if isinstance(value, dict):
+                return {key: replace(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [replace(item) for item in value]
+            return value
+
+        document = json.dumps(replace(skeleton), ensure_ascii=ensure_ascii, **dumps_kwargs)
+        markers = {
+            json.dumps(_MARKER.format(name), ensure_ascii=ensure_ascii): name for name in fields
+        }
+        pattern = '|'.join(re.escape(marker) for marker in markers) or '(?!)'
+        parts = re.split(f'({pattern})', document)
+
+        self.fields = fields
+        # Encoded segments alternate with names of fields, segments come first and last
+        self._segments = [part.encode('utf8') for part in parts[::2]]
+        self._slots = [fields[markers[part]] for part in parts[1::2]]
+
+    def render(self, values: dict = None, **kwargs) -> bytes:
+        """
+        :param values: (optional) mapping of field names to their values
+        :param kwargs: values of fields passed as keyword arguments
+        :returns: bytes object with `pass.json`
+        """
+        if values:
+            kwargs = {**values, **kwargs}
+        encoded = {}
+        for name, field in self.fields.items():
+            value = kwargs.get(name, field.default)
+            if value is _MISSING:
+                raise KeyError(f'Missing value of field {name!r}.')
+            field.check(value)
+            encoded[name] = self._encode(value).encode('utf8')
+
+        segments = self._segments
+        parts = [segments[0]]
+        for field, segment in zip(self._slots, segments[1:]):
+            parts.append(encoded[field.name])
+            parts.append(segment)
+        return b''.join(parts)
+
+    def _encode(self, value) -> str:
+        if isinstance(value, str):
+            return self._encode_string(value)
+        if value is None:
+            return 'null'
+        if value is True:
+            return 'true'
+        if value is False:
+            return 'false'
+        if isinstance(value, float):
+            return float.__repr__(value)
+        return int.__repr__(value)
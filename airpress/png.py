@@ -0,0 +1,210 @@
+import collections
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from hashlib import sha1
+
+from .assets import BUFFER_TYPES, LazyAsset
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_CHUNK_HEADER = struct.Struct('>L4s')
+
+# Ancillary chunks affecting how image is displayed, every other ancillary chunk is dropped
+KEPT_CHUNKS = (b'tRNS', b'gAMA', b'cHRM', b'sRGB', b'iCCP', b'sBIT')
+# Chunks of animated PNG, such images are left intact
+_ANIMATION_CHUNKS = (b'acTL', b'fcTL', b'fdAT')
+_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)
+
+OptimizerStats = collections.namedtuple(
+    'OptimizerStats', ('images', 'optimized', 'hits', 'bytes_in', 'bytes_out')
+)
+OptimizerStats.__doc__ = """
+Counters of `PNGOptimizer`. `images` is a number of optimized images including cache
+`hits`, `optimized` a number of images that became smaller, `bytes_in` and `bytes_out`
+are their total sizes before and after optimization.
+"""
+
+
+def _chunks(data):
+    view = memoryview(data)
+    if bytes(view[:len(_PNG_SIGNATURE)]) != _PNG_SIGNATURE:
+        raise ValueError('Not a PNG file.')
+    offset = len(_PNG_SIGNATURE)
+    while offset < len(view):
+        length, chunk_type = _CHUNK_HEADER.unpack_from(view, offset)
+        end = offset + _CHUNK_HEADER.size + length
+        if end + 4 > len(view):
+            raise ValueError('PNG file is truncated.')
+        yield chunk_type, view[offset + _CHUNK_HEADER.size:end]
+        offset = end + 4
+        if chunk_type == b'IEND':
+            return
+    raise ValueError('PNG file has no IEND chunk.')
+
+
+def _chunk(chunk_type, content):
+    return (
+        _CHUNK_HEADER.pack(len(content), chunk_type) + content
+        + struct.pack('>L', zlib.crc32(content, zlib.crc32(chunk_type)))
+    )
+
+
+def optimize_png(data, level: int = 9) -> bytes:
+    """
+    Losslessly recompresses PNG image: image data is deflated again with given level and
+    every ancillary chunk not in `KEPT_CHUNKS` is dropped. Pixels are not changed.
+    :param data: bytes-like object with PNG image
+    :param level: zlib compression level
+    :returns: optimized image, or `data` itself when it couldn't be made smaller
+    """
+    try:
+        chunks = list(_chunks(data))
+    except (ValueError, struct.error):
+        return data
+    types = [chunk_type for chunk_type, _ in chunks]
+    critical = (b'IHDR', b'PLTE', b'IDAT', b'IEND')
+    if any(t in _ANIMATION_CHUNKS or (t[:1].isupper() and t not in critical) for t in types):
+        # Unknown critical chunks or animation frames can't be handled safely
+        return data
+
+    try:
+        raw = zlib.decompress(b''.join(content for t, content in chunks if t == b'IDAT'))
+    except zlib.error:
+        return data
+    candidates = []
+    for strategy in _STRATEGIES:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+        candidates.append(compressor.compress(raw) + compressor.flush())
+    idat = min(candidates, key=len)
+
+    optimized = [_PNG_SIGNATURE]
+    for chunk_type, content in chunks:
+        if chunk_type == b'IDAT':
+            if idat is not None:
+                optimized.append(_chunk(b'IDAT', idat))
+                idat = None
+        elif chunk_type in critical or chunk_type in KEPT_CHUNKS:
+            optimized.append(_chunk(chunk_type, bytes(content)))
+    optimized = b''.join(optimized)
+    size = data.nbytes if isinstance(data, memoryview) else len(data)
+    return optimized if len(optimized) < size else data
+
+
+def _entry_size(digest, result):
+    return len(digest) + (0 if result is None else len(result))
+
+
+class PNGOptimizer:
+    """
+    Optimizes PNG assets when they are added to pass or template, see `optimize_png()`.
+    Results are cached by SHA-1 of the original image, so every distinct image is
+    optimized once. Least recently used results are evicted from memory when they exceed
+    `max_size`, optional on-disk cache keeps them all and can be shared by many processes.
+    It's thread-safe, single instance can be shared by many passes.
+    """
+
+    def __init__(self, directory: str = None, level: int = 9, max_size: int = 16 * 1024 * 1024):
+        """
+        :param directory: (optional) directory of on-disk cache
+        :param level: zlib compression level
+        :param max_size: memory budget of cached results in bytes
+        """
+        self.directory = directory
+        self.level = level
+        self.max_size = max_size
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        # Digest of original image mapped to optimized image or `None` when original is kept
+        self._results = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._images = 0
+        self._optimized = 0
+        self._hits = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    @property
+    def stats(self) -> OptimizerStats:
+        with self._lock:
+            return OptimizerStats(
+                self._images, self._optimized, self._hits, self._bytes_in, self._bytes_out
+            )
+
+    @property
+    def saved(self) -> int:
+        """Total number of bytes saved by optimization"""
+        with self._lock:
+            return self._bytes_in - self._bytes_out
+
+    def optimize(self, name: str, data):
+        """
+        :param name: name of the asset, only `.png` assets are optimized
+        :param data: bytes-like object or `FileAsset` with asset content
+        :returns: optimized image or `data` itself
+        """
+        if not name.endswith('.png'):
+            return data
+        content = bytes(data) if isinstance(data, LazyAsset) else data
+        if not isinstance(content, BUFFER_TYPES):
+            return data
+        digest = sha1(content).hexdigest()
+
+        with self._lock:
+            hit = digest in self._results
+            result = self._results.get(digest)
+            if hit:
+                self._results.move_to_end(digest)
+        if not hit:
+            hit, result = self._read(digest)
+        if not hit:
+            result = optimize_png(content, self.level)
+            result = None if result is content else result
+            self._write(digest, result)
+
+        size = memoryview(content).nbytes
+        with self._lock:
+            self._remember(digest, result)
+            self._images += 1
+            self._hits += hit
+            self._optimized += result is not None
+            self._bytes_in += size
+            self._bytes_out += size if result is None else len(result)
+        return data if result is None else result
+
+    def _remember(self, digest, result):
+        if digest in self._results:
+            return
+        self._results[digest] = result
+        self._size += _entry_size(digest, result)
+        while self._size > self.max_size and self._results:
+            evicted, evicted_result = self._results.popitem(last=False)
+            self._size -= _entry_size(evicted, evicted_result)
+
+    def _path(self, digest, suffix):
+        return os.path.join(self.directory, digest + suffix)
+
+    def _read(self, digest):
+        if self.directory is None:
+            return False, None
+        try:
+            with open(self._path(digest, '.png'), 'rb') as f:
+                return True, f.read()
+        except OSError:
+            pass
+        # Marker of image which couldn't be made smaller
+        return os.path.exists(self._path(digest, '.orig')), None
+
+    def _write(self, digest, result):
+        if self.directory is None:
+            return
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(result or b'')
+            os.replace(temporary, self._path(digest, '.orig' if result is None else '.png'))
+        except BaseException:
+            os.remove(temporary)
+            raise
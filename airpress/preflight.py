@@ -0,0 +1,209 @@
+import collections
+import json
+import re
+import struct
+
+from .archive import archive_overhead
+from .assets import asset_head, asset_size
+from .compressor import PKPASS_ICONS
+
+# Maximum dimensions of images at @1x, their @2x and @3x variants may be two and three times larger
+IMAGE_SLOTS = {
+    'icon': (29, 29),
+    'logo': (160, 50),
+    'strip': (375, 144),
+    'thumbnail': (90, 90),
+    'background': (180, 220),
+    'footer': (286, 15),
+}
+
+# Minimum dimensions of images at @1x, slots without one accept any size
+IMAGE_MIN_SLOTS = {
+    'icon': (29, 29),
+    'strip': (375, 98),
+    'thumbnail': (60, 60),
+    'background': (180, 220),
+}
+
+REQUIRED_PASS_KEYS = (
+    'formatVersion',
+    'passTypeIdentifier',
+    'serialNumber',
+    'teamIdentifier',
+    'organizationName',
+    'description',
+)
+
+# Typical size of detached signature with signer and WWDR certificates
+SIGNATURE_SIZE = 4096
+
+ISSUE_CODES = (
+    'missing_pass_json',   # package has no `pass.json`
+    'invalid_pass_json',   # `pass.json` is not a JSON object
+    'missing_key',         # required key is missing from `pass.json`
+    'missing_icon',        # package has no icon in any resolution
+    'invalid_image',       # image is not a PNG file
+    'image_too_large',     # image is larger than its slot allows
+    'image_too_small',     # image is smaller than its slot requires
+    'image_scale_mismatch',  # @1x, @2x and @3x variants of image differ in size
+    'archive_too_large',   # estimated archive size exceeds limit
+)
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_IHDR = struct.Struct('>L4sLL')
+_IMAGE_NAME = re.compile(r'(.*/)?({})(?:@([23])x)?\.png'.format('|'.join(IMAGE_SLOTS)))
+
+PreflightIssue = collections.namedtuple('PreflightIssue', ('code', 'member', 'message'))
+PreflightIssue.__doc__ = """
+Single problem found by `preflight()`.
+`code` is one of `ISSUE_CODES`, `member` is name of the asset it concerns or `None`.
+"""
+
+
+class PreflightResult(collections.namedtuple('PreflightResult', ('issues', 'size'))):
+    """
+    Outcome of `preflight()`, pass is valid when `issues` are empty.
+    `size` is estimated size of the archive in bytes.
+    """
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def raise_for_issues(self) -> None:
+        if self.issues:
+            raise AssertionError(' '.join(issue.message for issue in self.issues))
+
+
+def png_dimensions(data) -> tuple:
+    """
+    Reads image dimensions from PNG header, without decoding the image.
+    :param data: bytes-like object or `FileAsset` with PNG file
+    :returns: (width, height) tuple
+    """
+    head = bytes(asset_head(data, len(_PNG_SIGNATURE) + _IHDR.size))
+    if not head.startswith(_PNG_SIGNATURE) or len(head) < len(_PNG_SIGNATURE) + _IHDR.size:
+        raise ValueError('Not a PNG file.')
+    _, chunk_type, width, height = _IHDR.unpack_from(head, len(_PNG_SIGNATURE))
+    if chunk_type != b'IHDR':
+        raise ValueError('PNG file must start with IHDR chunk.')
+    return width, height
+
+
+def _image_issues(assets) -> list:
+    issues = []
+    # Variants of every image keyed by (directory, slot), e.g. ('en.lproj/', 'logo')
+    variants = collections.defaultdict(list)
+    for name, data in assets.items():
+        match = _IMAGE_NAME.fullmatch(name)
+        if match is None:
+            continue
+        try:
+            width, height = png_dimensions(data)
+        except ValueError as e:
+            issues.append(PreflightIssue('invalid_image', name, f'`{name}`: {e}'))
+            continue
+        directory, slot, scale = match.group(1), match.group(2), int(match.group(3) or 1)
+        variants[directory, slot].append((scale, name, width, height))
+        max_width, max_height = IMAGE_SLOTS[slot]
+        min_width, min_height = IMAGE_MIN_SLOTS.get(slot, (1, 1))
+        if width > max_width * scale or height > max_height * scale:
+            issues.append(PreflightIssue('image_too_large', name, (
+                f'`{name}` is {width}x{height}, '
+                f'at most {max_width * scale}x{max_height * scale} is allowed.'
+            )))
+        elif width < min_width * scale or height < min_height * scale:
+            issues.append(PreflightIssue('image_too_small', name, (
+                f'`{name}` is {width}x{height}, '
+                f'at least {min_width * scale}x{min_height * scale} is required.'
+            )))
+
+    for images in variants.values():
+        images.sort()
+        scale, base_name, base_width, base_height = images[0]
+        for other_scale, name, width, height in images[1:]:
+            # Variants may differ by a pixel at @1x due to rounding
+            tolerance = other_scale
+            expected_width = base_width * other_scale / scale
+            expected_height = base_height * other_scale / scale
+            if abs(width - expected_width) > tolerance or abs(height - expected_height) > tolerance:
+                issues.append(PreflightIssue('image_scale_mismatch', name, (
+                    f'`{name}` is {width}x{height}, '
+                    f'expected {expected_width:.0f}x{expected_height:.0f} to match `{base_name}`.'
+                )))
+    return issues
+
+
+def estimate_size(pkpass, signature_size: int = SIGNATURE_SIZE) -> int:
+    """
+    Estimates size of `.pkpass` archive without hashing, signing or compressing anything.
+    Compressed sizes of members compressed so far are used, e.g. of template assets,
+    other assets, `manifest.json` and `signature` are counted uncompressed.
+    :param pkpass: `PKPass` instance
+    :param signature_size: size of signature assumed when pass isn't signed yet
+    :returns: estimated size in bytes
+    """
+    members = pkpass.members
+    sizes = {}
+    for name, data in pkpass.assets.items():
+        member = members.get(name)
+        sizes[name] = asset_size(member.data if member is not None else data)
+
+    # Manifest has the same length whatever the digests are
+    sizes['manifest.json'] = len(json.dumps(
+        {name: '0' * 40 for name in pkpass.assets},
+        sort_keys=True, indent=4, ensure_ascii=False, separators=(',', ':'),
+    ).encode('utf8'))
+    sizes['signature'] = len(pkpass.signature) if hasattr(pkpass, '_signature') \
+        else signature_size
+
+    return archive_overhead(sizes) + sum(sizes.values())
+
+
+def preflight(pkpass, max_size: int = None, check_images: bool = True) -> PreflightResult:
+    """
+    Checks pass package before any hashing, signing or compression is spent on it:
+    required keys of `pass.json`, presence of icon, dimensions of images, that is
+    bounds of their slots and consistency of @1x, @2x and @3x variants, and
+    estimated size of the archive.
+    :param pkpass: `PKPass` instance
+    :param max_size: (optional) limit of estimated archive size in bytes
+    :param check_images: decides whether to read dimensions of images
+    :returns: `PreflightResult`
+    """
+    issues = []
+    assets = pkpass.assets
+
+    if 'pass.json' not in assets:
+        issues.append(PreflightIssue(
+            'missing_pass_json', None, 'Pass package must contain `pass.json`.'
+        ))
+    else:
+        try:
+            document = json.loads(bytes(assets['pass.json']).decode('utf8'))
+            if not isinstance(document, dict):
+                raise ValueError('`pass.json` must be a JSON object.')
+        except ValueError as e:
+            issues.append(PreflightIssue('invalid_pass_json', 'pass.json', str(e)))
+        else:
+            for key in REQUIRED_PASS_KEYS:
+                if key not in document:
+                    issues.append(PreflightIssue(
+                        'missing_key', 'pass.json', f'`pass.json` must contain `{key}`.'
+                    ))
+
+    if not any(name in assets for name in PKPASS_ICONS):
+        issues.append(PreflightIssue(
+            'missing_icon', None, 'Pass package must have an icon in at least one resolution.'
+        ))
+
+    if check_images:
+        issues.extend(_image_issues(assets))
+
+    size = estimate_size(pkpass)
+    if max_size is not None and size > max_size:
+        issues.append(PreflightIssue(
+            'archive_too_large', None,
+            f'Estimated archive size {size} exceeds limit of {max_size} bytes.',
+        ))
+    return PreflightResult(issues, size)
@@ -0,0 +1,247 @@
+import collections
+import functools
+import io
+import json
+import mmap
+import os
+import zipfile
+import zlib
+from hashlib import sha1
+
+from .compressor import WWDR_CA
+from .crypto import pkcs7_verify
+
+VerificationIssue = collections.namedtuple('VerificationIssue', ('code', 'member', 'message'))
+VerificationIssue.__doc__ = """
+Single problem found by `PKPassReader.verify()`.
+`code` is one of `ISSUE_CODES`, `member` is name of the member it concerns or `None`.
+"""
+
+ISSUE_CODES = (
+    'invalid_archive',     # file is not a readable zip archive
+    'missing_manifest',    # archive has no `manifest.json`
+    'invalid_manifest',    # `manifest.json` is not a JSON object of names and digests
+    'missing_member',      # member listed in manifest is missing from archive
+    'unlisted_member',     # archive member is not listed in manifest
+    'corrupt_member',      # member can't be decompressed or its CRC doesn't match
+    'digest_mismatch',     # SHA-1 of member doesn't match manifest
+    'missing_signature',   # archive has no `signature`
+    'invalid_signature',   # signature is malformed, doesn't match manifest or isn't trusted
+)
+
+# Members of archive which are not listed in manifest
+_UNLISTED_MEMBERS = ('manifest.json', 'signature')
+# Errors of reading damaged member, `zipfile` raises `NotImplementedError` for unknown methods
+_CORRUPT_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, OSError, NotImplementedError)
+
+
+class VerificationResult(collections.namedtuple('VerificationResult', ('issues',))):
+    """Outcome of `PKPassReader.verify()`, pass is valid when `issues` are empty"""
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+
+class PKPassReader:
+    """
+    Lazy reader of `.pkpass` archives.
+    Only zip central directory is parsed upfront, members are read on demand and
+    streamed, so they are never held in memory as a whole.
+    """
+
+    def __init__(self, source, chunk_size: int = 256 * 1024):
+        """
+        :param source: bytes-like object, `mmap`, path or seekable binary file object
+        with `.pkpass` archive
+        :param chunk_size: size of chunks members are read in
+        """
+        self.chunk_size = chunk_size
+        self._file = None
+        self._archive = None
+        if isinstance(source, (str, os.PathLike)):
+            source = self._file = open(source, 'rb')
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        elif isinstance(source, mmap.mmap):
+            source.seek(0)
+        try:
+            self._archive = zipfile.ZipFile(source)
+        except BaseException:
+            self.close()
+            raise
+        self._names = [info.filename for info in self._archive.infolist() if not info.is_dir()]
+        self._name_set = frozenset(self._names)
+
+    def close(self) -> None:
+        if self._archive is not None:
+            self._archive.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def names(self) -> list:
+        return list(self._names)
+
+    def __contains__(self, name):
+        return name in self._name_set
+
+    def __getitem__(self, name) -> bytes:
+        return self._archive.read(name)
+
+    def iter_member(self, name):
+        """
+        :returns: iterator of `bytes` chunks of decompressed member
+        """
+        with self._archive.open(name) as member:
+            for chunk in iter(lambda: member.read(self.chunk_size), b''):
+                yield chunk
+
+    def member_sha1(self, name) -> str:
+        """
+        :returns: SHA-1 hex digest of member, computed while streaming it
+        """
+        digest = sha1()
+        for chunk in self.iter_member(name):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    @property
+    def manifest(self) -> bytes:
+        return self['manifest.json']
+
+    @property
+    def manifest_dict(self) -> dict:
+        return json.loads(self.manifest.decode('utf8'))
+
+    @property
+    def signature(self) -> bytes:
+        return self['signature']
+
+    def verify(self, trusted_certificates=(WWDR_CA,), check_time: bool = True,
+               verify_signature: bool = True) -> VerificationResult:
+        """
+        Checks every member against `manifest.json` and manifest against
+        detached PKCS#7 `signature`.
+        :param trusted_certificates: PEM or DER encoded certificates signer certificate
+        has to chain up to, defaults to Apple WWDR intermediate certificate
+        :param check_time: decides whether to check validity period of certificates
+        :param verify_signature: decides whether to verify signature at all
+        :returns: `VerificationResult`
+        """
+        issues = []
+        names = self._name_set
+
+        try:
+            manifest = self.manifest
+        except KeyError:
+            issues.append(VerificationIssue(
+                'missing_manifest', None, 'Archive has no `manifest.json`.'
+            ))
+            manifest = None
+        except _CORRUPT_MEMBER_ERRORS as e:
+            issues.append(VerificationIssue('corrupt_member', 'manifest.json', str(e)))
+            manifest = None
+
+        digests = {}
+        if manifest is not None:
+            try:
+                digests = json.loads(manifest.decode('utf8'))
+                if not isinstance(digests, dict) or not all(
+                        isinstance(v, str) for v in digests.values()):
+                    raise ValueError('Manifest must map member names to hex digests.')
+            except ValueError as e:
+                issues.append(VerificationIssue('invalid_manifest', 'manifest.json', str(e)))
+                digests = {}
+
+        for name, expected in digests.items():
+            if name not in names:
+                issues.append(VerificationIssue(
+                    'missing_member', name, 'Member listed in manifest is missing.'
+                ))
+                continue
+            try:
+                actual = self.member_sha1(name)
+            except _CORRUPT_MEMBER_ERRORS as e:
+                issues.append(VerificationIssue('corrupt_member', name, str(e)))
+                continue
+            if actual != expected.lower():
+                issues.append(VerificationIssue(
+                    'digest_mismatch', name, f'Expected SHA-1 {expected}, got {actual}.'
+                ))
+
+        if manifest is not None and not any(i.code == 'invalid_manifest' for i in issues):
+            for name in self._names:
+                if name not in digests and name not in _UNLISTED_MEMBERS:
+                    issues.append(VerificationIssue(
+                        'unlisted_member', name, 'Member is not listed in manifest.'
+                    ))
+
+        if verify_signature and manifest is not None:
+            try:
+                signature = self.signature
+            except KeyError:
+                issues.append(VerificationIssue(
+                    'missing_signature', None, 'Archive has no `signature`.'
+                ))
+            except _CORRUPT_MEMBER_ERRORS as e:
+                issues.append(VerificationIssue('corrupt_member', 'signature', str(e)))
+            else:
+                try:
+                    pkcs7_verify(signature, manifest, trusted_certificates, check_time)
+                except ValueError as e:
+                    issues.append(VerificationIssue('invalid_signature', 'signature', str(e)))
+
+        return VerificationResult(issues)
+
+
+def verify(source, **kwargs) -> VerificationResult:
+    """
+    Verifies single `.pkpass` archive, see `PKPassReader.verify()`.
+    Any error of reading the archive is reported as `invalid_archive` issue instead of
+    being raised, so one broken archive doesn't stop `verify_many()`.
+    :param source: bytes-like object, `mmap`, path or seekable binary file object
+    :param kwargs: keyword arguments passed to `PKPassReader.verify()`
+    :returns: `VerificationResult`
+    """
+    try:
+        with PKPassReader(source) as reader:
+            return reader.verify(**kwargs)
+    except (zipfile.BadZipFile, OSError) as e:
+        return VerificationResult([VerificationIssue('invalid_archive', None, str(e))])
+    except Exception as e:
+        return VerificationResult([VerificationIssue('invalid_archive', None, repr(e))])
+
+
+def _verify_chunk(chunk, **kwargs):
+    return [verify(source, **kwargs) for source in chunk]
+
+
+def verify_many(sources, workers: int = None, chunksize: int = 16, **kwargs):
+    """
+    Verifies many `.pkpass` archives in parallel.
+    :param sources: iterable of paths or bytes objects with archives
+    :param workers: number of worker processes, defaults to number of CPUs;
+    `0` verifies archives in current process
+    :param chunksize: number of archives sent to worker at once
+    :param kwargs: keyword arguments passed to `PKPassReader.verify()`
+    :returns: iterator of `VerificationResult` in the same order as `sources`
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if not workers:
+        for source in sources:
+            yield verify(source, **kwargs)
+        return
+    # Loaded on demand, `multiprocessing` is slow to import
+    from .batch import chunked, imap_ordered
+
+    yield from imap_ordered(
+        functools.partial(_verify_chunk, **kwargs), chunked(sources, chunksize), workers
+    )
@@ -0,0 +1,143 @@
+import collections
+import threading
+
+from .archive import compress_member
+from .assets import LazyAsset, asset_sha1, asset_size
+
+StoreStats = collections.namedtuple(
+    'StoreStats', ('hits', 'misses', 'evictions', 'entries', 'size', 'max_size')
+)
+StoreStats.__doc__ = """
+Counters of `AssetStore`. `hits` and `misses` count lookups of assets and compressed
+members, `size` is number of bytes currently held by the store.
+"""
+
+
+class _Entry:
+    __slots__ = ('data', 'digest', 'members', 'size')
+
+    def __init__(self, data, digest):
+        self.data = data
+        self.digest = digest
+        self.members = dict()
+        # Content of lazy assets is not held in memory
+        self.size = 0 if isinstance(data, LazyAsset) else asset_size(data)
+
+
+class AssetStore:
+    """
+    Content-addressed store of assets shared by all passes using it.
+    Each unique asset is kept once, keyed by its SHA-1 digest, together with its
+    compressed zip members. Passes hold references to stored objects instead of their
+    own copies, so the same logo used by many passes (or many brands) is hashed and
+    compressed once. Least recently used entries are evicted when store exceeds
+    its memory budget; passes referring to evicted assets keep working.
+    Store is thread-safe.
+    """
+
+    def __init__(self, max_size: int = 64 * 1024 * 1024):
+        """
+        :param max_size: memory budget in bytes, covering assets and compressed members
+        """
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> StoreStats:
+        with self._lock:
+            return StoreStats(
+                self._hits, self._misses, self._evictions,
+                len(self._entries), self._size, self.max_size,
+            )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, digest):
+        return digest in self._entries
+
+    def intern(self, data) -> tuple:
+        """
+        Looks up asset by its content, adding it to the store if it's not there yet.
+        :param data: bytes-like object or `FileAsset`
+        :returns: (data, digest) pair, where `data` is the stored object with the same
+        content, so callers can drop their own copy
+        """
+        digest = asset_sha1(data)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._hits += 1
+                self._entries.move_to_end(digest)
+                return entry.data, digest
+            self._misses += 1
+            entry = _Entry(data, digest)
+            self._entries[digest] = entry
+            self._size += entry.size
+            self._evict()
+        return data, digest
+
+    def member(self, digest: str, name: str, data, compression):
+        """
+        Returns compressed zip member of stored asset, compressing it on first use.
+        :param digest: SHA-1 hex digest of the asset, as returned by `.intern()`
+        :param name: name of the member, compression policy may depend on it
+        :param data: asset content
+        :param compression: `CompressionPolicy`
+        :returns: `CompressedMember`
+        """
+        method = compression.choose(name, data)
+        with self._lock:
+            entry = self._entries.get(digest)
+            member = entry.members.get(method) if entry is not None else None
+            if member is not None:
+                self._hits += 1
+                self._entries.move_to_end(digest)
+                return member
+            self._misses += 1
+
+        member = compress_member(data, *method)
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and method not in entry.members:
+                entry.members[method] = member
+                if member.data is not entry.data:
+                    size = asset_size(member.data)
+                    entry.size += size
+                    self._size += size
+                self._entries.move_to_end(digest)
+                self._evict()
+        return member
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _evict(self):
+        while self._size > self.max_size and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+            self._evictions += 1
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def shared_store() -> AssetStore:
+    """
+    :returns: process-wide `AssetStore`, created on first call with default budget
+    which can be changed with its `max_size` attribute
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = AssetStore()
+        return _shared_store
@@ -0,0 +1,96 @@
+from types import MappingProxyType
+
+from .archive import DEFAULT_COMPRESSION, compress_member
+from .assets import as_buffer, asset_sha1, find_equal_asset
+from .compressor import PKPass, validate_asset
+
+
+class PassTemplate:
+    """
+    Assets shared by many passes (icons, logos, strips etc.) together with their
+    digests and compressed zip members.
+    Shared assets are hashed and compressed once, when template is created. Passes
+    created from template refer to the same objects, so the only per-pass work left is
+    hashing and compressing their own assets, usually just `pass.json`.
+    """
+
+    def __init__(self, *assets, validate: bool = True, compression=DEFAULT_COMPRESSION,
+                 store=None, optimizer=None):
+        """
+        :param assets: arbitrary number of pair arguments where element at index [0] is
+        the name of the asset, element at index [1] is bytes-like object or `FileAsset`
+        with file content
+        :param validate: decides whether to check if supplied filename is on the list
+        of allowed assets
+        :param compression: `CompressionPolicy` used to compress template assets,
+        passes created from template use it too unless they override it
+        :param store: (optional) `AssetStore` template assets are kept in, passes created
+        from template use it too unless they override it
+        :param optimizer: (optional) `PNGOptimizer` template images are optimized with,
+        passes created from template use it too unless they override it
+        """
+        self.__compression = compression
+        self.store = store
+        self.optimizer = optimizer
+        self.__assets = dict()
+        self.__digests = dict()
+        self.__members = dict()
+        # Content stored under many names, e.g. in many `.lproj` directories, is kept as
+        # one object, which is hashed once and compressed once per compression method
+        digests, members = dict(), dict()
+        for name, data in assets:
+            validate_asset(name, data, validate)
+            data = as_buffer(data)
+            if optimizer is not None:
+                data = optimizer.optimize(name, data)
+            data = find_equal_asset(data, self.__assets.values())
+            if store is not None:
+                data, digest = store.intern(data)
+                member = store.member(digest, name, data, compression)
+            else:
+                digest = digests.get(id(data))
+                if digest is None:
+                    digest = digests[id(data)] = asset_sha1(data)
+                method = compression.choose(name, data)
+                member = members.get((id(data), method))
+                if member is None:
+                    member = members[id(data), method] = compress_member(data, *method)
+            self.__assets[name] = data
+            self.__digests[name] = digest
+            self.__members[name] = member
+
+    @property
+    def compression(self):
+        """`CompressionPolicy` template assets were compressed with"""
+        return self.__compression
+
+    @property
+    def assets(self):
+        """Read-only mapping of asset names to their content"""
+        return MappingProxyType(self.__assets)
+
+    @property
+    def digests(self):
+        """Read-only mapping of asset names to their SHA-1 hex digests"""
+        return MappingProxyType(self.__digests)
+
+    @property
+    def members(self):
+        """Read-only mapping of asset names to their `CompressedMember`"""
+        return MappingProxyType(self.__members)
+
+    def __getitem__(self, name):
+        return self.__assets[name]
+
+    def __contains__(self, name):
+        return name in self.__assets
+
+    def new_pass(self, *assets, **kwargs) -> PKPass:
+        """
+        Creates pass package containing template assets.
+        :param assets: pass specific assets, same as `PKPass` positional arguments;
+        assets with the same name as template asset take precedence over it
+        :param kwargs: keyword arguments passed to `PKPass`
+        :returns: `PKPass` instance
+        """
+        return PKPass(*assets, template=self, **kwargs)
@@ -0,0 +1,42 @@
+from .compressor import WWDR_CA
+from .crypto import PassSigner, load_bindings, load_intermediate_certificate
+
+
+def prewarm(cert: bytes = None, key: bytes = None, password: bytes = None,
+            wwdr: bytes = WWDR_CA, templates=(), signer=None):
+    """
+    Does ahead of time the work otherwise done by the first pass of a process: imports
+    `cryptography`, initializes OpenSSL bindings, parses `wwdr` certificate and
+    credentials, and builds one throwaway pass from every template.
+    Template lacking assets every pass must have (e.g. `icon.png`, supplied per pass)
+    can't build a pass on its own, its assets are already hashed and compressed, so only
+    signing is warmed up for it.
+    Call it before forking workers, e.g. in preloading app server or fork server, so they
+    share the loaded state copy-on-write instead of each paying for it on first request.
+    :param cert: (optional) PEM encoded certificate, parsed together with `key`
+    :param key: (optional) PEM encoded private key
+    :param password: (optional) password of `key`
+    :param wwdr: DER encoded intermediate certificate, Apple WWDR certificate by default
+    :param templates: `PassTemplate` instances to warm up
+    :param signer: (optional) `PassSigner` used instead of `cert` and `key`
+    :returns: `PassSigner` with parsed credentials, `signer` itself or `None` when
+    no credentials were supplied
+    """
+    load_bindings()
+    load_intermediate_certificate(bytes(wwdr))
+    if signer is None and cert and key:
+        signer = PassSigner(cert, key, wwdr, password)
+
+    for template in templates:
+        p = template.new_pass(('pass.json', b'{}'), validate=False)
+        try:
+            p.manifest
+        except AssertionError:
+            # Required assets are supplied per pass
+            if signer is not None:
+                signer.sign(b'{}')
+            continue
+        if signer is not None:
+            p.sign(signer=signer)
+            bytes(p)
+    return signer
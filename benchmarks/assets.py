@@ -0,0 +1,92 @@
+"""
+Synthetic pass assets for benchmarks.
+Images are real PNG files resembling photos: smooth gradients mixed with noise,
+compressed at zlib default level like most image editors do.
+"""
+import json
+import random
+import struct
+import zlib
+
+# @1x sizes in points, see Apple Wallet Developer Guide
+IMAGE_SIZES = {
+    'icon': (29, 29),
+    'logo': (160, 50),
+    'strip': (375, 144),
+    'thumbnail': (90, 90),
+    'background': (180, 220),
+    'footer': (286, 15),
+}
+
+# Name of asset set mapped to images and their scales
+ASSET_SETS = {
+    'small': {'icon': (1,), 'logo': (1,)},
+    'typical': {'icon': (1, 2, 3), 'logo': (1, 2, 3), 'strip': (1, 2, 3)},
+    'maximal': {
+        'icon': (3,), 'logo': (3,), 'strip': (3,),
+        'thumbnail': (3,), 'background': (3,), 'footer': (3,),
+    },
+}
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def make_png(width: int, height: int, seed: int = 0) -> bytes:
+    """Creates RGBA PNG image with a gradient disturbed by noise."""
+    rng = random.Random(seed)
+    gradient = bytes((x * 7 + seed) & 0xFF for x in range(width * 8))
+    rows = []
+    for y in range(height):
+        row = bytearray(gradient[(y % width) * 4:(y % width) * 4 + width * 4])
+        noise = rng.getrandbits(width * 8).to_bytes(width, 'little')
+        row[::4] = noise
+        rows.append(b'\x00' + bytes(row))
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _chunk(b'IHDR', ihdr)
+            + _chunk(b'IDAT', zlib.compress(b''.join(rows)))
+            + _chunk(b'IEND', b''))
+
+
+def make_pass_json(serial: int = 0) -> bytes:
+    """Creates event ticket pass.json of realistic size."""
+    fields = [
+        {'key': f'field{i}', 'label': f'LABEL {i}', 'value': f'Value of field {i}'}
+        for i in range(12)
+    ]
+    document = {
+        'formatVersion': 1,
+        'passTypeIdentifier': 'pass.com.example.benchmark',
+        'serialNumber': f'{serial:012d}',
+        'teamIdentifier': 'A1B2C3D4E5',
+        'organizationName': 'airpress benchmarks',
+        'description': 'Benchmark event ticket',
+        'barcodes': [{
+            'format': 'PKBarcodeFormatQR',
+            'message': f'TICKET-{serial:012d}',
+            'messageEncoding': 'iso-8859-1',
+        }],
+        'eventTicket': {
+            'primaryFields': fields[:2],
+            'secondaryFields': fields[2:5],
+            'auxiliaryFields': fields[5:8],
+            'backFields': fields[8:],
+        },
+    }
+    return json.dumps(document, indent=2).encode()
+
+
+def make_assets(size: str = 'typical') -> list:
+    """
+    :param size: name of asset set: `small`, `typical` or `maximal`
+    :returns: list of (name, data) pairs with images of given set, without `pass.json`
+    """
+    assets = []
+    for seed, (image, scales) in enumerate(sorted(ASSET_SETS[size].items())):
+        width, height = IMAGE_SIZES[image]
+        for scale in scales:
+            name = f'{image}.png' if scale == 1 else f'{image}@{scale}x.png'
+            assets.append((name, make_png(width * scale, height * scale, seed)))
+    return assets
@@ -0,0 +1,146 @@
+"""
+Cold start benchmark: time of `import airpress` and latency of the first pass built by
+a fresh process, with and without `prewarm()`. Every run is a new interpreter.
+
+Exits with 1 when median import time exceeds `--max-import-ms` or when importing
+`airpress` loads a module of optional subsystems (`HEAVY_MODULES`).
+
+Usage:
+    python -m benchmarks.bench_coldstart --runs 10 --max-import-ms 120
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from .credentials import make_credentials
+
+# Standard library modules only optional subsystems (`aio`, `batch`, `delta`, `daemon`)
+# and signing need, none of them is expected to be loaded by `import airpress`
+HEAVY_MODULES = (
+    'asyncio', 'concurrent.futures', 'cryptography', 'multiprocessing', 'socket', 'sqlite3',
+)
+
+# Runs in a fresh interpreter, prints JSON with timings in seconds
+_CHILD = """
+import sys, time
+start = time.perf_counter()
+import airpress
+imported = time.perf_counter()
+loaded = sorted(set(sys.argv[4:]) & set(sys.modules))
+
+from benchmarks.assets import make_assets, make_pass_json
+mode, cert_path, key_path = sys.argv[1:4]
+with open(cert_path, 'rb') as f:
+    cert = f.read()
+with open(key_path, 'rb') as f:
+    key = f.read()
+template = airpress.PassTemplate(*make_assets('typical'))
+signer = airpress.prewarm(cert, key, templates=[template]) if mode == 'prewarmed' else None
+
+def build(serial):
+    p = template.new_pass(('pass.json', make_pass_json(serial)))
+    if signer is not None:
+        p.sign(signer=signer)
+    else:
+        p.sign(cert, key)
+    return bytes(p)
+
+first = time.perf_counter()
+build(0)
+second = time.perf_counter()
+build(1)
+end = time.perf_counter()
+
+import json, resource
+print(json.dumps({
+    'import': imported - start,
+    'heavy_modules': loaded,
+    'first_pass': second - first,
+    'second_pass': end - second,
+    'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_child(mode, cert_path, key_path) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-c', _CHILD, mode, cert_path, key_path, *HEAVY_MODULES],
+        cwd=_ROOT, check=True, stdout=subprocess.PIPE,
+    ).stdout
+    return json.loads(output)
+
+
+def _summary(latencies, peak_rss_kb) -> dict:
+    ordered = sorted(latencies)
+    return {
+        'passes_per_sec': len(latencies) / sum(latencies),
+        'p50_ms': ordered[len(ordered) // 2] * 1e3,
+        'p99_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e3,
+        'peak_rss_kb': peak_rss_kb,
+    }
+
+
+def run_cold_start(cert: bytes, key: bytes, runs: int) -> dict:
+    """
+    :returns: results keyed by benchmark name, in the same format as `suite.measure()`;
+    `passes_per_sec` of `cold/import` is the number of imports per second, its
+    `heavy_modules` lists `HEAVY_MODULES` loaded by the import
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path = os.path.join(directory, 'cert.pem')
+        key_path = os.path.join(directory, 'key.pem')
+        for path, content in ((cert_path, cert), (key_path, key)):
+            with open(path, 'wb') as f:
+                f.write(content)
+        cold = [_run_child('cold', cert_path, key_path) for _ in range(runs)]
+        prewarmed = [_run_child('prewarmed', cert_path, key_path) for _ in range(runs)]
+
+    def peak(children):
+        return max(child['peak_rss_kb'] for child in children)
+
+    import_summary = _summary([c['import'] for c in cold], peak(cold))
+    import_summary['heavy_modules'] = sorted({m for c in cold for m in c['heavy_modules']})
+    return {
+        'cold/import': import_summary,
+        'cold/first_pass': _summary([c['first_pass'] for c in cold], peak(cold)),
+        'cold/second_pass': _summary([c['second_pass'] for c in cold], peak(cold)),
+        'cold/first_pass_prewarmed': _summary(
+            [c['first_pass'] for c in prewarmed], peak(prewarmed)
+        ),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='number of fresh processes')
+    parser.add_argument('--max-import-ms', type=float, default=120.0,
+                        help='median time of `import airpress` above which benchmark fails')
+    args = parser.parse_args(argv)
+
+    cert, key = make_credentials()
+    results = run_cold_start(cert, key, args.runs)
+    print(f'{"benchmark":<32}{"p50 ms":>9}{"p99 ms":>9}')
+    for name, result in results.items():
+        print(f'{name:<32}{result["p50_ms"]:>9.2f}{result["p99_ms"]:>9.2f}')
+
+    failures = []
+    imported = results['cold/import']
+    if imported['p50_ms'] > args.max_import_ms:
+        failures.append(
+            f'import takes {imported["p50_ms"]:.1f} ms, limit is {args.max_import_ms:.1f} ms'
+        )
+    if imported['heavy_modules']:
+        failures.append(f'import loads {", ".join(imported["heavy_modules"])}')
+    for failure in failures:
+        print(f'Regression: {failure}', file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Compares CPU time spent on compressing pass package members and resulting archive
+size for different compression policies.
+
+Usage: python -m benchmarks.bench_compression [asset set] [iterations]
+"""
+import sys
+import time
+
+from airpress import CompressionPolicy, DEFAULT_COMPRESSION, STORE_PNG_COMPRESSION
+
+from .assets import make_assets, make_pass_json
+
+POLICIES = {
+    'default': DEFAULT_COMPRESSION,
+    'store png': STORE_PNG_COMPRESSION,
+    'auto': CompressionPolicy(auto=True),
+    'level 1': CompressionPolicy(level=1),
+    'level 9': CompressionPolicy(level=9),
+}
+
+
+def main(size='typical', iterations=20):
+    assets = make_assets(size) + [('pass.json', make_pass_json())]
+    raw_size = sum(len(data) for _, data in assets)
+    print(f'{size} asset set: {len(assets)} files, {raw_size} bytes')
+    print(f'{"policy":<12}{"cpu ms/pass":>14}{"bytes":>12}{"ratio":>8}')
+    for label, policy in POLICIES.items():
+        start = time.process_time()
+        for _ in range(iterations):
+            members = [policy.compress(name, data) for name, data in assets]
+        elapsed = (time.process_time() - start) / iterations
+        compressed_size = sum(len(member.data) for member in members)
+        print(f'{label:<12}{elapsed * 1e3:>14.2f}{compressed_size:>12}'
+              f'{compressed_size / raw_size:>8.3f}')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2], *map(int, sys.argv[2:3]))
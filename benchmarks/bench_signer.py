@@ -0,0 +1,45 @@
+"""
+Compares signing manifests with `pkcs7_sign`, which parses credentials on every
+call, against reusable `PassSigner` that parses them once.
+
+Usage: python -m benchmarks.bench_signer [iterations]
+"""
+import os
+import sys
+import time
+
+from airpress import PassSigner, WWDR_CA
+from airpress.crypto import pkcs7_sign
+
+CREDENTIALS = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'credentials')
+
+
+def read(name):
+    with open(os.path.join(CREDENTIALS, name), 'rb') as f:
+        return f.read()
+
+
+def measure(label, func, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(b'{"pass.json":"%d"}' % i)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<24}{iterations / elapsed:>10.1f} signatures/s'
+          f'{elapsed / iterations * 1e6:>12.1f} us/signature')
+    return elapsed
+
+
+def main(iterations=500):
+    cert = read('unprotected_dummy_cert.pem')
+    key = read('unprotected_dummy_key.pem')
+
+    per_call = measure(
+        'pkcs7_sign', lambda data: pkcs7_sign(cert, key, WWDR_CA, data), iterations
+    )
+    signer = PassSigner(cert, key, WWDR_CA)
+    cached = measure('PassSigner.sign', signer.sign, iterations)
+    print(f'speedup: {per_call / cached:.2f}x')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
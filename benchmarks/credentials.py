@@ -0,0 +1,46 @@
+"""
+Dummy signing credentials generated on the fly, like the ones in `tests/credentials`.
+"""
+import datetime
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+
+def make_credentials(key_size: int = 2048, password: bytes = None) -> tuple:
+    """
+    Creates self-signed certificate and its private key.
+    :param key_size: RSA key size in bits
+    :param password: (optional) password encrypting the key
+    :returns: (cert, key) pair of PEM encoded bytes objects
+    """
+    backend = default_backend()
+    key = rsa.generate_private_key(public_exponent=65537, key_size=key_size, backend=backend)
+    name = x509.Name([
+        x509.NameAttribute(NameOID.COUNTRY_NAME, 'PL'),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, 'airpress benchmarks'),
+    ])
+    now = datetime.datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=365))
+        .sign(key, hashes.SHA256(), backend)
+    )
+    encryption = (
+        serialization.BestAvailableEncryption(password)
+        if password else serialization.NoEncryption()
+    )
+    return (
+        cert.public_bytes(serialization.Encoding.PEM),
+        key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, encryption
+        ),
+    )
@@ -0,0 +1,223 @@
+"""
+Benchmark suite of sign/hash/zip pipeline.
+Measures throughput, latency percentiles and peak RSS of every stage separately
+and of the whole pipeline in different modes, for small, typical and maximal
+(all @3x) asset sets, as well as import time and first pass latency of fresh
+processes. Credentials and assets are generated on the fly.
+
+Usage:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --output current.json --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import airpress
+from airpress import PKPass, PassSigner, PassTemplate, WWDR_CA, build_many
+from airpress.crypto import pkcs7_sign
+
+from .assets import ASSET_SETS, make_assets, make_pass_json
+from .bench_coldstart import run_cold_start
+from .credentials import make_credentials
+
+
+class _StaticSigner:
+    """Returns precomputed signature, lets zip stage be measured on its own"""
+
+    def __init__(self, signature):
+        self.signature = signature
+
+    def sign(self, data):
+        return self.signature
+
+
+def _reset_peak_rss() -> None:
+    # Resets VmHWM on Linux, elsewhere peak RSS of the whole run is reported
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_kb() -> int:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def measure(run, iterations: int, prepare=None) -> dict:
+    """
+    Calls `run` `iterations` times and reports its throughput, latency and peak RSS.
+    :param run: callable receiving value returned by `prepare`
+    :param prepare: (optional) callable run before every iteration, excluded from timing
+    """
+    _reset_peak_rss()
+    latencies = []
+    for i in range(iterations):
+        arg = prepare(i) if prepare else i
+        start = time.perf_counter()
+        run(arg)
+        latencies.append(time.perf_counter() - start)
+    return {
+        'passes_per_sec': iterations / sum(latencies),
+        'p50_ms': _percentile(latencies, 50) * 1e3,
+        'p99_ms': _percentile(latencies, 99) * 1e3,
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def measure_pooled(specs, signer, workers: int) -> dict:
+    _reset_peak_rss()
+    start = time.perf_counter()
+    count = 0
+    for result in build_many(specs, signer, workers=workers):
+        assert result.error is None, result.error
+        count += 1
+    elapsed = time.perf_counter() - start
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {
+        'passes_per_sec': count / elapsed,
+        'p50_ms': None,
+        'p99_ms': None,
+        'peak_rss_kb': max(_peak_rss_kb(), children),
+    }
+
+
+def run_asset_set(size: str, cert: bytes, key: bytes, iterations: int, workers: int) -> dict:
+    assets = make_assets(size)
+    signer = PassSigner(cert, key, WWDR_CA)
+    template = PassTemplate(*assets)
+
+    def new_pass(i):
+        return PKPass(*assets, ('pass.json', make_pass_json(i)))
+
+    def signed_pass(i):
+        p = new_pass(i)
+        p.sign(signer=static_signer)
+        return p
+
+    manifest = new_pass(0).manifest
+    static_signer = _StaticSigner(signer.sign(manifest))
+
+    def single(i):
+        p = new_pass(i)
+        p.sign(cert=cert, key=key)
+        return bytes(p)
+
+    def cached_signer(i):
+        p = new_pass(i)
+        p.sign(signer=signer)
+        return bytes(p)
+
+    def templated(i):
+        p = template.new_pass(('pass.json', make_pass_json(i)))
+        p.sign(signer=signer)
+        return bytes(p)
+
+    results = {
+        'stage/hash': measure(lambda p: p.manifest_dict, iterations, new_pass),
+        'stage/sign': measure(
+            lambda m: pkcs7_sign(cert, key, WWDR_CA, m), iterations, lambda i: manifest
+        ),
+        'stage/sign_cached_signer': measure(signer.sign, iterations, lambda i: manifest),
+        'stage/zip': measure(bytes, iterations, signed_pass),
+        'e2e/single': measure(single, iterations),
+        'e2e/cached_signer': measure(cached_signer, iterations),
+        'e2e/template': measure(templated, iterations),
+    }
+    if workers:
+        specs = (
+            assets + [('pass.json', make_pass_json(i))]
+            for i in range(iterations * workers)
+        )
+        results[f'e2e/pooled_{workers}'] = measure_pooled(specs, signer, workers)
+    return {f'{size}/{name}': result for name, result in results.items()}
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Prints throughput change against baseline results.
+    :returns: `False` if throughput of any benchmark dropped by more than `tolerance`
+    """
+    ok = True
+    print(f'\n{"benchmark":<40}{"baseline":>12}{"current":>12}{"change":>9}')
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['passes_per_sec']
+        after = result['passes_per_sec']
+        change = after / before - 1
+        regression = change < -tolerance
+        ok = ok and not regression
+        print(f'{name:<40}{before:>12.1f}{after:>12.1f}{change:>+9.1%}'
+              f'{"  REGRESSION" if regression else ""}')
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sets', nargs='+', default=list(ASSET_SETS), choices=list(ASSET_SETS))
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='processes used in pooled mode, 0 skips it')
+    parser.add_argument('--cold-runs', type=int, default=5,
+                        help='fresh processes measuring import and first pass, 0 skips it')
+    parser.add_argument('--output', help='path of JSON file with results')
+    parser.add_argument('--compare', help='path of JSON file with baseline results')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='accepted throughput drop against baseline, defaults to 0.2')
+    args = parser.parse_args(argv)
+
+    cert, key = make_credentials()
+    results = {}
+    for size in args.sets:
+        results.update(run_asset_set(size, cert, key, args.iterations, args.workers))
+    if args.cold_runs:
+        results.update(run_cold_start(cert, key, args.cold_runs))
+
+    report = {
+        'meta': {
+            'airpress': airpress.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'iterations': args.iterations,
+            'workers': args.workers,
+            'cold_runs': args.cold_runs,
+        },
+        'results': results,
+    }
+    print(f'{"benchmark":<40}{"passes/s":>10}{"p50 ms":>9}{"p99 ms":>9}{"peak RSS kB":>13}')
+    for name, result in results.items():
+        p50, p99 = (f'{result[k]:>9.2f}' if result[k] is not None else f'{"-":>9}'
+                    for k in ('p50_ms', 'p99_ms'))
+        print(f'{name:<40}{result["passes_per_sec"]:>10.1f}{p50}{p99}{result["peak_rss_kb"]:>13}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            return 0 if compare(report, json.load(f), args.tolerance) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,6 +15,7 @@ setuptools.setup(
     url='https://github.com/captain-fox/airpress',
     packages=['airpress'],
     install_requires=['cryptography>=2.9.2'],
+    entry_points={'console_scripts': ['airpress=airpress.cli:main']},
     classifiers=[
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python :: 3',
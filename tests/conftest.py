@@ -1,6 +1,7 @@
 import os
 import pytest
-from airpress.compressor import PKPass
+from airpress.compressor import PKPass, WWDR_CA
+from airpress.crypto import PassSigner
 
 
 @pytest.fixture
@@ -35,3 +36,8 @@ def cert():
     ) as c:
         cert = c.read()
     return cert
+
+
+@pytest.fixture
+def signer(cert, key):
+    return PassSigner(cert, key, WWDR_CA)
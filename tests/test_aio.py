@@ -0,0 +1,105 @@
+import asyncio
+import io
+import threading
+import zipfile
+
+import pytest
+
+from airpress import AsyncPassBuilder, PKPass
+
+
+def run(coroutine):
+    # `asyncio.run()` is only available since Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_should_sign_and_compress_pkpass_asynchronously(pkpass_with_assets, cert, key):
+    async def build():
+        async with AsyncPassBuilder(max_workers=2) as builder:
+            signature = await builder.sign(pkpass_with_assets, cert=cert, key=key)
+            archive = await builder.archive(pkpass_with_assets)
+            return signature, archive, builder.stats
+
+    signature, archive, stats = run(build())
+
+    assert signature == pkpass_with_assets.signature
+    with zipfile.ZipFile(io.BytesIO(archive)) as z:
+        assert z.read('signature') == signature
+    assert stats.jobs == 2
+    assert stats.pending == 0
+    assert stats.run_time > 0
+
+
+def test_should_build_pkpass_with_builder_signer(pkpass_with_assets, signer):
+    jobs = []
+
+    async def build():
+        async with AsyncPassBuilder(signer, on_job_done=lambda *job: jobs.append(job)) as builder:
+            return await builder.build(pkpass_with_assets)
+
+    assert run(build())
+    assert [name for name, _, _ in jobs] == ['build']
+
+
+def test_should_limit_number_of_pending_jobs(signer):
+    release = threading.Event()
+    running = []
+
+    class SlowSigner:
+        def sign(self, data):
+            running.append(data)
+            release.wait(5)
+            return signer.sign(data)
+
+    async def build():
+        builder = AsyncPassBuilder(SlowSigner(), max_workers=4, max_pending=2)
+        passes = [PKPass(('icon.png', b'1'), ('pass.json', b'%d' % i)) for i in range(4)]
+        tasks = [asyncio.ensure_future(builder.sign(p)) for p in passes]
+        await asyncio.sleep(0.2)
+        pending = builder.stats.pending
+        release.set()
+        await asyncio.gather(*tasks)
+        builder.close()
+        return pending
+
+    assert run(build()) == 2
+    assert len(running) == 4
+
+
+def test_should_not_run_cancelled_job_waiting_for_free_slot(signer):
+    release = threading.Event()
+    signed = []
+
+    class SlowSigner:
+        def sign(self, data):
+            release.wait(5)
+            signed.append(data)
+            return signer.sign(data)
+
+    async def build():
+        builder = AsyncPassBuilder(SlowSigner(), max_workers=1, max_pending=1)
+        first = asyncio.ensure_future(builder.sign(PKPass(('icon.png', b'1'), ('pass.json', b'1'))))
+        second = asyncio.ensure_future(builder.sign(PKPass(('icon.png', b'1'), ('pass.json', b'2'))))
+        await asyncio.sleep(0.1)
+        second.cancel()
+        release.set()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        builder.close()
+
+    run(build())
+    assert len(signed) == 1
+
+
+def test_should_propagate_errors(pkpass):
+    async def build():
+        async with AsyncPassBuilder() as builder:
+            await builder.archive(pkpass)
+
+    with pytest.raises(Exception):
+        run(build())
@@ -0,0 +1,77 @@
+import io
+import zipfile
+from hashlib import sha1
+
+import pytest
+
+from airpress import PKPass
+from airpress.archive import ArchivedAsset
+
+
+@pytest.fixture
+def archive(cert, key):
+    p = PKPass(
+        ('icon.png', b'00001111' * 1000),
+        ('logo.png', b'11001100' * 1000),
+        ('pass.json', b'{"serialNumber": "1"}'),
+    )
+    p.sign(cert=cert, key=key)
+    return bytes(p)
+
+
+def test_should_load_pkpass_from_archive(archive):
+    p = PKPass.from_archive(archive)
+
+    assert isinstance(p['icon.png'], ArchivedAsset)
+    assert p['icon.png'].read() == b'00001111' * 1000
+    assert p['pass.json'].read() == b'{"serialNumber": "1"}'
+
+
+@pytest.mark.parametrize('source', [bytes, io.BytesIO])
+def test_should_rebuild_identical_archive_without_signing(archive, source):
+    p = PKPass.from_archive(source(archive))
+
+    rebuilt = bytes(p)
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as original, \
+            zipfile.ZipFile(io.BytesIO(rebuilt)) as copy:
+        for info in original.infolist():
+            assert copy.read(info.filename) == original.read(info.filename)
+
+
+def test_should_load_pkpass_from_path(archive, tmp_path):
+    path = tmp_path / 'pass.pkpass'
+    path.write_bytes(archive)
+    assert PKPass.from_archive(str(path))['logo.png'].read() == b'11001100' * 1000
+
+
+def test_should_only_hash_and_compress_changed_assets(archive, cert, key, monkeypatch):
+    from airpress import compressor
+    hashed = []
+    monkeypatch.setattr(compressor, 'asset_sha1', lambda data: hashed.append(data) or sha1(data).hexdigest())
+    p = PKPass.from_archive(archive)
+
+    p['pass.json'] = b'{"serialNumber": "2"}'
+    p.sign(cert=cert, key=key)
+    updated = bytes(p)
+
+    assert hashed == [b'{"serialNumber": "2"}']
+    with zipfile.ZipFile(io.BytesIO(updated)) as z:
+        assert z.testzip() is None
+        assert z.read('pass.json') == b'{"serialNumber": "2"}'
+        assert z.read('icon.png') == b'00001111' * 1000
+        assert z.read('manifest.json') == p.manifest
+
+
+def test_should_raise_assertion_error_for_tampered_asset_when_verifying(cert, key):
+    p = PKPass(('icon.png', b'00001111'), ('pass.json', b'11110000'))
+    p.sign(cert=cert, key=key)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(bytes(p))) as original, zipfile.ZipFile(buffer, 'w') as copy:
+        for info in original.infolist():
+            data = b'tampered' if info.filename == 'icon.png' else original.read(info)
+            copy.writestr(info.filename, data)
+
+    assert PKPass.from_archive(buffer.getvalue())
+    with pytest.raises(AssertionError):
+        PKPass.from_archive(buffer.getvalue(), verify=True)
@@ -1,5 +1,14 @@
+import io
+import mmap
+import os
+import zipfile
+from hashlib import sha1
+
 import pytest
 
+from airpress import CompressionPolicy, FileAsset
+from airpress.assets import LazyAsset
+
 
 def test_should_add_valid_asset_to_pkpass_using_helper_method(pkpass):
     asset = ('pass.json', b'00001111')
@@ -65,3 +74,48 @@ def test_should_raise_assertion_error_adding_unsupported_asset(pkpass):
 def test_should_explicitly_add_unsupported_asset(pkpass):
     asset = ('unknown.doc', b'11000011')
     pkpass.add_to_pass_package(asset, validate=False)
+
+
+@pytest.mark.parametrize('wrap', [bytearray, memoryview, lambda data: memoryview(data).cast('H')])
+def test_should_add_bytes_like_asset(pkpass, wrap):
+    data = wrap(b'00001111')
+    pkpass['pass.json'] = data
+    assert pkpass['pass.json'] == b'00001111'
+
+
+def test_should_raise_assertion_error_for_empty_file_asset(pkpass, tmp_path):
+    path = tmp_path / 'pass.json'
+    path.write_bytes(b'')
+    with pytest.raises(AssertionError):
+        pkpass['pass.json'] = FileAsset(path)
+
+
+def test_should_require_lazy_assets_to_implement_iteration():
+    with pytest.raises(TypeError):
+        LazyAsset()
+
+
+def test_should_hash_and_compress_buffer_and_file_assets(pkpass, tmp_path, cert, key):
+    icon = os.urandom(1000)
+    pass_json = b'{"serialNumber": "1"}' * 100
+    path = tmp_path / 'pass.json'
+    path.write_bytes(pass_json)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        pkpass.add_to_pass_package(
+            ('icon.png', memoryview(icon)),
+            ('logo.png', mapped),
+            ('pass.json', FileAsset(path, chunk_size=64)),
+        )
+        pkpass.sign(cert=cert, key=key)
+
+        assert pkpass.manifest_dict == {
+            'icon.png': sha1(icon).hexdigest(),
+            'logo.png': sha1(pass_json).hexdigest(),
+            'pass.json': sha1(pass_json).hexdigest(),
+        }
+        pkpass.compression = CompressionPolicy(stored=('pass.json',))
+        with zipfile.ZipFile(io.BytesIO(bytes(pkpass))) as archive:
+            assert archive.testzip() is None
+            assert archive.read('icon.png') == icon
+            assert archive.read('logo.png') == pass_json
+            assert archive.read('pass.json') == pass_json
@@ -0,0 +1,44 @@
+import io
+import zipfile
+
+import pytest
+
+from airpress import build_many
+
+
+def specs(count):
+    return [
+        {'icon.png': b'00001111', 'pass.json': b'{"serialNumber": "%d"}' % i}
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_should_build_passes_in_input_order(signer, workers):
+    results = list(build_many(specs(10), signer, workers=workers, chunksize=3))
+
+    assert [r.index for r in results] == list(range(10))
+    for i, result in enumerate(results):
+        assert result.error is None
+        with zipfile.ZipFile(io.BytesIO(result.archive)) as archive:
+            assert archive.read('pass.json') == b'{"serialNumber": "%d"}' % i
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_should_report_errors_per_pass_without_failing_batch(signer, workers):
+    batch = specs(3)
+    batch[1] = [('pass.json', b'11110000')]  # missing icon
+
+    results = list(build_many(batch, signer, workers=workers))
+
+    assert results[0].archive and results[2].archive
+    assert results[1].archive is None
+    assert isinstance(results[1].error, AssertionError)
+
+
+def test_should_build_passes_with_unsupported_assets_without_validation(signer):
+    batch = [[('icon.png', b'00001111'), ('pass.json', b'{}'), ('unknown.doc', b'1')]]
+
+    result, = build_many(batch, signer, workers=1, validate=False)
+
+    assert result.error is None
@@ -0,0 +1,68 @@
+import io
+import zipfile
+
+import pytest
+
+from airpress import PassBundle, PassTemplate
+from airpress.reader import verify
+
+
+@pytest.fixture
+def template():
+    return PassTemplate(('icon.png', b'00001111' * 100), ('logo.png', b'logo'))
+
+
+def test_should_store_every_pass_in_bundle(template, signer, cert):
+    bundle = PassBundle.from_template(
+        template, [b'{"serialNumber": "%d"}' % i for i in range(3)], signer=signer
+    )
+
+    archive = bytes(bundle)
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as z:
+        assert z.testzip() is None
+        assert z.namelist() == ['pass-1.pkpass', 'pass-2.pkpass', 'pass-3.pkpass']
+        assert {i.compress_type for i in z.infolist()} == {zipfile.ZIP_STORED}
+        for i, name in enumerate(z.namelist()):
+            inner = z.read(name)
+            assert verify(inner, trusted_certificates=[cert], check_time=False).ok
+            with zipfile.ZipFile(io.BytesIO(inner)) as p:
+                assert p.read('pass.json') == b'{"serialNumber": "%d"}' % i
+
+
+def test_should_share_template_members_between_passes(template, signer):
+    bundle = PassBundle.from_template(template, [b'{}', b'{"a": 1}'], signer=signer)
+
+    with zipfile.ZipFile(io.BytesIO(bytes(bundle))) as z:
+        first, second = (zipfile.ZipFile(io.BytesIO(z.read(n))) for n in z.namelist())
+    assert first.read('icon.png') == second.read('icon.png') == template['icon.png']
+
+
+def test_should_stream_bundle_same_as_bytes(template, signer):
+    p1, p2 = template.new_pass(('pass.json', b'{}')), template.new_pass(('pass.json', b'{}'))
+    bundle = PassBundle(('first.pkpass', p1), p2, signer=signer)
+    date_time = (2020, 5, 17, 12, 0, 0)
+    output = io.BytesIO()
+
+    written = bundle.write_to(output)
+
+    assert written == len(output.getvalue())
+    assert b''.join(bundle.iter_pieces(date_time)) == b''.join(bundle.iter_pieces(date_time))
+    with zipfile.ZipFile(output) as z:
+        assert z.namelist() == ['first.pkpass', 'pass-2.pkpass']
+
+
+def test_should_use_signatures_of_signed_passes(template, cert, key):
+    p = template.new_pass(('pass.json', b'{}'))
+    p.sign(cert, key)
+
+    with zipfile.ZipFile(io.BytesIO(bytes(PassBundle(p)))) as z:
+        assert z.read('pass-1.pkpass')
+
+
+def test_should_raise_assertion_error_adding_pass_with_duplicate_name(pkpass_with_assets):
+    bundle = PassBundle(('a.pkpass', pkpass_with_assets))
+    with pytest.raises(AssertionError):
+        bundle.add(pkpass_with_assets, 'a.pkpass')
+    with pytest.raises(AssertionError):
+        bundle.add(pkpass_with_assets, 'a.zip')
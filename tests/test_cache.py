@@ -0,0 +1,79 @@
+import os
+import time
+
+import pytest
+
+from airpress import ArchiveCache, PKPass
+
+
+@pytest.fixture
+def new_pkpass():
+    def new_pkpass(pass_json=b'11110000'):
+        return PKPass(('icon.png', b'00001111'), ('pass.json', pass_json))
+    return new_pkpass
+
+
+def test_should_expose_manifest_digest_as_etag(new_pkpass):
+    first, second = new_pkpass(), new_pkpass()
+    assert first.etag == second.etag == f'"{first.manifest_digest}"'
+    assert new_pkpass(b'00000000').etag != first.etag
+
+
+def test_should_return_cached_archive_without_signing(new_pkpass, cert, key):
+    cache = ArchiveCache()
+    archive = cache.build(new_pkpass(), cert=cert, key=key)
+
+    p = new_pkpass()
+    assert cache.build(p, cert=b'', key=b'') == archive
+    with pytest.raises(AttributeError):
+        _ = p.signature
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_should_rebuild_changed_pass(new_pkpass, cert, key):
+    cache = ArchiveCache()
+    archive = cache.build(new_pkpass(), cert=cert, key=key)
+    assert cache.build(new_pkpass(b'00000000'), cert=cert, key=key) != archive
+
+
+def test_should_evict_archives_exceeding_memory_budget():
+    cache = ArchiveCache(max_size=10)
+    cache.put('a', b'0' * 6)
+    cache.put('b', b'1' * 6)
+    assert cache.get('a') is None
+    assert cache.get('b') == b'1' * 6
+
+
+def test_should_read_archives_from_disk_tier(tmp_path):
+    ArchiveCache(directory=str(tmp_path)).put('a', b'archive')
+
+    cache = ArchiveCache(directory=str(tmp_path))
+
+    assert cache.get('a') == b'archive'
+    assert cache.stats.disk_hits == 1
+
+
+def test_should_expire_archives_after_ttl(tmp_path):
+    cache = ArchiveCache(directory=str(tmp_path), ttl=60)
+    cache.put('a', b'archive')
+    cache.clear()
+    past = time.time() - 120
+    os.utime(tmp_path / 'a.pkpass', (past, past))
+
+    assert cache.get('a') is None
+    assert not (tmp_path / 'a.pkpass').exists()
+
+
+def test_should_sweep_expired_archives_from_disk_tier(tmp_path):
+    ArchiveCache(directory=str(tmp_path)).put('a', b'archive')
+    past = time.time() - 120
+    os.utime(tmp_path / 'a.pkpass', (past, past))
+
+    cache = ArchiveCache(directory=str(tmp_path), ttl=60)
+    cache.put('b', b'archive')
+
+    assert sorted(os.listdir(tmp_path)) == ['b.pkpass']
+    os.utime(tmp_path / 'b.pkpass', (past, past))
+    assert cache.sweep() == 1
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,190 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+from airpress import cli, crypto
+
+CREDENTIALS = os.path.join(os.path.dirname(__file__), 'credentials')
+
+
+@pytest.fixture
+def template(tmp_path):
+    directory = tmp_path / 'template'
+    directory.mkdir()
+    (directory / 'icon.png').write_bytes(b'00001111')
+    (directory / 'pass.json').write_text(json.dumps({
+        'formatVersion': 1,
+        'serialNumber': '',
+        'barcodes': [{'format': 'PKBarcodeFormatQR', 'message': ''}],
+    }))
+    return directory
+
+
+def run(template, data, *args):
+    return cli.main([
+        str(template),
+        '--cert', os.path.join(CREDENTIALS, 'unprotected_dummy_cert.pem'),
+        '--key', os.path.join(CREDENTIALS, 'unprotected_dummy_key.pem'),
+        '--data', str(data),
+        *args,
+    ])
+
+
+def read_pass_json(archive):
+    with zipfile.ZipFile(io.BytesIO(archive)) as z:
+        return json.loads(z.read('pass.json'))
+
+
+@pytest.mark.parametrize('workers', ['0', '2'])
+def test_should_build_pass_for_every_csv_row(template, tmp_path, workers):
+    data = tmp_path / 'data.csv'
+    data.write_text('serialNumber,barcodes.0.message\nA1,one\nA2,two\n')
+    output = tmp_path / 'passes'
+
+    assert run(template, data, '--output', str(output), '--workers', workers) == 0
+
+    assert sorted(os.listdir(output)) == ['A1.pkpass', 'A2.pkpass']
+    document = read_pass_json((output / 'A2.pkpass').read_bytes())
+    assert document['serialNumber'] == 'A2'
+    assert document['formatVersion'] == 1
+    assert document['barcodes'] == [{'format': 'PKBarcodeFormatQR', 'message': 'two'}]
+
+
+def test_should_write_jsonl_records_to_single_archive(template, tmp_path):
+    data = tmp_path / 'data.jsonl'
+    data.write_text('{"serialNumber": "A1"}\n\n{"serialNumber": "A2", "formatVersion": 2}\n')
+    output = tmp_path / 'passes.zip'
+
+    assert run(template, data, '--output-archive', str(output), '--workers', '0') == 0
+
+    with zipfile.ZipFile(output) as z:
+        assert z.namelist() == ['A1.pkpass', 'A2.pkpass']
+        assert read_pass_json(z.read('A2.pkpass'))['formatVersion'] == 2
+
+
+@pytest.mark.parametrize('output_option', ['--output', '--output-archive'])
+def test_should_resume_after_records_in_checkpoint(template, tmp_path, output_option):
+    data = tmp_path / 'data.jsonl'
+    data.write_text('{"serialNumber": "A1"}\n')
+    output = tmp_path / 'passes'
+    checkpoint = tmp_path / 'progress.json'
+    args = (output_option, str(output), '--workers', '0', '--checkpoint', str(checkpoint))
+
+    assert run(template, data, *args) == 0
+    assert json.loads(checkpoint.read_text()) == {'done': 1, 'failed': 0}
+
+    data.write_text('{"serialNumber": "A1", "formatVersion": 2}\n{"serialNumber": "A2"}\n')
+    assert run(template, data, *args) == 0
+    assert json.loads(checkpoint.read_text()) == {'done': 2, 'failed': 0}
+
+    if output_option == '--output':
+        first = (output / 'A1.pkpass').read_bytes()
+        assert sorted(os.listdir(output)) == ['A1.pkpass', 'A2.pkpass']
+    else:
+        with zipfile.ZipFile(output) as z:
+            assert z.namelist() == ['A1.pkpass', 'A2.pkpass']
+            first = z.read('A1.pkpass')
+    # First record was not built again
+    assert read_pass_json(first)['formatVersion'] == 1
+
+
+CRASHING_WRITER = """
+import os, sys
+from airpress.cli import ArchiveOutput
+
+output = ArchiveOutput(sys.argv[1], resume=sys.argv[2] == 'resume')
+for name in sys.argv[3:]:
+    output.write(name + '.pkpass', os.urandom(100000))
+output.flush()
+output.write('late.pkpass', os.urandom(100000))
+output._archive.fp.flush()
+os._exit(1)
+"""
+
+
+def test_should_keep_checkpointed_passes_in_archive_after_crash(tmp_path):
+    path = str(tmp_path / 'passes.zip')
+
+    def crash(mode, *names):
+        process = subprocess.run([sys.executable, '-c', CRASHING_WRITER, path, mode, *names])
+        assert process.returncode == 1
+
+    crash('new', '1', '2', '3')
+    crash('resume', '3', '4', '5')
+
+    output = cli.ArchiveOutput(path, resume=True)
+    output.close()
+    with zipfile.ZipFile(path) as z:
+        assert z.namelist() == ['1.pkpass', '2.pkpass', '3.pkpass', '4.pkpass', '5.pkpass']
+        assert z.testzip() is None
+    assert not os.path.exists(path + '.tail')
+
+
+def test_should_report_failed_records_without_stopping(template, tmp_path, capsys):
+    data = tmp_path / 'data.jsonl'
+    data.write_text('{"serialNumber": "A1"}\n{"barcodes": {"5": {}}}\n{"serialNumber": "A3"}\n')
+    output = tmp_path / 'passes'
+
+    assert run(template, data, '--output', str(output), '--workers', '0') == 1
+
+    assert sorted(os.listdir(output)) == ['A1.pkpass', 'A3.pkpass']
+    assert 'Record 1 failed' in capsys.readouterr().err
+
+
+def test_should_count_failures_from_before_resume(template, tmp_path, capsys):
+    data = tmp_path / 'data.jsonl'
+    data.write_text('{"barcodes": {"5": {}}}\n')
+    output = tmp_path / 'passes'
+    checkpoint = tmp_path / 'progress.json'
+    args = ('--output', str(output), '--workers', '0', '--checkpoint', str(checkpoint))
+
+    assert run(template, data, *args) == 1
+
+    data.write_text('{"barcodes": {"5": {}}}\n{"serialNumber": "A2"}\n')
+    assert run(template, data, *args) == 1
+    assert json.loads(checkpoint.read_text()) == {'done': 2, 'failed': 1}
+    assert '2 records, 1 failed' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('output_option', ['--output', '--output-archive'])
+def test_should_report_records_with_duplicate_name_as_failed(
+        template, tmp_path, capsys, output_option):
+    data = tmp_path / 'data.jsonl'
+    data.write_text('{"serialNumber": "A1"}\n{"serialNumber": "A1", "formatVersion": 2}\n')
+    output = tmp_path / 'passes'
+
+    assert run(template, data, output_option, str(output), '--workers', '0') == 1
+
+    assert 'Record 1 failed' in capsys.readouterr().err
+    if output_option == '--output':
+        first = (output / 'A1.pkpass').read_bytes()
+    else:
+        with zipfile.ZipFile(output) as z:
+            assert z.namelist() == ['A1.pkpass']
+            first = z.read('A1.pkpass')
+    assert read_pass_json(first)['formatVersion'] == 1
+
+
+def test_should_read_key_password_from_file_or_environment(tmp_path, monkeypatch):
+    path = tmp_path / 'password'
+    path.write_bytes(b'secret\n')
+    monkeypatch.setenv(crypto.KEY_PASSWORD_ENV, 'from-env')
+
+    assert crypto.read_key_password(str(path)) == b'secret'
+    assert crypto.read_key_password() == b'from-env'
+    monkeypatch.delenv(crypto.KEY_PASSWORD_ENV)
+    assert crypto.read_key_password() is None
+
+
+def test_should_merge_records_into_nested_document():
+    document = {'a': {'b': 1, 'c': [{'d': 2}, {'d': 3}]}, 'e': 4}
+
+    merged = cli.merge(document, cli.expand_keys({'a.c.1.d': 5, 'a.f': 6, 'e': 7}))
+
+    assert merged == {'a': {'b': 1, 'c': [{'d': 2}, {'d': 5}], 'f': 6}, 'e': 7}
+    assert document['a']['c'][1] == {'d': 3}
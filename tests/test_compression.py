@@ -1,5 +1,12 @@
+import io
+import os
+import zipfile
+
 import pytest
 
+from airpress import CompressionPolicy, FileAsset, PKPass, STORE_PNG_COMPRESSION
+from airpress.archive import compress_member
+
 
 def test_checks_signed_pass_package_contains_assets_manifest_and_signature(
         pkpass_with_assets, cert, key
@@ -32,3 +39,112 @@ def test_should_compress_signed_pass_package_into_pkpass_archive_as_callable(
 def test_should_fail_to_compress_pass_package_if_another_exception_occurs(pkpass_with_assets):
     with pytest.raises(Exception):
         _ = bytes(pkpass_with_assets)
+
+
+def test_should_create_valid_zip_archive(pkpass_with_assets, cert, key):
+    pkpass_with_assets.sign(cert=cert, key=key)
+
+    with zipfile.ZipFile(io.BytesIO(bytes(pkpass_with_assets))) as archive:
+        assert archive.testzip() is None
+        assert archive.read('icon.png') == b'00001111'
+        assert archive.read('manifest.json') == pkpass_with_assets.manifest
+        assert archive.read('signature') == pkpass_with_assets.signature
+
+
+def test_should_write_pkpass_archive_to_file_object(pkpass_with_assets, cert, key):
+    pkpass_with_assets.sign(cert=cert, key=key)
+    output = io.BytesIO()
+
+    written = pkpass_with_assets.write_to(output)
+
+    assert written == len(output.getvalue())
+    with zipfile.ZipFile(output) as archive:
+        assert archive.testzip() is None
+
+
+@pytest.mark.parametrize('chunk_size', [1, 100, 1024 * 1024])
+def test_should_stream_pkpass_archive_in_chunks(pkpass_with_assets, cert, key, chunk_size):
+    pkpass_with_assets.sign(cert=cert, key=key)
+
+    chunks = list(pkpass_with_assets.iter_chunks(chunk_size))
+
+    assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= chunk_size
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+        assert archive.testzip() is None
+
+
+def test_should_fail_to_stream_pass_package_if_another_exception_occurs(pkpass_with_assets):
+    with pytest.raises(Exception):
+        pkpass_with_assets.iter_chunks()
+
+
+def test_should_compress_members_according_to_compression_policy(cert, key):
+    pkpass = PKPass(
+        ('icon.png', b'00001111' * 64),
+        ('pass.json', b'11110000' * 64),
+        compression=STORE_PNG_COMPRESSION,
+    )
+    pkpass.sign(cert=cert, key=key)
+
+    with zipfile.ZipFile(io.BytesIO(bytes(pkpass))) as archive:
+        assert archive.getinfo('icon.png').compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo('pass.json').compress_type == zipfile.ZIP_DEFLATED
+        assert archive.read('icon.png') == b'00001111' * 64
+
+
+def test_compression_policy_should_store_incompressible_members_in_auto_mode():
+    policy = CompressionPolicy(auto=True)
+    assert policy.choose('icon.png', os.urandom(8192)) == (zipfile.ZIP_STORED, None)
+    assert policy.choose('icon.png', b'0' * 8192) == (zipfile.ZIP_DEFLATED, None)
+
+
+def test_compression_policy_should_store_large_png_in_auto_mode(tmp_path):
+    # Headers and metadata compress well, image data doesn't
+    png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 3500 + os.urandom(500000)
+    path = tmp_path / 'strip@3x.png'
+    path.write_bytes(png)
+    policy = CompressionPolicy(auto=True)
+
+    assert policy.choose('strip@3x.png', png) == (zipfile.ZIP_STORED, None)
+    assert policy.choose('strip@3x.png', FileAsset(path)) == (zipfile.ZIP_STORED, None)
+
+
+def test_should_raise_value_error_for_unsupported_compression_method():
+    with pytest.raises(ValueError):
+        compress_member(b'{}', zipfile.ZIP_BZIP2)
+
+
+def test_compression_policy_should_use_deflate_level_for_matching_suffix():
+    policy = CompressionPolicy(level=1, levels={'.json': 9})
+    assert policy.choose('pass.json', b'{}') == (zipfile.ZIP_DEFLATED, 9)
+    assert policy.choose('icon.png', b'{}') == (zipfile.ZIP_DEFLATED, 1)
+
+
+def test_should_recompress_members_after_compression_policy_was_changed(pkpass_with_assets, cert, key):
+    pkpass_with_assets.sign(cert=cert, key=key)
+    _ = bytes(pkpass_with_assets)
+
+    pkpass_with_assets.compression = CompressionPolicy(stored=('.png',))
+
+    with zipfile.ZipFile(io.BytesIO(bytes(pkpass_with_assets))) as archive:
+        assert archive.getinfo('icon.png').compress_type == zipfile.ZIP_STORED
+
+
+def test_should_create_identical_archives_in_deterministic_mode():
+    class StaticSigner:
+        def sign(self, data):
+            return b'signature'
+
+    def build(*assets):
+        p = PKPass(*assets, deterministic=True)
+        p.sign(signer=StaticSigner())
+        return bytes(p)
+
+    first = build(('pass.json', b'11110000'), ('icon.png', b'00001111'), ('logo.png', b'1'))
+    second = build(('logo.png', b'1'), ('icon.png', b'00001111'), ('pass.json', b'11110000'))
+
+    assert first == second
+    with zipfile.ZipFile(io.BytesIO(first)) as archive:
+        assert archive.namelist() == ['icon.png', 'logo.png', 'pass.json', 'manifest.json', 'signature']
+        assert {info.date_time for info in archive.infolist()} == {(1980, 1, 1, 0, 0, 0)}
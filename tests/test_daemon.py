@@ -0,0 +1,128 @@
+import pickle
+import socket
+import threading
+import time
+
+import pytest
+
+from airpress import PKPass
+from airpress.crypto import pkcs7_verify
+from airpress.daemon import RemoteSigner, SigningDaemon
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, 'AF_UNIX'), reason='Unix domain sockets are not available'
+)
+
+
+@pytest.fixture
+def daemon(tmp_path, signer):
+    with SigningDaemon(str(tmp_path / 'airpress.sock'), signer, workers=2) as d:
+        yield d
+
+
+class FailingSigner:
+    def sign(self, data):
+        raise ValueError('broken key')
+
+
+class SlowEchoSigner:
+    def sign(self, data):
+        time.sleep(0.0005)
+        return data
+
+
+def test_should_sign_pass_with_remote_signer(daemon, cert):
+    p = PKPass(('icon.png', b'00001111'), ('pass.json', b'11110000'))
+
+    with RemoteSigner(daemon.path) as remote:
+        signature = p.sign(signer=remote)
+
+    pkcs7_verify(signature, p.manifest, [cert], check_time=False)
+
+
+def test_should_pipeline_requests_of_many_threads(daemon):
+    remote = RemoteSigner(daemon.path, timeout=30)
+    manifests = [b'{"pass.json": "%d"}' % i for i in range(40)]
+    futures = [remote.submit(m) for m in manifests]
+    signatures = {}
+
+    def sign(i):
+        signatures[i] = remote.sign(manifests[i])
+
+    threads = [threading.Thread(target=sign, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(f.result(30) for f in futures)
+    assert len(signatures) == 8
+    stats = remote.stats()
+    assert stats.requests == 48
+    assert stats.errors == 0
+    assert stats.queue_depth == 0
+    assert stats.sign_time['count'] == 48
+    remote.close()
+
+
+def test_should_pipeline_requests_beyond_queue_limit(tmp_path):
+    manifests = [b'%04d' % i * 1024 for i in range(5000)]
+    futures = []
+
+    with SigningDaemon(str(tmp_path / 'airpress.sock'), SlowEchoSigner(), workers=2, max_queue=64) as d:
+        with RemoteSigner(d.path, timeout=30) as remote:
+            # Submitted from another thread, so a deadlock fails the test instead of hanging it
+            sender = threading.Thread(target=lambda: futures.extend(map(remote.submit, manifests)))
+            sender.start()
+            sender.join(30)
+            assert not sender.is_alive()
+            assert [f.result(30) for f in futures] == manifests
+
+
+def test_should_raise_error_of_daemon_signer(tmp_path):
+    with SigningDaemon(str(tmp_path / 'airpress.sock'), FailingSigner(), workers=1) as d:
+        with RemoteSigner(d.path) as remote:
+            with pytest.raises(RuntimeError, match='broken key'):
+                remote.sign(b'{}')
+            assert remote.stats().errors == 1
+
+
+def test_should_fail_pending_requests_when_daemon_stops(daemon):
+    remote = RemoteSigner(daemon.path, timeout=30)
+    assert remote.sign(b'{}')
+    daemon.close()
+
+    with pytest.raises((ConnectionError, OSError)):
+        remote.sign(b'{}')
+
+
+def test_should_stop_every_signing_thread_on_close(tmp_path, signer):
+    # Queue is smaller than the number of threads
+    d = SigningDaemon(str(tmp_path / 'airpress.sock'), signer, workers=4, max_queue=2)
+    d.close()
+    for _ in range(d.workers):
+        d._spawn(d._sign_loop)
+
+    for thread in d._threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in d._threads)
+
+
+def test_should_not_replace_file_other_than_socket(tmp_path, signer):
+    path = tmp_path / 'airpress.sock'
+    path.write_bytes(b'data')
+
+    with pytest.raises(FileExistsError):
+        SigningDaemon(str(path), signer)
+    assert path.read_bytes() == b'data'
+
+
+def test_should_pickle_remote_signer_without_connection(daemon):
+    remote = RemoteSigner(daemon.path)
+    remote.sign(b'{}')
+
+    copy = pickle.loads(pickle.dumps(remote))
+
+    assert copy.sign(b'{}')
+    remote.close()
+    copy.close()
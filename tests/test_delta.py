@@ -0,0 +1,96 @@
+import io
+import zipfile
+
+import pytest
+
+from airpress import DeltaIndex, PassTemplate
+
+
+@pytest.fixture
+def template():
+    return PassTemplate(('icon.png', b'00001111'))
+
+
+def passes(template, gates):
+    return [
+        (f'S{i}', template.new_pass(('pass.json', b'{"gate": "%s"}' % gate.encode())))
+        for i, gate in enumerate(gates)
+    ]
+
+
+def test_should_regenerate_only_changed_passes(template, signer):
+    index = DeltaIndex()
+    first = list(index.regenerate(passes(template, ['A', 'A', 'A']), signer=signer))
+    assert [r.serial for r in first] == ['S0', 'S1', 'S2']
+    assert len(index) == 3
+
+    second = list(index.regenerate(passes(template, ['A', 'B', 'A', 'C']), signer=signer))
+
+    assert [r.serial for r in second] == ['S1', 'S3']
+    with zipfile.ZipFile(io.BytesIO(second[0].archive)) as z:
+        assert b'"gate": "B"' in z.read('pass.json')
+    assert index.get('S1') == second[0].digest
+
+
+def test_should_not_sign_unchanged_passes(template, signer, monkeypatch):
+    index = DeltaIndex()
+    list(index.regenerate(passes(template, ['A']), signer=signer))
+
+    unchanged = passes(template, ['A'])
+    monkeypatch.setattr(unchanged[0][1], 'sign', None)
+
+    assert list(index.regenerate(unchanged, signer=signer)) == []
+
+
+def test_should_only_report_changes_without_building(template):
+    index = DeltaIndex()
+    index.update({'S0': template.new_pass(('pass.json', b'{}')).manifest_digest})
+
+    results = list(index.regenerate(passes(template, ['A']), build=False))
+
+    assert [(r.serial, r.archive) for r in results] == [('S0', None)]
+    assert index.get('S0') == results[0].digest
+
+
+def test_should_not_record_digest_of_interrupted_pass(template, signer):
+    index = DeltaIndex(commit_every=1)
+    results = index.regenerate(passes(template, ['A', 'A', 'A']), signer=signer)
+    next(results)
+    next(results)
+    results.close()
+
+    assert 'S0' in index
+    assert 'S1' not in index and 'S2' not in index
+
+
+def test_should_persist_index_in_file(tmp_path, template):
+    path = str(tmp_path / 'index.sqlite')
+    with DeltaIndex(path) as index:
+        list(index.regenerate(passes(template, ['A', 'B']), build=False))
+        index.delete('S1')
+
+    with DeltaIndex(path) as index:
+        results = index.regenerate(passes(template, ['A', 'B']), build=False)
+        assert [r.serial for r in results] == ['S1']
+
+
+def test_should_report_failed_passes_without_recording_them(template, signer):
+    index = DeltaIndex()
+    batch = passes(template, ['A', 'B', 'C'])
+    batch[1] = ('S1', PassTemplate(('logo.png', b'0')).new_pass(('pass.json', b'{}')))
+    batch.insert(2, ('S3', template.new_pass(('pass.json', b'{}'))))
+
+    def broken_sign(**kwargs):
+        raise ValueError('broken key')
+
+    batch[2][1].sign = broken_sign
+
+    results = list(index.regenerate(batch, signer=signer))
+
+    assert [(r.serial, type(r.error)) for r in results] == [
+        ('S0', type(None)), ('S1', AssertionError), ('S3', ValueError), ('S2', type(None)),
+    ]
+    assert results[1].digest is None and results[2].digest is not None
+    assert results[1].archive is None and results[2].archive is None
+    assert 'S0' in index and 'S2' in index
+    assert 'S1' not in index and 'S3' not in index
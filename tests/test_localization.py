@@ -0,0 +1,100 @@
+import io
+import zipfile
+
+import pytest
+
+from airpress import CompressionPolicy, PassTemplate, StatsObserver
+from airpress import compressor
+from airpress import template as template_module
+
+STRINGS = b'"title" = "Boarding pass";'
+
+
+def test_should_accept_assets_in_lproj_directories(pkpass_with_assets):
+    pkpass_with_assets.add_to_pass_package(
+        ('en.lproj/pass.strings', STRINGS),
+        ('zh-Hans.lproj/logo@2x.png', b'logo'),
+        ('pt_BR.lproj/strip.png', b'strip'),
+    )
+    assert 'zh-Hans.lproj/logo@2x.png' in pkpass_with_assets.manifest_dict
+
+
+@pytest.mark.parametrize('name', [
+    'en.lproj/pass.json',
+    'en.lproj/other.png',
+    'english1.lproj/pass.strings',
+    'en.lproj/nested/pass.strings',
+    'pass.strings',
+])
+def test_should_raise_assertion_error_adding_unsupported_localized_asset(pkpass, name):
+    with pytest.raises(AssertionError):
+        pkpass.add_to_pass_package((name, STRINGS))
+
+
+def test_should_raise_assertion_error_adding_localization_of_invalid_language(pkpass):
+    with pytest.raises(AssertionError):
+        pkpass.add_localization('en/../x', ('pass.strings', STRINGS))
+
+
+def test_should_add_localization_under_language_directory(pkpass_with_assets):
+    pkpass_with_assets.add_localization('de', ('pass.strings', STRINGS), ('logo.png', b'logo'))
+
+    assert pkpass_with_assets['de.lproj/pass.strings'] == STRINGS
+    assert pkpass_with_assets['de.lproj/logo.png'] == b'logo'
+
+
+def test_should_hash_and_compress_identical_localizations_once(pkpass_with_assets, cert, key,
+                                                                monkeypatch):
+    languages = ['en', 'de', 'fr', 'pl', 'es']
+    for language in languages:
+        # Equal, but separate objects
+        pkpass_with_assets.add_localization(language, ('pass.strings', bytes(bytearray(STRINGS))))
+    hashed = []
+    original_sha1 = compressor.asset_sha1
+    monkeypatch.setattr(
+        compressor, 'asset_sha1', lambda data: hashed.append(data) or original_sha1(data)
+    )
+    observer = StatsObserver()
+    pkpass_with_assets.observer = observer
+
+    pkpass_with_assets.sign(cert, key)
+    archive = bytes(pkpass_with_assets)
+
+    assert len(hashed) == 3
+    assert observer.snapshot()['cache']['member'] == {'hits': 4, 'misses': 3}
+    with zipfile.ZipFile(io.BytesIO(archive)) as z:
+        for language in languages:
+            assert z.read(f'{language}.lproj/pass.strings') == STRINGS
+
+
+def test_should_not_share_members_compressed_differently(pkpass_with_assets, cert, key):
+    pkpass_with_assets.compression = CompressionPolicy(stored=('de.lproj/logo.png',))
+    pkpass_with_assets.add_localization('en', ('logo.png', b'logo' * 100))
+    pkpass_with_assets.add_localization('de', ('logo.png', b'logo' * 100))
+    pkpass_with_assets.sign(cert, key)
+
+    with zipfile.ZipFile(io.BytesIO(bytes(pkpass_with_assets))) as z:
+        assert z.getinfo('en.lproj/logo.png').compress_type == zipfile.ZIP_DEFLATED
+        assert z.getinfo('de.lproj/logo.png').compress_type == zipfile.ZIP_STORED
+        assert z.read('de.lproj/logo.png') == b'logo' * 100
+
+
+def test_should_hash_template_asset_shared_by_localizations_once(monkeypatch):
+    hashed = []
+    original_sha1 = compressor.asset_sha1
+    monkeypatch.setattr(
+        template_module, 'asset_sha1', lambda data: hashed.append(data) or original_sha1(data)
+    )
+    logo = b'logo' * 100
+
+    # Every locale has its own copy, just like files read from disk
+    assets = [('logo.png', logo), ('pass.strings', STRINGS)]
+    template = PassTemplate(*(
+        (f'{language}.lproj/{name}', bytes(bytearray(data)))
+        for language in ['en', 'de'] for name, data in assets
+    ))
+
+    assert len(hashed) == 2
+    assert template.members['en.lproj/logo.png'] is template.members['de.lproj/logo.png']
+    assert template.members['en.lproj/pass.strings'] is template.members['de.lproj/pass.strings']
+    assert template['en.lproj/pass.strings'] is template['de.lproj/pass.strings']
@@ -1,3 +1,5 @@
+from hashlib import sha1
+
 import pytest
 
 
@@ -37,3 +39,25 @@ def test_should_generate_non_empty_manifest_bytes_object(pkpass):
 
     assert isinstance(pkpass.manifest, bytes)
     assert pkpass.manifest == expected_manifest_bytes
+
+
+def test_should_hash_only_changed_assets(pkpass_with_assets, monkeypatch):
+    from airpress import compressor
+    _ = pkpass_with_assets.manifest_dict
+    hashed = []
+    monkeypatch.setattr(compressor, 'asset_sha1', lambda data: hashed.append(data) or sha1(data).hexdigest())
+
+    pkpass_with_assets['pass.json'] = b'00110011'
+    manifest_dict = pkpass_with_assets.manifest_dict
+
+    assert hashed == [b'00110011']
+    assert manifest_dict['pass.json'] == sha1(b'00110011').hexdigest()
+
+
+def test_should_update_manifest_after_asset_was_removed(pkpass_with_assets):
+    pkpass_with_assets['logo.png'] = b'11001100'
+    assert b'logo.png' in pkpass_with_assets.manifest
+
+    del pkpass_with_assets['logo.png']
+
+    assert b'logo.png' not in pkpass_with_assets.manifest
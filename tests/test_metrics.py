@@ -0,0 +1,47 @@
+from airpress import PKPass, PassObserver, StatsObserver
+
+
+def test_should_report_stages_members_and_cache_events(cert, key):
+    observer = StatsObserver()
+    pkpass = PKPass(('icon.png', b'00001111'), ('pass.json', b'11110000'), observer=observer)
+
+    pkpass.sign(cert=cert, key=key)
+    _ = bytes(pkpass)
+    _ = bytes(pkpass)
+    snapshot = observer.snapshot()
+
+    assert set(snapshot['stages']) == {
+        'validate', 'hash', 'load_credentials', 'sign', 'compress', 'zip'
+    }
+    assert snapshot['stages']['zip']['count'] == 2
+    assert snapshot['stages']['hash']['count'] == 1
+    assert snapshot['members'] == 8
+    assert snapshot['raw_bytes'] > snapshot['compressed_bytes'] > 0
+    assert snapshot['cache']['member'] == {'hits': 2, 'misses': 2}
+    assert snapshot['cache']['digest'] == {'hits': 0, 'misses': 2}
+
+
+def test_should_report_signature_cache_hits(pkpass_with_assets, cert, key):
+    events = []
+
+    class Observer(PassObserver):
+        def on_cache(self, cache, hit):
+            events.append((cache, hit))
+
+    pkpass_with_assets.observer = Observer()
+    pkpass_with_assets.sign(cert=cert, key=key)
+    pkpass_with_assets.sign(cert=cert, key=key)
+
+    assert [event for event in events if event[0] == 'signature'] == [
+        ('signature', False), ('signature', True)
+    ]
+    assert ('manifest', True) in events
+
+
+def test_histogram_buckets_should_count_all_observations(pkpass_with_assets, cert, key):
+    observer = StatsObserver(bounds=(0.0, 60.0))
+    pkpass_with_assets.observer = observer
+
+    pkpass_with_assets.sign(cert=cert, key=key)
+
+    assert observer.snapshot()['stages']['sign']['buckets'] == [0, 1, 0]
@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from airpress import PKPass, StatsObserver
+from airpress.parallel import shared_executor
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(4)
+        self.calls = 0
+
+    def map(self, func, *iterables, **kwargs):
+        self.calls += 1
+        return super().map(func, *iterables, **kwargs)
+
+
+def assets():
+    return [
+        ('icon.png', os.urandom(1000) * 300),
+        ('strip@3x.png', os.urandom(1000) * 300),
+        ('background@3x.png', bytes(500000)),
+        ('en.lproj/logo.png', b'same' * 1000),
+        ('de.lproj/logo.png', b'same' * 1000),
+        ('pass.json', b'{}'),
+    ]
+
+
+@pytest.fixture
+def executor():
+    with CountingExecutor() as e:
+        yield e
+
+
+def test_should_hash_and_compress_large_pass_on_executor(executor, cert, key):
+    content = assets()
+    sequential = PKPass(*content, deterministic=True)
+    parallel = PKPass(*content, deterministic=True, executor=executor, parallel_threshold=1000)
+
+    assert parallel.manifest_dict == sequential.manifest_dict
+    sequential.sign(cert, key)
+    parallel.sign(cert, key)
+    assert executor.calls == 1
+
+    assert bytes(parallel) == bytes(sequential)
+    assert executor.calls == 2
+    assert parallel.members['en.lproj/logo.png'] is parallel.members['de.lproj/logo.png']
+
+
+def test_should_not_use_executor_below_threshold(executor, cert, key):
+    p = PKPass(*assets(), executor=executor, parallel_threshold=10 * 1024 * 1024)
+    p.sign(cert, key)
+    bytes(p)
+
+    assert executor.calls == 0
+
+
+def test_should_use_shared_executor(cert, key):
+    observer = StatsObserver()
+    p = PKPass(*assets(), executor=True, parallel_threshold=0, observer=observer)
+    p.sign(cert, key)
+    bytes(p)
+
+    snapshot = observer.snapshot()
+    assert snapshot['cache']['member'] == {'hits': 1, 'misses': 5}
+    assert snapshot['stages']['compress']['count'] >= 1
+    assert shared_executor() is shared_executor()
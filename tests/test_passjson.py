@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from airpress import Field, PassJsonTemplate
+
+
+@pytest.fixture
+def skeleton():
+    return {
+        'formatVersion': 1,
+        'serialNumber': Field('serial'),
+        'organizationName': 'Zażółć gęślą jaźń',
+        'barcodes': [{'format': 'PKBarcodeFormatQR', 'message': Field('serial')}],
+        'eventTicket': {
+            'primaryFields': [{'key': 'name', 'value': Field('name')}],
+            'auxiliaryFields': [
+                {'key': 'seat', 'value': Field('seat', int)},
+                {'key': 'price', 'value': Field('price', float, default=9.5)},
+                {'key': 'vip', 'value': Field('vip', bool, default=False)},
+                {'key': 'note', 'value': Field('note', nullable=True, default=None)},
+            ],
+        },
+    }
+
+
+def render_reference(skeleton, values):
+    def replace(value):
+        if isinstance(value, Field):
+            return values.get(value.name, value.default)
+        if isinstance(value, dict):
+            return {k: replace(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [replace(v) for v in value]
+        return value
+    return replace(skeleton)
+
+
+@pytest.mark.parametrize('ensure_ascii', [False, True])
+def test_should_render_same_document_as_json_dumps(skeleton, ensure_ascii):
+    template = PassJsonTemplate(skeleton, ensure_ascii=ensure_ascii)
+    values = {'serial': 'A"1\\\n€', 'name': 'Jan Kowalski', 'seat': 12, 'vip': True}
+
+    rendered = template.render(values)
+
+    expected = json.dumps(
+        render_reference(skeleton, values), ensure_ascii=ensure_ascii, separators=(',', ':')
+    ).encode('utf8')
+    assert rendered == expected
+    assert json.loads(rendered)['barcodes'][0]['message'] == 'A"1\\\n€'
+
+
+def test_should_render_with_json_dumps_options(skeleton):
+    template = PassJsonTemplate(skeleton, indent=2, separators=(', ', ': '))
+    values = {'serial': '1', 'name': 'A', 'seat': 1}
+    assert template.render(**values) == json.dumps(
+        render_reference(skeleton, values), ensure_ascii=False, indent=2, separators=(', ', ': ')
+    ).encode('utf8')
+
+
+def test_should_raise_key_error_rendering_without_required_field(skeleton):
+    with pytest.raises(KeyError):
+        PassJsonTemplate(skeleton).render(serial='1', name='A')
+
+
+@pytest.mark.parametrize('values', [
+    {'seat': '12'}, {'seat': True}, {'price': float('nan')}, {'vip': 1}, {'name': None},
+])
+def test_should_raise_type_error_rendering_value_of_wrong_type(skeleton, values):
+    with pytest.raises(TypeError):
+        PassJsonTemplate(skeleton).render({'serial': '1', 'name': 'A', 'seat': 1, **values})
+
+
+def test_should_raise_assertion_error_compiling_unsupported_field_type():
+    with pytest.raises(AssertionError):
+        _ = Field('seat', list)
+
+
+def test_should_raise_type_error_compiling_default_of_wrong_type():
+    with pytest.raises(TypeError):
+        _ = Field('seat', int, default='12')
+
+
+def test_should_raise_assertion_error_compiling_field_with_conflicting_types():
+    with pytest.raises(AssertionError):
+        _ = PassJsonTemplate({'a': Field('x'), 'b': Field('x', int)})
@@ -0,0 +1,115 @@
+import struct
+import zlib
+
+import pytest
+
+from airpress import PKPass, PNGOptimizer, PassTemplate
+from airpress.png import optimize_png
+
+
+def chunk(chunk_type, content):
+    return (struct.pack('>L', len(content)) + chunk_type + content
+            + struct.pack('>L', zlib.crc32(chunk_type + content)))
+
+
+def png(level=0, extra=(), width=64, height=64):
+    rows = b''.join(b'\x00' + bytes(range(width)) * 4 for _ in range(height))
+    data = zlib.compress(rows, level)
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>LL5B', width, height, 8, 6, 0, 0, 0)),
+        *extra,
+        chunk(b'IDAT', data[:100]),
+        chunk(b'IDAT', data[100:]),
+        chunk(b'IEND', b''),
+    ])
+
+
+def parse(data):
+    offset, chunks = 8, []
+    while offset < len(data):
+        length, chunk_type = struct.unpack_from('>L4s', data, offset)
+        chunks.append((chunk_type, data[offset + 8:offset + 8 + length]))
+        offset += 12 + length
+    return chunks
+
+
+def pixels(data):
+    return zlib.decompress(b''.join(c for t, c in parse(data) if t == b'IDAT'))
+
+
+def test_should_recompress_image_data_losslessly():
+    original = png(extra=[chunk(b'tEXt', b'Comment\x00made by hand'), chunk(b'tRNS', b'\x00' * 6)])
+
+    optimized = optimize_png(original)
+
+    assert len(optimized) < len(original)
+    assert pixels(optimized) == pixels(original)
+    assert [t for t, _ in parse(optimized)] == [b'IHDR', b'tRNS', b'IDAT', b'IEND']
+
+
+def test_should_keep_image_which_cant_be_made_smaller():
+    original = optimize_png(png())
+    assert optimize_png(original) is original
+
+
+@pytest.mark.parametrize('original', [
+    b'not a png',
+    png()[:-20],
+    png(extra=[chunk(b'acTL', b'\x00' * 8)]),
+    png(extra=[chunk(b'XXXX', b'')]),
+])
+def test_should_leave_unsupported_images_intact(original):
+    assert optimize_png(original) is original
+
+
+def test_should_optimize_each_distinct_image_once(tmp_path):
+    optimizer = PNGOptimizer()
+    original = png()
+
+    first = optimizer.optimize('icon.png', original)
+    second = optimizer.optimize('logo.png', bytes(bytearray(original)))
+
+    assert first is second
+    assert optimizer.optimize('pass.json', original) is original
+    stats = optimizer.stats
+    assert (stats.images, stats.optimized, stats.hits) == (2, 2, 1)
+    assert optimizer.saved == 2 * (len(original) - len(first)) > 0
+
+
+@pytest.mark.parametrize('on_disk, hits', [(False, 0), (True, 1)])
+def test_should_evict_results_exceeding_memory_budget(tmp_path, on_disk, hits):
+    first, second = png(width=64), png(width=96)
+    # Budget fits only one optimized image
+    max_size = len(optimize_png(second)) + 40
+    optimizer = PNGOptimizer(str(tmp_path) if on_disk else None, max_size=max_size)
+
+    for original in (first, second, first):
+        assert optimizer.optimize('icon.png', original) == optimize_png(original)
+
+    assert optimizer.stats.hits == hits
+
+
+def test_should_share_results_through_directory(tmp_path):
+    original = png()
+    compressed = optimize_png(original)
+    PNGOptimizer(str(tmp_path)).optimize('icon.png', original)
+    PNGOptimizer(str(tmp_path)).optimize('icon.png', compressed)
+
+    optimizer = PNGOptimizer(str(tmp_path))
+
+    assert optimizer.optimize('icon.png', original) == optimize_png(original)
+    assert optimizer.optimize('icon.png', compressed) is compressed
+    assert optimizer.stats.hits == 2
+
+
+def test_should_optimize_images_added_to_pass_and_template():
+    optimizer = PNGOptimizer()
+    original = png()
+    template = PassTemplate(('icon.png', original), optimizer=optimizer)
+
+    p = template.new_pass(('pass.json', b'{}'), ('logo.png', original))
+
+    assert len(template['icon.png']) < len(original)
+    assert p['logo.png'] is template['icon.png']
+    assert PKPass(('icon.png', original), optimizer=optimizer)['icon.png'] is p['logo.png']
@@ -0,0 +1,107 @@
+import json
+import struct
+import zlib
+
+import pytest
+
+from airpress import PKPass, PassTemplate, preflight
+from airpress.preflight import REQUIRED_PASS_KEYS, estimate_size, png_dimensions
+
+
+def png(width, height):
+    ihdr = struct.pack('>LL5B', width, height, 8, 6, 0, 0, 0)
+    chunk = struct.pack('>L', len(ihdr)) + b'IHDR' + ihdr
+    return b'\x89PNG\r\n\x1a\n' + chunk + struct.pack('>L', zlib.crc32(chunk[4:]))
+
+
+@pytest.fixture
+def pass_json():
+    return json.dumps({key: '1' for key in REQUIRED_PASS_KEYS}).encode()
+
+
+def test_should_read_png_dimensions_from_header():
+    assert png_dimensions(png(58, 29)) == (58, 29)
+    with pytest.raises(ValueError):
+        png_dimensions(b'GIF89a' + b'0' * 30)
+
+
+def test_should_pass_preflight_of_valid_pass(pass_json):
+    p = PKPass(('pass.json', pass_json), ('icon.png', png(29, 29)),
+               ('icon@3x.png', png(87, 87)), ('strip@2x.png', png(750, 288)))
+
+    result = preflight(p)
+
+    assert result.ok
+    assert result.size > 0
+
+
+def test_should_report_images_larger_than_their_slot(pass_json):
+    p = PKPass(('pass.json', pass_json), ('icon.png', png(58, 58)), ('logo@2x.png', png(320, 101)),
+               ('thumbnail.png', b'not a png'))
+
+    result = preflight(p)
+
+    assert sorted((i.code, i.member) for i in result.issues) == [
+        ('image_too_large', 'icon.png'),
+        ('image_too_large', 'logo@2x.png'),
+        ('invalid_image', 'thumbnail.png'),
+    ]
+    assert preflight(p, check_images=False).ok
+
+
+def test_should_report_images_smaller_than_slot_or_not_matching_other_scales(pass_json):
+    p = PKPass(('pass.json', pass_json), ('icon.png', png(29, 29)), ('icon@2x.png', png(58, 58)),
+               ('thumbnail@2x.png', png(100, 100)), ('logo.png', png(100, 40)),
+               ('logo@3x.png', png(240, 120)), ('en.lproj/logo.png', png(100, 40)),
+               ('en.lproj/logo@2x.png', png(201, 79)), ('de.lproj/logo@2x.png', png(120, 50)))
+
+    result = preflight(p)
+
+    assert sorted((i.code, i.member) for i in result.issues) == [
+        ('image_scale_mismatch', 'logo@3x.png'),
+        ('image_too_small', 'thumbnail@2x.png'),
+    ]
+
+
+def test_should_report_missing_pass_json_keys_and_icon():
+    p = PKPass(('pass.json', b'{"formatVersion": 1}'), ('logo.png', png(1, 1)))
+
+    result = preflight(p)
+
+    codes = [i.code for i in result.issues]
+    assert codes.count('missing_key') == len(REQUIRED_PASS_KEYS) - 1
+    assert 'missing_icon' in codes
+    with pytest.raises(AssertionError):
+        result.raise_for_issues()
+
+
+def test_should_report_invalid_pass_json():
+    p = PKPass(('pass.json', b'[1, 2'), ('icon.png', png(29, 29)))
+    assert [i.code for i in preflight(p).issues] == ['invalid_pass_json']
+
+
+def test_should_estimate_size_close_to_archive_size(pass_json, cert, key):
+    template = PassTemplate(('icon.png', png(29, 29) + bytes(5000)))
+    p = template.new_pass(('pass.json', pass_json))
+
+    estimate = estimate_size(p)
+    p.sign(cert, key)
+
+    actual = len(bytes(p))
+    assert actual <= estimate <= actual + len(pass_json) + 4096
+    assert estimate_size(p) >= actual
+
+
+def test_should_report_archive_over_size_limit(pass_json):
+    p = PKPass(('pass.json', pass_json), ('icon.png', png(29, 29)))
+    result = preflight(p, max_size=100)
+    assert [i.code for i in result.issues] == ['archive_too_large']
+
+
+def test_should_not_hash_or_compress_during_preflight(pass_json, monkeypatch):
+    from airpress import compressor
+    monkeypatch.setattr(compressor, 'asset_sha1', None)
+    p = PKPass(('pass.json', pass_json), ('icon.png', png(29, 29)))
+
+    assert preflight(p).ok
+    assert not p.members
@@ -0,0 +1,144 @@
+import io
+import zipfile
+
+import pytest
+
+from airpress import PKPassReader, verify_many
+
+
+@pytest.fixture
+def archive(pkpass_with_assets, cert, key):
+    pkpass_with_assets.sign(cert=cert, key=key)
+    return bytes(pkpass_with_assets)
+
+
+@pytest.fixture
+def trust(cert):
+    # Dummy certificate is self-signed and expired
+    return {'trusted_certificates': [cert], 'check_time': False}
+
+
+def rewrite(archive, **changes):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(archive)) as original, zipfile.ZipFile(buffer, 'w') as copy:
+        for info in original.infolist():
+            data = changes.pop(info.filename, original.read(info))
+            if data is not None:
+                copy.writestr(info.filename, data)
+        for name, data in changes.items():
+            copy.writestr(name, data)
+    return buffer.getvalue()
+
+
+def corrupt(archive, name):
+    # Deflates member again and flips bytes inside its compressed data
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(archive)) as original, \
+            zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as copy:
+        for info in original.infolist():
+            data = original.read(info)
+            copy.writestr(info.filename, b''.join(b'%d,' % i for i in range(5000))
+                          if info.filename == name else data)
+    data = bytearray(buffer.getvalue())
+    with zipfile.ZipFile(buffer) as z:
+        start = z.getinfo(name).header_offset + 30 + len(name)
+    for i in range(start + 10, start + 40):
+        data[i] ^= 0xFF
+    return bytes(data)
+
+
+def codes(result):
+    return [(issue.code, issue.member) for issue in result.issues]
+
+
+def test_should_read_pkpass_lazily(archive):
+    with PKPassReader(archive, chunk_size=2) as reader:
+        assert 'icon.png' in reader
+        assert b''.join(reader.iter_member('icon.png')) == b'00001111'
+        assert reader.manifest_dict['pass.json'] == reader.member_sha1('pass.json')
+
+
+def test_should_verify_valid_pkpass(archive, trust):
+    assert PKPassReader(archive).verify(**trust).ok
+
+
+def test_should_report_untrusted_signature(archive):
+    result = PKPassReader(archive).verify()
+    assert codes(result) == [('invalid_signature', 'signature')]
+
+
+def test_should_report_tampered_missing_and_unlisted_members(archive, trust):
+    tampered = rewrite(archive, **{'icon.png': None, 'pass.json': b'tampered', 'logo.png': b'1'})
+
+    result = PKPassReader(tampered).verify(**trust)
+
+    assert not result.ok
+    assert sorted(codes(result)) == [
+        ('digest_mismatch', 'pass.json'),
+        ('missing_member', 'icon.png'),
+        ('unlisted_member', 'logo.png'),
+    ]
+
+
+def test_should_report_manifest_not_matching_signature(archive, trust):
+    with zipfile.ZipFile(io.BytesIO(archive)) as z:
+        manifest = z.read('manifest.json').replace(b'{', b'{ ', 1)
+
+    result = PKPassReader(rewrite(archive, **{'manifest.json': manifest})).verify(**trust)
+
+    assert codes(result) == [('invalid_signature', 'signature')]
+
+
+def test_should_report_missing_manifest_and_signature(archive, trust):
+    stripped = rewrite(archive, **{'signature': None})
+    assert codes(PKPassReader(stripped).verify(**trust)) == [('missing_signature', None)]
+
+    stripped = rewrite(archive, **{'manifest.json': None})
+    assert codes(PKPassReader(stripped).verify(**trust)) == [('missing_manifest', None)]
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_should_verify_many_archives_in_order(archive, trust, workers):
+    tampered = rewrite(archive, **{'pass.json': b'tampered'})
+
+    results = list(verify_many([archive, b'not a zip', tampered], workers=workers, **trust))
+
+    assert results[0].ok
+    assert codes(results[1]) == [('invalid_archive', None)]
+    assert codes(results[2]) == [('digest_mismatch', 'pass.json')]
+
+
+@pytest.mark.parametrize('name', ['icon.png', 'manifest.json', 'signature'])
+def test_should_report_member_with_corrupt_deflate_stream(archive, trust, name):
+    result = PKPassReader(corrupt(archive, name)).verify(**trust)
+    assert ('corrupt_member', name) in codes(result)
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_should_not_stop_verifying_many_archives_on_corrupt_member(archive, trust, workers):
+    results = list(verify_many([corrupt(archive, 'icon.png'), archive], workers=workers, **trust))
+
+    assert ('corrupt_member', 'icon.png') in codes(results[0])
+    assert results[1].ok
+
+
+def test_should_verify_pkpass_from_path(archive, trust, tmp_path):
+    path = tmp_path / 'pass.pkpass'
+    path.write_bytes(archive)
+    assert next(verify_many([str(path)], workers=0, **trust)).ok
+
+
+def test_should_close_file_when_path_is_not_zip_archive(tmp_path, monkeypatch):
+    path = tmp_path / 'pass.pkpass'
+    path.write_bytes(b'not a zip archive')
+    opened = []
+
+    def tracking_open(*args, _open=open):
+        opened.append(_open(*args))
+        return opened[-1]
+
+    monkeypatch.setattr('builtins.open', tracking_open)
+
+    with pytest.raises(zipfile.BadZipFile):
+        PKPassReader(str(path))
+    assert opened[0].closed
@@ -67,3 +67,31 @@ def test_should_reset_signature_if_asset_was_removed_after_signing(pkpass_with_a
 
     with pytest.raises(AttributeError):
         _ = pkpass_with_assets.signature
+
+
+def test_should_keep_signature_if_identical_asset_was_added_after_signing(pkpass_with_assets, cert, key):
+    signature = pkpass_with_assets.sign(cert=cert, key=key)
+
+    pkpass_with_assets['pass.json'] = b'11110000'
+
+    assert pkpass_with_assets.signature == signature
+
+
+def test_should_reuse_signature_of_unchanged_manifest(pkpass_with_assets, cert, key, monkeypatch):
+    from airpress import compressor
+    signature = pkpass_with_assets.sign(cert=cert, key=key)
+    pkpass_with_assets['pass.json'] = b'00000000'
+    pkpass_with_assets['pass.json'] = b'11110000'
+    monkeypatch.setattr(compressor, 'PassSigner', None)
+
+    assert pkpass_with_assets.sign(cert=cert, key=key) == signature
+
+
+def test_should_sign_again_with_different_credentials(pkpass_with_assets, cert, key):
+    class FakeSigner:
+        def sign(self, data):
+            return b'fake signature'
+
+    pkpass_with_assets.sign(cert=cert, key=key)
+
+    assert pkpass_with_assets.sign(signer=FakeSigner()) == b'fake signature'
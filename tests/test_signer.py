@@ -0,0 +1,27 @@
+import pickle
+
+from airpress import PassSigner, WWDR_CA
+
+
+def test_should_sign_pkpass_with_signer(pkpass_with_assets, cert, key):
+    signer = PassSigner(cert, key, WWDR_CA)
+    signature = pkpass_with_assets.sign(signer=signer)
+    assert signature
+    assert type(signature) is bytes
+    assert pkpass_with_assets.signature == signature
+
+
+def test_should_sign_multiple_manifests_with_the_same_signer(cert, key):
+    signer = PassSigner(cert, key, WWDR_CA)
+    assert signer.sign(b'first manifest')
+    assert signer.sign(b'second manifest')
+
+
+def test_signer_ignores_credentials_supplied_to_sign_method(pkpass_with_assets, cert, key):
+    signer = PassSigner(cert, key, WWDR_CA)
+    assert pkpass_with_assets.sign(cert=b'', key=b'', signer=signer)
+
+
+def test_should_pickle_signer(cert, key):
+    signer = pickle.loads(pickle.dumps(PassSigner(cert, key, WWDR_CA)))
+    assert signer.sign(b'manifest')
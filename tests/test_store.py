@@ -0,0 +1,69 @@
+import io
+import zipfile
+
+import pytest
+
+from airpress import AssetStore, PKPass, PassTemplate, STORE_PNG_COMPRESSION
+
+
+@pytest.fixture
+def store():
+    return AssetStore()
+
+
+def test_should_share_single_copy_of_identical_assets_between_passes(store):
+    first = PKPass(('icon.png', b'00001111' * 8), ('pass.json', b'1'), store=store)
+    second = PKPass(('icon.png', bytes(b'00001111' * 8)), ('pass.json', b'2'), store=store)
+
+    assert first['icon.png'] is second['icon.png']
+    assert store.stats.hits == 1
+    assert store.stats.misses == 3
+    assert len(store) == 3
+
+
+def test_should_compress_shared_asset_once(store, cert, key):
+    passes = [
+        PKPass(('icon.png', b'00001111' * 8), ('pass.json', b'%d' % i), store=store)
+        for i in range(3)
+    ]
+    members = set()
+    for p in passes:
+        p.sign(cert=cert, key=key)
+        with zipfile.ZipFile(io.BytesIO(bytes(p))) as archive:
+            assert archive.read('icon.png') == b'00001111' * 8
+        members.add(id(store.member(p.manifest_dict['icon.png'], 'icon.png', p['icon.png'], p.compression)))
+
+    assert len(members) == 1
+
+
+def test_should_keep_separate_members_for_different_compression(store):
+    data, digest = store.intern(b'00001111' * 8)
+
+    deflated = store.member(digest, 'icon.png', data, PKPass().compression)
+    stored = store.member(digest, 'icon.png', data, STORE_PNG_COMPRESSION)
+
+    assert deflated.compress_type != stored.compress_type
+    assert stored.data is data
+
+
+def test_should_evict_least_recently_used_assets(store):
+    store.max_size = 20
+    store.intern(b'a' * 10)
+    store.intern(b'b' * 10)
+    store.intern(b'a' * 10)
+    store.intern(b'c' * 10)
+
+    stats = store.stats
+    assert stats.evictions == 1
+    assert stats.entries == 2
+    assert stats.size == 20
+    data, _ = store.intern(b'a' * 10)
+    assert store.stats.hits == 2
+
+
+def test_should_create_passes_using_template_store(store):
+    template = PassTemplate(('icon.png', b'00001111'), store=store)
+    p = template.new_pass(('pass.json', b'11110000'))
+
+    assert p.store is store
+    assert len(store) == 2
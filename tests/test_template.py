@@ -0,0 +1,69 @@
+import io
+import zipfile
+from hashlib import sha1
+
+import pytest
+
+from airpress import PassTemplate, STORE_PNG_COMPRESSION
+
+
+@pytest.fixture
+def template():
+    return PassTemplate(
+        ('icon.png', b'00001111' * 64),
+        ('logo.png', b'11001100' * 64),
+    )
+
+
+def test_should_precompute_template_digests_and_members(template):
+    assert template.digests['icon.png'] == sha1(b'00001111' * 64).hexdigest()
+    assert template.members['logo.png'].file_size == 512
+
+
+def test_should_raise_assertion_error_creating_template_with_unsupported_asset():
+    with pytest.raises(AssertionError):
+        _ = PassTemplate(('unknown.doc', b'11001100'))
+
+
+def test_should_create_pass_sharing_template_assets(template):
+    p = template.new_pass(('pass.json', b'11110000'))
+    assert p['icon.png'] is template['icon.png']
+    assert p['pass.json'] == b'11110000'
+
+
+def test_should_create_same_manifest_as_pass_without_template(template, pkpass):
+    p = template.new_pass(('pass.json', b'11110000'))
+    pkpass.add_to_pass_package(
+        ('icon.png', b'00001111' * 64),
+        ('logo.png', b'11001100' * 64),
+        ('pass.json', b'11110000'),
+    )
+    assert p.manifest == pkpass.manifest
+
+
+def test_should_override_template_asset(template):
+    p = template.new_pass(('pass.json', b'11110000'), ('icon.png', b'10101010'))
+    assert p.manifest_dict['icon.png'] == sha1(b'10101010').hexdigest()
+
+
+def test_should_compress_pass_created_from_template(template, cert, key):
+    p = template.new_pass(('pass.json', b'11110000'))
+    p.sign(cert=cert, key=key)
+
+    with zipfile.ZipFile(io.BytesIO(bytes(p))) as archive:
+        assert archive.testzip() is None
+        assert archive.read('icon.png') == b'00001111' * 64
+        assert archive.read('pass.json') == b'11110000'
+        assert archive.namelist() == [
+            'icon.png', 'logo.png', 'pass.json', 'manifest.json', 'signature'
+        ]
+
+
+def test_should_create_passes_with_template_compression_policy(cert, key):
+    template = PassTemplate(('icon.png', b'00001111' * 64), compression=STORE_PNG_COMPRESSION)
+    p = template.new_pass(('pass.json', b'11110000'))
+    p.sign(cert=cert, key=key)
+
+    assert p.compression is STORE_PNG_COMPRESSION
+    with zipfile.ZipFile(io.BytesIO(bytes(p))) as archive:
+        assert archive.getinfo('icon.png').compress_type == zipfile.ZIP_STORED
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import pytest
+
+import airpress
+from airpress import PassSigner, PassTemplate, WWDR_CA, crypto, prewarm
+
+
+def test_should_not_import_cryptography_with_airpress():
+    code = 'import sys, airpress; assert "cryptography" not in sys.modules'
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='module __getattr__ requires Python 3.7')
+def test_should_import_optional_subsystems_on_first_use():
+    code = (
+        'import sys, airpress\n'
+        'heavy = ("asyncio", "multiprocessing", "sqlite3", "socket", "concurrent.futures")\n'
+        'assert not [m for m in heavy if m in sys.modules], [m for m in heavy if m in sys.modules]\n'
+        'assert airpress.DeltaIndex is airpress.delta.DeltaIndex\n'
+        'assert "sqlite3" in sys.modules and "DeltaIndex" in dir(airpress)\n'
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_should_raise_attribute_error_for_unknown_name():
+    with pytest.raises(AttributeError):
+        airpress.NoSuchThing
+
+
+def test_should_keep_openssl_bindings_available_as_module_attributes():
+    bindings = crypto.load_bindings()
+    assert crypto.copenssl.PKCS7_DETACHED == bindings.lib.PKCS7_DETACHED
+    assert crypto.cffi.NULL == bindings.ffi.NULL
+    assert crypto.default_flag() == crypto.copenssl.PKCS7_BINARY | crypto.copenssl.PKCS7_DETACHED
+
+
+def test_should_share_parsed_wwdr_certificate_between_signers(cert, key):
+    first = PassSigner(cert, key, WWDR_CA)
+    second = PassSigner(cert, key, WWDR_CA)
+    assert first._intermediate_cert is second._intermediate_cert
+
+
+def test_should_prewarm_signer_and_templates(cert, key):
+    template = PassTemplate(('icon.png', b'00001111'))
+
+    signer = prewarm(cert, key, templates=[template])
+
+    assert isinstance(signer, PassSigner)
+    p = template.new_pass(('pass.json', b'{}'))
+    assert p.sign(signer=signer)
+    assert prewarm(signer=signer) is signer
+    assert prewarm(templates=[template]) is None
+
+
+def test_should_prewarm_template_without_required_assets(cert, key):
+    template = PassTemplate(('logo.png', b'00001111'))
+
+    signer = prewarm(cert, key, templates=[template])
+
+    p = template.new_pass(('icon.png', b'11110000'), ('pass.json', b'{}'))
+    assert p.sign(signer=signer)
+    assert prewarm(templates=[template]) is None